@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Micro-benchmark de calcular_hash_archivo: MB/s por algoritmo, tamaño de buffer y mmap.
+
+Uso: python benchmarks/bench_hash.py [--size-mb 256] [--repeat 3] [--json]
+
+Crea un archivo temporal de datos aleatorios y lo hashea con cada algoritmo disponible
+(sha256, blake2b y xxh3/blake3 si están instalados) y cada tamaño de buffer. La primera
+lectura calienta la caché de páginas, así que los resultados miden CPU + copia en memoria;
+para medir el disco, usar un archivo mayor que la RAM con --path.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from photosync.hashing import ALGORITMOS, calcular_hash_archivo  # noqa: E402
+
+BUFFERS = (8 * 1024, 64 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+
+
+def _crear_archivo(tam_mb):
+    fd, ruta = tempfile.mkstemp(prefix="photosync-bench-", suffix=".bin")
+    bloque = os.urandom(1024 * 1024)
+    with os.fdopen(fd, "wb") as f:
+        for _ in range(tam_mb):
+            f.write(bloque)
+    return ruta
+
+
+def _medir(ruta, repeticiones, **kwargs):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        calcular_hash_archivo(ruta, **kwargs)
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=256, help="tamaño del archivo sintético (MB)")
+    parser.add_argument("--path", help="hashear este archivo en lugar de uno sintético")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones por combinación (se toma la mejor)")
+    parser.add_argument("--json", action="store_true", help="salida JSON en lugar de tabla")
+    args = parser.parse_args()
+
+    ruta = args.path or _crear_archivo(args.size_mb)
+    try:
+        tam_mb = os.path.getsize(ruta) / (1024 * 1024)
+        calcular_hash_archivo(ruta, algoritmo="sha256")  # calentar la caché de páginas
+        resultados = []
+        for algoritmo in ALGORITMOS:
+            for tam_buffer in BUFFERS:
+                duracion = _medir(ruta, args.repeat, algoritmo=algoritmo, tam_buffer=tam_buffer, umbral_mmap=0)
+                resultados.append({"algoritmo": algoritmo, "buffer": tam_buffer, "mmap": False, "mb_s": round(tam_mb / duracion, 1)})
+            duracion = _medir(ruta, args.repeat, algoritmo=algoritmo, tam_buffer=BUFFERS[-1], umbral_mmap=1)
+            resultados.append({"algoritmo": algoritmo, "buffer": BUFFERS[-1], "mmap": True, "mb_s": round(tam_mb / duracion, 1)})
+    finally:
+        if not args.path:
+            os.unlink(ruta)
+
+    if args.json:
+        print(json.dumps({"size_mb": round(tam_mb, 1), "resultados": resultados}, indent=2))
+        return
+    print(f"Archivo: {tam_mb:.0f} MB")
+    print(f"{'algoritmo':<10} {'buffer':>10} {'mmap':>5} {'MB/s':>10}")
+    for r in resultados:
+        print(f"{r['algoritmo']:<10} {r['buffer']:>10} {'sí' if r['mmap'] else 'no':>5} {r['mb_s']:>10}")
+
+
+if __name__ == "__main__":
+    main()
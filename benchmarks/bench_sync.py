@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Benchmark reproducible de process_folder sobre un corpus multimedia sintético.
+
+Uso: python benchmarks/bench_sync.py [--files 2000] [--size-kb 16] [--jobs 1] [--no-exiftool] [--json]
+
+Genera con benchmarks/corpus.py un árbol anidado de JPEG con fecha EXIF, MP4 con fecha
+en mvhd/tkhd, archivos sin fecha y ráfagas de fotos con la misma fecha al segundo, y lo
+sincroniza en tres fases con la configuración apuntando a un directorio temporal:
+
+- cold: destino, almacén de estado e índice de hashes vacíos,
+- warm: segunda pasada sin cambios (solo recorrido y comprobación de sync_times),
+- incremental: tras añadir --new archivos en un directorio nuevo.
+
+Por fase informa de segundos, archivos/s y bytes/s (sobre todo el corpus), subprocesos
+lanzados (shim sobre subprocess.Popen, que también cuenta los subprocess.run), el pico
+de RSS (resource.getrusage, en KiB) del proceso y de sus hijos y el desglose por etapa de
+photosync.metrics. Sin exiftool (o con --no-exiftool) no se leen fechas y todo acaba
+enlazado en TAGNAME_NOTFOUND_PATH; el JSON lo indica con "exiftool": null.
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import generar_corpus  # noqa: E402
+from photosync import main as ps_main  # noqa: E402
+from photosync import settings  # noqa: E402
+
+subprocesos = collections.Counter()
+
+
+def _instalar_shim():
+    popen = subprocess.Popen
+
+    class PopenContado(popen):
+        def __init__(self, args, *resto, **kwargs):
+            programa = args[0] if isinstance(args, (list, tuple)) else str(args).split()[0]
+            subprocesos[os.path.basename(str(programa))] += 1
+            super().__init__(args, *resto, **kwargs)
+
+    def restaurar():
+        subprocess.Popen = popen
+
+    subprocess.Popen = PopenContado
+    return restaurar
+
+
+def configurar(trabajo, args):
+    """Apunta settings a trabajo/ y devuelve la raíz de origen."""
+    origen = os.path.join(trabajo, "origen")
+    settings.SOURCE_PATHS = (origen,)
+    settings.TARGET_PATH = os.path.join(trabajo, "destino")
+    settings.TAGNAME_NOTFOUND_PATH = os.path.join(trabajo, "sin_fecha")
+    settings.LAST_SYNC_TIME_PATH = os.path.join(trabajo, "estado", "last.json")
+    settings.PHOTOSYNC_STATE_DB_PATH = os.path.join(trabajo, "estado", "state.sqlite")
+    settings.PHOTOSYNC_HASH_INDEX_PATH = os.path.join(trabajo, "estado", "hash_index.sqlite")
+    settings.DRY_RUN = False
+    settings.PHOTOSYNC_SYNC_HIDDEN = False
+    settings.PHOTOSYNC_JOBS = args.jobs
+    settings.PHOTOSYNC_EXIF_BATCH_SIZE = args.batch
+    # Las métricas por etapa van al informe, no a un textfile
+    settings.PHOTOSYNC_METRICS_DIR = ""
+    os.makedirs(os.path.join(trabajo, "estado"), exist_ok=True)
+    if args.no_exiftool:
+        ps_main.EXIFTOOL_PATH = None
+    return origen
+
+
+def _contar(raiz):
+    total = 0
+    for _, _, archivos in os.walk(raiz):
+        total += len(archivos)
+    return total
+
+
+def _rss():
+    return {
+        "rss_max_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_max_hijos_kib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def fase(nombre, origen, archivos, bytes_totales):
+    # Como photosync-run: cada ejecución parte del estado guardado por la anterior
+    ps_main.sync_times = ps_main.load_sync_times()
+    subprocesos.clear()
+    restaurar = _instalar_shim()
+    inicio = time.perf_counter()
+    try:
+        with ps_main.metricas_ejecucion() as metricas:
+            ps_main.process_folder(origen)
+    finally:
+        duracion = time.perf_counter() - inicio
+        restaurar()
+    return {
+        "fase": nombre,
+        "segundos": round(duracion, 4),
+        "archivos": archivos,
+        "bytes": bytes_totales,
+        "archivos_s": round(archivos / duracion, 1) if duracion else None,
+        "bytes_s": round(bytes_totales / duracion) if duracion else None,
+        "subprocesos": sum(subprocesos.values()),
+        "subprocesos_por_programa": dict(subprocesos),
+        "colocados": _contar(settings.TARGET_PATH),
+        "sin_fecha": _contar(settings.TAGNAME_NOTFOUND_PATH),
+        **_rss(),
+        "etapas": metricas.resumen()["etapas"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000, help="archivos del corpus sintético")
+    parser.add_argument("--size-kb", type=int, default=16, help="relleno de cada archivo en KiB")
+    parser.add_argument("--depth", type=int, default=3, help="niveles de subdirectorios")
+    parser.add_argument("--fanout", type=int, default=4, help="subdirectorios por directorio")
+    parser.add_argument("--per-dir", type=int, default=50, help="archivos por directorio")
+    parser.add_argument("--new", type=int, default=None, help="archivos nuevos de la fase incremental (por defecto 1%% del corpus)")
+    parser.add_argument("--seed", type=int, default=1, help="semilla del generador")
+    parser.add_argument("--jobs", type=int, default=1, help="PHOTOSYNC_JOBS")
+    parser.add_argument("--batch", type=int, default=100, help="PHOTOSYNC_EXIF_BATCH_SIZE")
+    parser.add_argument("--no-exiftool", action="store_true", help="sincronizar sin exiftool aunque esté instalado")
+    parser.add_argument("--workdir", help="directorio de trabajo (por defecto uno temporal que se borra al terminar)")
+    parser.add_argument("--verbose", action="store_true", help="mantener el log INFO de photosync")
+    parser.add_argument("--json", action="store_true", help="salida JSON en lugar de tabla")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Sin exiftool cada archivo registra un ERROR; el aviso se da una vez abajo
+        ps_main.logger.setLevel(logging.CRITICAL)
+
+    temporal = None
+    trabajo = args.workdir
+    if trabajo is None:
+        temporal = trabajo = tempfile.mkdtemp(prefix="photosync-bench-sync-")
+    try:
+        origen = configurar(trabajo, args)
+        if ps_main.EXIFTOOL_PATH is None:
+            print("Aviso: sin exiftool; las fechas no se leen y todo se enlaza en TAGNAME_NOTFOUND_PATH", file=sys.stderr)
+
+        corpus = generar_corpus(origen, args.files, args.size_kb, args.depth, args.fanout, args.per_dir, semilla=args.seed)
+        resultados = [
+            fase("cold", origen, corpus["archivos"], corpus["bytes"]),
+            fase("warm", origen, corpus["archivos"], corpus["bytes"]),
+        ]
+        nuevos = args.new if args.new is not None else max(1, args.files // 100)
+        extra = generar_corpus(os.path.join(origen, "nuevos"), nuevos, args.size_kb, 0, 1, nuevos, semilla=args.seed + 1)
+        resultados.append(fase("incremental", origen, corpus["archivos"] + extra["archivos"], corpus["bytes"] + extra["bytes"]))
+    finally:
+        if temporal:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    informe = {
+        "python": platform.python_version(),
+        "exiftool": ps_main.EXIFTOOL_PATH,
+        "jobs": args.jobs,
+        "batch": args.batch,
+        "corpus": corpus,
+        "nuevos": extra,
+        "resultados": resultados,
+    }
+    if args.json:
+        print(json.dumps(informe, indent=2))
+        return
+    print(f"exiftool: {informe['exiftool']}  corpus: {corpus['archivos']} archivos, {corpus['bytes'] / 1e6:.1f} MB")
+    print(f"{'fase':<12} {'segundos':>9} {'archivos/s':>11} {'MB/s':>8} {'subproc':>8} {'RSS KiB':>9}")
+    for r in resultados:
+        print(f"{r['fase']:<12} {r['segundos']:>9.3f} {r['archivos_s'] or 0:>11.1f} {(r['bytes_s'] or 0) / 1e6:>8.1f} {r['subprocesos']:>8} {r['rss_max_kib']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Benchmark del recorrido de directorios: llamadas stat/scandir antes y después del walker iterativo.
+
+Uso: python benchmarks/bench_walk.py [--files 100000] [--per-dir 100] [--fanout 10] [--mode both] [--json]
+
+Crea un árbol sintético de archivos vacíos y lo recorre de dos formas:
+
+- legacy: el recorrido recursivo anterior de process_folder/process_files (getctime del
+  directorio, scandir de archivos, getctime de cada archivo y un segundo scandir para
+  los subdirectorios).
+- walker: photosync.walker.recorrer, con el stat de cada archivo tomado de su DirEntry.
+
+Las llamadas se cuentan con un shim sobre os.stat, os.lstat y os.scandir (incluido el
+primer stat() de cada DirEntry). Para contar syscalls reales, ejecutar un solo modo bajo
+strace: strace -c -f python benchmarks/bench_walk.py --mode walker --tree /ruta/arbol
+"""
+import argparse
+import collections
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from photosync.walker import recorrer  # noqa: E402
+
+contador = collections.Counter()
+
+
+class _EntradaContada:
+    """Envuelve un DirEntry contando su primer stat() (el que hace la syscall)."""
+
+    def __init__(self, entrada):
+        self._entrada = entrada
+        self._stat = None
+        self.name = entrada.name
+        self.path = entrada.path
+
+    def is_dir(self, **kwargs):
+        return self._entrada.is_dir(**kwargs)
+
+    def is_file(self, **kwargs):
+        return self._entrada.is_file(**kwargs)
+
+    def stat(self, **kwargs):
+        if self._stat is None:
+            contador["stat"] += 1
+            self._stat = self._entrada.stat(**kwargs)
+        return self._stat
+
+
+class _ScandirContado:
+    def __init__(self, it):
+        self._it = it
+
+    def __iter__(self):
+        return (_EntradaContada(e) for e in self._it)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+
+def _instalar_shim():
+    stat, lstat, scandir = os.stat, os.lstat, os.scandir
+
+    def stat_contado(*args, **kwargs):
+        contador["stat"] += 1
+        return stat(*args, **kwargs)
+
+    def lstat_contado(*args, **kwargs):
+        contador["lstat"] += 1
+        return lstat(*args, **kwargs)
+
+    def scandir_contado(*args, **kwargs):
+        contador["scandir"] += 1
+        return _ScandirContado(scandir(*args, **kwargs))
+
+    def restaurar():
+        os.stat, os.lstat, os.scandir = stat, lstat, scandir
+
+    os.stat, os.lstat, os.scandir = stat_contado, lstat_contado, scandir_contado
+    return restaurar
+
+
+def crear_arbol(raiz, total, por_dir, ramas):
+    """Árbol con `ramas` subdirectorios por nivel y `por_dir` archivos por directorio."""
+    creados = 0
+    pendientes = [raiz]
+    while creados < total:
+        actual = pendientes.pop(0)
+        os.makedirs(actual, exist_ok=True)
+        for i in range(min(por_dir, total - creados)):
+            open(os.path.join(actual, f"IMG_{creados + i:06d}.jpg"), "wb").close()
+        creados += min(por_dir, total - creados)
+        pendientes.extend(os.path.join(actual, f"d{i}") for i in range(ramas))
+
+
+def recorrido_legacy(path):
+    # Réplica del recorrido recursivo anterior (sin el pipeline de archivos)
+    os.path.getctime(path)
+    archivos = [entrada.name for entrada in os.scandir(path) if entrada.is_file()]
+    for archivo in archivos:
+        os.path.getctime(os.path.join(path, archivo))
+    with os.scandir(path) as files:
+        subdirectories = [file.path for file in files if file.is_dir()]
+    for subdirectory in subdirectories:
+        recorrido_legacy(subdirectory)
+
+
+def recorrido_walker(path):
+    for directorio in recorrer(path):
+        directorio.stat.st_ctime
+        for entrada in directorio.archivos:
+            entrada.stat().st_ctime
+
+
+MODOS = {"legacy": recorrido_legacy, "walker": recorrido_walker}
+
+
+def medir(modo, raiz):
+    contador.clear()
+    restaurar = _instalar_shim()
+    inicio = time.perf_counter()
+    try:
+        MODOS[modo](raiz)
+    finally:
+        duracion = time.perf_counter() - inicio
+        restaurar()
+    return {"modo": modo, "segundos": round(duracion, 4), **dict(contador), "total": sum(contador.values())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100000, help="archivos del árbol sintético")
+    parser.add_argument("--per-dir", type=int, default=100, help="archivos por directorio")
+    parser.add_argument("--fanout", type=int, default=10, help="subdirectorios por directorio")
+    parser.add_argument("--tree", help="recorrer este árbol en lugar de uno sintético")
+    parser.add_argument("--mode", choices=("legacy", "walker", "both"), default="both")
+    parser.add_argument("--json", action="store_true", help="salida JSON en lugar de tabla")
+    args = parser.parse_args()
+
+    raiz = args.tree
+    temporal = None
+    if raiz is None:
+        temporal = tempfile.mkdtemp(prefix="photosync-bench-walk-")
+        raiz = os.path.join(temporal, "arbol")
+        crear_arbol(raiz, args.files, args.per_dir, args.fanout)
+    try:
+        modos = ("legacy", "walker") if args.mode == "both" else (args.mode,)
+        resultados = [medir(modo, raiz) for modo in modos]
+    finally:
+        if temporal:
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"files": args.files if args.tree is None else None, "resultados": resultados}, indent=2))
+        return
+    print(f"{'modo':<8} {'segundos':>9} {'stat':>9} {'scandir':>9} {'total':>9}")
+    for r in resultados:
+        print(f"{r['modo']:<8} {r['segundos']:>9.3f} {r.get('stat', 0):>9} {r.get('scandir', 0):>9} {r['total']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Generador de corpus sintéticos para los benchmarks de sincronización.
+
+Crea un árbol anidado de directorios con:
+
+- JPEG con fecha EXIF (DateTimeOriginal en el IFD Exif),
+- MP4 con fecha en mvhd y tkhd (exiftool la expone como TrackCreateDate),
+- archivos sin fecha (JPEG JFIF sin EXIF),
+- ráfagas: varias fotos distintas con la misma fecha al segundo, que colisionan en el
+  mismo nombre destino y se resuelven con los sufijos _1, _2, ...
+
+Cada archivo lleva un relleno pseudoaleatorio determinista (--size-kb) para que los
+bytes/s sean significativos y dos archivos nunca tengan el mismo contenido.
+"""
+import os
+import random
+import struct
+from datetime import datetime, timedelta
+
+# Segundos entre 1904-01-01 (época de QuickTime/MP4) y 1970-01-01
+_EPOCA_MP4 = 2082844800
+
+
+def _relleno(rng, tam):
+    return rng.getrandbits(8 * tam).to_bytes(tam, "little") if tam else b""
+
+
+def jpeg_con_exif(fecha, relleno=b""):
+    fecha_exif = fecha.strftime("%Y:%m:%d %H:%M:%S").encode() + b"\0"
+    # TIFF little endian: IFD0 con el puntero al IFD Exif, que contiene DateTimeOriginal
+    ifd0 = struct.pack("<H", 1) + struct.pack("<HHII", 0x8769, 4, 1, 26) + struct.pack("<I", 0)
+    ifd_exif = struct.pack("<H", 1) + struct.pack("<HHII", 0x9003, 2, len(fecha_exif), 44) + struct.pack("<I", 0)
+    tiff = b"II*\0" + struct.pack("<I", 8) + ifd0 + ifd_exif + fecha_exif
+    app1 = b"Exif\0\0" + tiff
+    return b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + _com(relleno) + b"\xff\xd9"
+
+
+def jpeg_sin_fecha(relleno=b""):
+    app0 = b"JFIF\0\x01\x01\0\0\x01\0\x01\0\0"
+    return b"\xff\xd8" + b"\xff\xe0" + struct.pack(">H", len(app0) + 2) + app0 + _com(relleno) + b"\xff\xd9"
+
+
+def _com(datos):
+    # Segmentos COM (comentario) de hasta 65533 bytes con el relleno
+    partes = []
+    for inicio in range(0, len(datos), 65533):
+        trozo = datos[inicio : inicio + 65533]
+        partes.append(b"\xff\xfe" + struct.pack(">H", len(trozo) + 2) + trozo)
+    return b"".join(partes)
+
+
+def _caja(tipo, datos):
+    return struct.pack(">I", 8 + len(datos)) + tipo + datos
+
+
+_MATRIZ = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+def mp4_con_fecha(fecha, relleno=b""):
+    t = int(fecha.timestamp()) + _EPOCA_MP4
+    mvhd = _caja(b"mvhd", struct.pack(">BxxxIIII", 0, t, t, 1000, 1000) + struct.pack(">IH10x", 0x10000, 0x100) + _MATRIZ + b"\0" * 24 + struct.pack(">I", 2))
+    tkhd = _caja(b"tkhd", struct.pack(">BxxBIIIxxxxI", 0, 3, t, t, 1, 1000) + b"\0" * 8 + struct.pack(">hhhxx", 0, 0, 0) + _MATRIZ + struct.pack(">II", 0, 0))
+    moov = _caja(b"moov", mvhd + _caja(b"trak", tkhd))
+    ftyp = _caja(b"ftyp", b"isom\0\0\x02\0isomiso2avc1mp41")
+    return ftyp + moov + _caja(b"mdat", relleno)
+
+
+def generar_corpus(raiz, archivos=1000, tam_kb=16, profundidad=3, ramas=4, por_dir=50, prop_video=0.1, prop_sin_fecha=0.1, prop_rafaga=0.1, semilla=1):
+    """Genera el corpus bajo raiz y devuelve un resumen (archivos por tipo y bytes totales)."""
+    rng = random.Random(semilla)
+    directorios = _directorios(raiz, profundidad, ramas)
+    base = datetime(2024, 1, 1, 8, 0, 0)
+    resumen = {"archivos": 0, "bytes": 0, "jpeg": 0, "mp4": 0, "sin_fecha": 0, "rafaga": 0, "directorios": len(directorios)}
+    n = 0
+    while n < archivos:
+        directorio = directorios[(n // por_dir) % len(directorios)]
+        os.makedirs(directorio, exist_ok=True)
+        fecha = base + timedelta(minutes=n * 7)
+        sorteo = rng.random()
+        if sorteo < prop_rafaga:
+            # Ráfaga: varias fotos con la misma fecha y el mismo nombre de origen en subdirectorios
+            tam_rafaga = min(rng.randint(3, 8), archivos - n)
+            for i in range(tam_rafaga):
+                destino = os.path.join(directorio, f"burst{i}") if i else directorio
+                os.makedirs(destino, exist_ok=True)
+                _escribir(os.path.join(destino, f"IMG_{n:06d}.JPG"), jpeg_con_exif(fecha, _relleno(rng, tam_kb * 1024)), resumen, "rafaga")
+            n += tam_rafaga
+            continue
+        if sorteo < prop_rafaga + prop_video:
+            _escribir(os.path.join(directorio, f"VID_{n:06d}.mp4"), mp4_con_fecha(fecha, _relleno(rng, tam_kb * 1024)), resumen, "mp4")
+        elif sorteo < prop_rafaga + prop_video + prop_sin_fecha:
+            _escribir(os.path.join(directorio, f"descarga_{n:06d}.jpg"), jpeg_sin_fecha(_relleno(rng, tam_kb * 1024)), resumen, "sin_fecha")
+        else:
+            _escribir(os.path.join(directorio, f"IMG_{n:06d}.JPG"), jpeg_con_exif(fecha, _relleno(rng, tam_kb * 1024)), resumen, "jpeg")
+        n += 1
+    return resumen
+
+
+def _directorios(raiz, profundidad, ramas):
+    directorios = [raiz]
+    nivel = [raiz]
+    for _ in range(profundidad):
+        nivel = [os.path.join(d, f"d{i}") for d in nivel for i in range(ramas)]
+        directorios.extend(nivel)
+    return directorios
+
+
+def _escribir(ruta, contenido, resumen, tipo):
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+    resumen["archivos"] += 1
+    resumen["bytes"] += len(contenido)
+    resumen[tipo] += 1
@@ -8,10 +8,13 @@ import subprocess
 import logging
 import fcntl
 import signal
-from datetime import datetime
 from pathlib import Path
 import json
-from photosync.utils import is_hidden_path
+from photosync.metrics import MetricasSincronizacion
+from photosync.scheduler import PlanificadorSincronizacion
+from photosync.snapshot import InstantaneaDirectorios
+from photosync.utils import is_hidden_entry
+from photosync.state import leer_sync_times, ruta_estado_por_defecto
 
 try:
     from watchdog.observers import Observer
@@ -25,18 +28,34 @@ QUIET_SECONDS = int(os.environ.get("QUIET_SECONDS", "60"))  # 60s
 MAX_WAIT_SECONDS = int(os.environ.get("MAX_WAIT_SECONDS", "300"))  # 300s (5 min)
 LOCK_PATH = os.environ.get("LOCK_PATH", os.path.expanduser("~/.cache/photosync/.photosync.lock"))
 RUNNER_PATH = os.environ.get("RUNNER_PATH", os.path.expanduser("~/.local/bin/photosync-run"))
+# Ejecutar las sincronizaciones dentro del watcher (motor residente con recursos calientes)
+# en lugar de lanzar RUNNER_PATH en un proceso nuevo
+RUNNER_IN_PROCESS = os.environ.get("RUNNER_IN_PROCESS", "0").lower() in ("1", "true", "yes", "on")
+# Máximo de directorios cambiados que se pasan al runner; por encima se hace una sincronización completa
+MAX_DIRTY_DIRS = int(os.environ.get("MAX_DIRTY_DIRS", "10000"))
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
 logger = logging.getLogger("photosync-watcher")
 logger.debug("Startup: environ PYTHONPATH=%r", os.environ.get("PYTHONPATH"))
 
+# Intervalo mínimo entre resúmenes INFO de eventos recibidos (el detalle de cada evento va a DEBUG)
+EVENT_LOG_INTERVAL = float(os.environ.get("EVENT_LOG_INTERVAL", "30"))
+
 # State
-first_event_time = None
-last_event_time = None
-debounce_timer = None
 state_lock = threading.Lock()
 # Cuando se ejecuta el runner, suprimir eventos generados por él
 suppress_events = False
+# Debounce en un único hilo (photosync.scheduler). Acumula sin duplicados los directorios
+# cambiados durante la ventana de espera; el runner solo sincroniza esos y sus
+# subdirectorios nuevos. Si algún disparo no sabe qué directorio ha cambiado (polling) o
+# hay más de MAX_DIRTY_DIRS, se pide una sincronización completa. Se crea en main().
+scheduler = None
+# Motor residente (RUNNER_IN_PROCESS); se crea en main()
+engine = None
+# Métricas del watcher (espera evento -> inicio y duración de cada sincronización); se crean en main()
+watcher_metrics = None
+# SIGUSR1 pide perfilar solo la siguiente sincronización (PHOTOSYNC_PROFILE=1 para esa ejecución)
+profile_next_run = False
 
 # Ensure lock dir exists
 Path(LOCK_PATH).parent.mkdir(parents=True, exist_ok=True)
@@ -60,18 +79,17 @@ ALLOWED_EVENT_TYPES = {"modified", "created", "moved", "deleted"}  # events that
 # Polling / fallback configuration
 POLL_INTERVAL = int(os.environ.get("POLL_INTERVAL", "300"))  # seconds (default 5 minutes)
 LAST_SYNC_FILE = os.environ.get("LAST_SYNC_FILE", os.path.expanduser("~/.cache/photosync/.photosync_last.json"))
+# Almacén SQLite de estado que escribe el runner (mismo criterio que photosync.main.ruta_estado)
+STATE_DB_FILE = ruta_estado_por_defecto(LAST_SYNC_FILE, os.environ.get("PHOTOSYNC_STATE_DB_PATH"))
 POLL_PATH = os.environ.get("POLL_PATH", "<poll>")
-POLL_MTIME_DELTA = float(os.environ.get("POLL_MTIME_DELTA", "1.0"))  # seconds tolerance for mtime comparison
+POLL_MTIME_DELTA = float(os.environ.get("POLL_MTIME_DELTA", "1.0"))  # seconds tolerance when comparing with the last sync at startup
 
 
 class EventHandler(FileSystemEventHandler):
     def on_any_event(self, event):
-        # Ignorar directorios; solo archivos
-        if event.is_directory:
-            return
-        # Si estamos suprimiendo eventos (runner en curso), ignorar
-        if suppress_events:
-            logger.debug("(evt) suppressed %s path=%s", getattr(event, "event_type", "unknown"), event.src_path)
+        # Ignorar directorios salvo los creados o movidos (un árbol movido dentro de las
+        # rutas observadas no genera eventos de sus archivos)
+        if event.is_directory and getattr(event, "event_type", None) not in ("created", "moved"):
             return
         # Only process relevant event types (ignore read-only events like opened / closed_no_write)
         ev_type = getattr(event, "event_type", None)
@@ -86,136 +104,155 @@ class EventHandler(FileSystemEventHandler):
             if not getattr(_settings, "PHOTOSYNC_SYNC_HIDDEN", False):
                 src_p = getattr(event, "src_path", None)
                 dst_p = getattr(event, "dest_path", None)
-                if (src_p and is_hidden_path(src_p)) or (dst_p and is_hidden_path(dst_p)):
+                if (src_p and is_hidden_entry(src_p)) or (dst_p and is_hidden_entry(dst_p)):
                     logger.debug("(evt) hidden path ignored: src=%s dest=%s", src_p, dst_p)
                     return
         except Exception:
             logger.debug("(evt) hidden-check failed", exc_info=True)
 
-        try:
-            logger.info("(evt) %s path=%s", ev_type, event.src_path)
-        except Exception:
-            logger.debug("Failed to log event", exc_info=True)
-        schedule_on_event(event.src_path)
-
-
-def schedule_on_event(path):
-    global first_event_time, last_event_time, debounce_timer
-    now = time.time()
-    with state_lock:
-        if first_event_time is None:
-            first_event_time = now
-            logger.info(f"Primer evento detectado: {path}; iniciando ventana de espera.")
-            # Instrumentation: log the window duration values for clarity
-            try:
-                logger.info("(runner schedule) QUIET_SECONDS=%ds MAX_WAIT_SECONDS=%ds", QUIET_SECONDS, MAX_WAIT_SECONDS)
-            except Exception:
-                pass
-        last_event_time = now
-        # Instrumentation: compute scheduled fire time and log window info
-        try:
-            scheduled_fire_at = last_event_time + QUIET_SECONDS
-            ft = datetime.fromtimestamp(first_event_time).isoformat() if first_event_time else None
-            lt = datetime.fromtimestamp(last_event_time).isoformat()
-            sfa = datetime.fromtimestamp(scheduled_fire_at).isoformat()
-            total_since_first = scheduled_fire_at - first_event_time if first_event_time else 0
-            logger.info(
-                "(runner schedule) path=%s first=%s last=%s fire_at=%s total_since_first=%.1fs",
-                path,
-                ft,
-                lt,
-                sfa,
-                total_since_first,
-            )
-        except Exception:
-            logger.debug("Instrumentation failed to format timestamps", exc_info=True)
-        # cancelar timer previo
-        if debounce_timer and debounce_timer.is_alive():
-            debounce_timer.cancel()
-        # Si excedimos MAX_WAIT desde el primer evento, disparar ya
-        if (first_event_time is not None) and (now - first_event_time >= MAX_WAIT_SECONDS):
-            logger.info("MAX_WAIT_SECONDS alcanzado; disparando sincronización inmediata.")
-            threading.Thread(target=trigger_sync, args=("max_wait",), daemon=True).start()
+        # Con una sincronización en curso los eventos no se descartan: quedan pendientes para
+        # la sincronización de seguimiento, salvo los que genera el propio runner
+        during_run = suppress_events
+        dirs = _event_dirs(event, during_run)
+        if not dirs:
+            logger.debug("(evt) suppressed %s path=%s", ev_type, event.src_path)
             return
-        # programar maybe_fire tras QUIET_SECONDS
-        debounce_timer = threading.Timer(QUIET_SECONDS, maybe_fire)
-        debounce_timer.daemon = True
-        debounce_timer.start()
+        logger.debug("(evt) %s path=%s%s", ev_type, event.src_path, " (durante la sincronización)" if during_run else "")
+        schedule_on_event(event.src_path, dirs)
+
+
+def _runner_output_roots():
+    # Directorios donde escribe el runner (biblioteca destino y enlaces sin fecha)
+    global _output_roots
+    if _output_roots is None:
+        from photosync import settings as _settings
+
+        roots = (getattr(_settings, "TARGET_PATH", None), getattr(_settings, "TAGNAME_NOTFOUND_PATH", None))
+        _output_roots = tuple(os.path.abspath(os.path.expanduser(r)).rstrip(os.sep) + os.sep for r in roots if r)
+    return _output_roots
+
+
+_output_roots = None
+
+
+def _event_dirs(event, during_run=False):
+    # Directorios afectados por un evento: el que contiene cada ruta y, si es un
+    # directorio creado o movido, también él mismo. Se descartan las rutas bajo
+    # TARGET_PATH/TAGNAME_NOTFOUND_PATH (escrituras del runner). Durante una sincronización
+    # tampoco cuentan los borrados ni el origen de un movimiento (PHOTOSYNC_PLACE_MODE=move).
+    ev_type = getattr(event, "event_type", None)
+    if during_run and ev_type == "deleted":
+        return set()
+    paths = [getattr(event, "dest_path", None)] if during_run and ev_type == "moved" else [getattr(event, "src_path", None), getattr(event, "dest_path", None)]
+    dirs = set()
+    for p in paths:
+        if not p:
+            continue
+        p = os.path.abspath(os.fsdecode(p))
+        if (p + os.sep).startswith(_runner_output_roots()):
+            continue
+        dirs.add(os.path.dirname(p))
+        if event.is_directory:
+            dirs.add(p)
+    return dirs
 
 
-def maybe_fire():
-    global first_event_time, last_event_time, debounce_timer
-    with state_lock:
-        if last_event_time is None:
-            return
-        now = time.time()
-        if now - last_event_time >= QUIET_SECONDS:
-            logger.info("Quiet period completado; disparando sincronización.")
-            threading.Thread(target=trigger_sync, args=("quiet",), daemon=True).start()
-        else:
-            remaining = QUIET_SECONDS - (now - last_event_time)
-            # Instrumentation: log why we re-scheduled the timer
-            try:
-                ft = datetime.fromtimestamp(first_event_time).isoformat() if first_event_time else None
-                lt = datetime.fromtimestamp(last_event_time).isoformat()
-                logger.info("(runner schedule) reprogramando maybe_fire; remaining=%.1fs first=%s last=%s", remaining, ft, lt)
-            except Exception:
-                logger.debug("Instrumentation maybe_fire failed", exc_info=True)
-            debounce_timer = threading.Timer(remaining, maybe_fire)
-            debounce_timer.daemon = True
-            debounce_timer.start()
+def schedule_on_event(path, dirs=None):
+    """Programa una sincronización. dirs son los directorios cambiados; None pide una completa."""
+    scheduler.notificar(path, dirs)
 
 
 def trigger_sync(reason="manual"):
     """
     Intenta adquirir lock no bloqueante y ejecutar el runner.
     Mantiene el lock hasta que el runner termine.
-    Durante la ejecución del runner se suprimen eventos generados por el propio runner.
+    Durante la ejecución del runner se suprimen eventos generados por el propio runner;
+    el resto quedan pendientes para una sincronización de seguimiento.
+    Devuelve False si no se pudo tomar el lock (otra sincronización lo tiene o ha fallado
+    abrirlo) o si la sincronización ha fallado: los cambios pendientes se conservan (o se
+    devuelven al scheduler) y el scheduler reintenta tras otra ventana de espera.
     """
-    global first_event_time, last_event_time, suppress_events
-    # Instrumentation: include timestamps when attempting acquisition
-    try:
-        ft = datetime.fromtimestamp(first_event_time).isoformat() if first_event_time else None
-        lt = datetime.fromtimestamp(last_event_time).isoformat() if last_event_time else None
-        logger.info("Trigger sincronización (reason=%s) intentando adquirir lock %s (first=%s last=%s)", reason, LOCK_PATH, ft, lt)
-    except Exception:
-        logger.info(f"Trigger sincronización (reason={reason}) intentando adquirir lock {LOCK_PATH}")
+    global suppress_events, profile_next_run, engine
+    logger.info(f"Trigger sincronización (reason={reason}) intentando adquirir lock {LOCK_PATH}")
     try:
         lock_fd = open(LOCK_PATH, "w")
     except Exception as e:
         logger.error(f"No se pudo abrir el fichero de lock: {e}")
-        return
+        return False
     try:
         fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
     except BlockingIOError:
-        logger.info("Otra sincronización está en curso; saltando trigger.")
+        # Los cambios pendientes se conservan: el scheduler reintenta tras otra ventana
+        logger.info("Otra sincronización está en curso; se reintentará más tarde.")
         lock_fd.close()
-        return
+        return False
     except Exception as e:
         logger.error(f"Error al adquirir lock: {e}")
         lock_fd.close()
-        return
+        return False
 
     # Run runner while holding the lock. Suppress events generated by the runner.
+    spool_path = None
+    sync_start = time.monotonic()
+    sync_failed = True
+    dirs, full = [], False
     try:
-        # Mark suppression so on_any_event ignores runner-generated events
+        # Mark suppression so on_any_event ignores runner-generated events; take the set of
+        # changed directories collected so far
         try:
             with state_lock:
                 suppress_events = True
         except Exception:
             # Fallback: set without lock if something goes wrong
             suppress_events = True
-
-        if not os.path.exists(RUNNER_PATH) or not os.access(RUNNER_PATH, os.X_OK):
+        dirs, full = scheduler.tomar_pendientes()
+        if not dirs and not full:
+            # Los cambios ya los tomó la sincronización anterior: nada que hacer (y una
+            # lista vacía no debe acabar en una sincronización completa)
+            logger.info("Sin cambios pendientes; no se sincroniza.")
+            return True
+        profile, profile_next_run = profile_next_run, False
+        if profile:
+            logger.info("Perfilando esta sincronización (SIGUSR1)")
+        if watcher_metrics is not None and scheduler.ultima_espera is not None:
+            watcher_metrics.observar("event_to_sync_start", scheduler.ultima_espera, archivos=len(dirs))
+        sync_start = time.monotonic()
+
+        if engine is not None and not engine.en_marcha():
+            logger.error("El motor residente se ha detenido; se usará %s", RUNNER_PATH)
+            engine = None
+        if engine is not None:
+            # El lock sigue tomado por este hilo mientras el motor sincroniza en el suyo
+            if dirs and not full:
+                logger.info(f"Sincronizando en el motor residente ({len(dirs)} directorios cambiados)")
+            else:
+                logger.info("Sincronizando en el motor residente (sincronización completa)")
+            engine.ejecutar(dirs if not full else None, perfil="1" if profile else None)
+            sync_failed = False
+            logger.info("Motor residente: sincronización finalizada")
+        elif not os.path.exists(RUNNER_PATH) or not os.access(RUNNER_PATH, os.X_OK):
             logger.error(f"Runner no encontrado o no ejecutable: {RUNNER_PATH}")
         else:
-            logger.info(f"Lanzando runner: {RUNNER_PATH}")
-            proc = subprocess.run([sys.executable, RUNNER_PATH])
+            cmd = [sys.executable, RUNNER_PATH]
+            if dirs and not full:
+                spool_path = _write_spool(dirs)
+                cmd += ["--dirs-from", spool_path]
+                logger.info(f"Lanzando runner: {RUNNER_PATH} ({len(dirs)} directorios cambiados)")
+            else:
+                logger.info(f"Lanzando runner: {RUNNER_PATH} (sincronización completa)")
+            env = dict(os.environ, PHOTOSYNC_PROFILE="1") if profile else None
+            proc = subprocess.run(cmd, env=env)
+            sync_failed = proc.returncode != 0
             logger.info(f"Runner finalizado con código {proc.returncode}")
     except Exception as e:
         logger.exception(f"Error ejecutando el runner: {e}")
     finally:
         # Ensure we always clear suppression and release the lock
+        if spool_path:
+            try:
+                os.remove(spool_path)
+            except OSError:
+                pass
         try:
             lock_fd.close()  # libera el lock
             logger.info("Lock liberado.")
@@ -224,26 +261,70 @@ def trigger_sync(reason="manual"):
         try:
             with state_lock:
                 suppress_events = False
-                first_event_time = None
-                last_event_time = None
         except Exception:
             # Best effort cleanup
             suppress_events = False
-            first_event_time = None
-            last_event_time = None
+    _record_sync_metrics(time.monotonic() - sync_start, sync_failed)
+    if sync_failed:
+        # Los directorios tomados no se han sincronizado: devolverlos para el reintento
+        scheduler.devolver_pendientes(dirs, full)
+        logger.warning("La sincronización ha fallado; se reintentará tras otra ventana de espera.")
+        return False
+    # Si han llegado cambios durante la ejecución, el scheduler lanza ahora el seguimiento
+    return True
+
+
+def _record_sync_metrics(duration, failed):
+    # Duración de la sincronización y exportación de las métricas del watcher
+    if watcher_metrics is None:
+        return
+    watcher_metrics.observar("sync", duration, archivos=0, error=failed)
+    try:
+        from photosync import settings as _settings
+
+        metrics_dir = getattr(_settings, "PHOTOSYNC_METRICS_DIR", "")
+        if metrics_dir:
+            watcher_metrics.exportar(metrics_dir)
+    except Exception:
+        logger.debug("No se pudieron escribir las métricas del watcher", exc_info=True)
+
+
+def _write_spool(dirs):
+    # Lista de directorios cambiados para el runner (uno por línea), junto al lock
+    spool_path = os.path.join(os.path.dirname(LOCK_PATH), f"dirty-{os.getpid()}.list")
+    with open(spool_path, "w", encoding="utf-8") as f:
+        for d in dirs:
+            f.write(d + "\n")
+    return spool_path
 
 
 def handle_exit(signum, frame):
     logger.info(f"Signal {signum} recibido, cerrando watcher.")
     try:
-        if debounce_timer and debounce_timer.is_alive():
-            debounce_timer.cancel()
+        if scheduler is not None:
+            scheduler.detener(timeout=1)
     except Exception:
         pass
+    try:
+        if engine is not None:
+            # Cierra la sesión de exiftool y confirma el almacén de estado
+            engine.detener(timeout=30)
+    except Exception:
+        logger.debug("No se pudo detener el motor residente", exc_info=True)
     sys.exit(0)
 
 
+def handle_profile_request(signum, frame):
+    global profile_next_run
+    profile_next_run = True
+    logger.info("Signal %s recibido: se perfilará la siguiente sincronización.", signum)
+
+
 def _load_last_sync():
+    # Lectura en solo lectura del almacén SQLite (WAL: no bloquea al runner mientras escribe);
+    # si todavía no existe (sin migrar), se lee el JSON antiguo
+    if os.path.exists(STATE_DB_FILE):
+        return leer_sync_times(STATE_DB_FILE)
     try:
         with open(LAST_SYNC_FILE, "r") as f:
             return json.load(f)
@@ -251,86 +332,67 @@ def _load_last_sync():
         return {}
 
 
-def _get_dir_mtime(path):
-    try:
-        # Use modification time of the directory inode
-        return os.path.getmtime(path)
-    except Exception:
-        return 0
-
-
 def polling_thread(watch_paths):
-    """Thread que compara tiempos en LAST_SYNC_FILE y programa una sincronización si detecta cambios.
+    """Thread de polling para sistemas de archivos sin inotify (NFS/SMB).
 
-    Itera las entradas de LAST_SYNC_FILE (path -> last_record) y compara la mtime
-    del filesystem con el timestamp guardado. No filtra por `watch_paths`.
+    Mantiene en memoria una instantánea (mtime_ns, inode) de los directorios de cada
+    árbol de `watch_paths` (photosync.snapshot). Al arrancar programa los directorios
+    cambiados desde su última sincronización (o nunca sincronizados); después, en cada
+    ciclo, un stat por directorio detecta los cambiados y los subdirectorios nuevos y se
+    pasan todos al scheduler como sincronización dirigida.
     """
+    from photosync import settings as _settings
+
+    snapshot = InstantaneaDirectorios(watch_paths, incluir_ocultos=getattr(_settings, "PHOTOSYNC_SYNC_HIDDEN", False))
+    try:
+        inicio = time.monotonic()
+        pendientes = snapshot.construir(_load_last_sync(), POLL_MTIME_DELTA)
+        logger.info("(polling) instantánea de %d directorios en %.1fs; %d pendientes de sincronizar", len(snapshot), time.monotonic() - inicio, len(pendientes))
+        if pendientes:
+            schedule_on_event(POLL_PATH, pendientes)
+    except Exception:
+        logger.exception("(polling) no se pudo construir la instantánea inicial")
+
     while True:
-        logger.info("(polling) iteration start; LAST_SYNC_FILE=%s POLL_INTERVAL=%ds POLL_MTIME_DELTA=%.1f", LAST_SYNC_FILE, POLL_INTERVAL, POLL_MTIME_DELTA)
+        time.sleep(POLL_INTERVAL)
         try:
-            last_sync = _load_last_sync()
-            # last_sync is expected to be a dict mapping paths -> timestamp strings/numbers
-            found_change = False
-            for p, last_record in last_sync.items():
-                try:
-                    p_abs = os.path.abspath(os.path.realpath(p))
-                    # Ignore the LAST_SYNC_FILE itself if present as a key
-                    if p_abs == os.path.abspath(os.path.realpath(LAST_SYNC_FILE)):
-                        continue
-                    if not os.path.exists(p_abs):
-                        continue
-
-                    # Parse stored timestamp in a tolerant way
-                    prev_ts = 0.0
-                    if isinstance(last_record, str):
-                        # Try ISO format first
-                        try:
-                            prev_dt = datetime.fromisoformat(last_record)
-                            prev_ts = time.mktime(prev_dt.timetuple())
-                        except Exception:
-                            # Try common 'YYYY-MM-DD HH:MM:SS' format
-                            try:
-                                prev_dt = datetime.strptime(last_record, "%Y-%m-%d %H:%M:%S")
-                                prev_ts = time.mktime(prev_dt.timetuple())
-                            except Exception:
-                                try:
-                                    prev_ts = float(last_record)
-                                except Exception:
-                                    prev_ts = 0.0
-                    elif isinstance(last_record, (int, float)):
-                        prev_ts = float(last_record)
-                    else:
-                        prev_ts = 0.0
-
-                    # Ignore hidden paths from LAST_SYNC_FILE if hidden sync is disabled
-                    try:
-                        from photosync import settings as _settings
-
-                        if not getattr(_settings, "PHOTOSYNC_SYNC_HIDDEN", False) and is_hidden_path(p_abs):
-                            logger.debug("(polling) ignoring hidden path from LAST_SYNC_FILE: %s", p_abs)
-                            continue
-                    except Exception:
-                        logger.debug("(polling) hidden-check failed for %s", p_abs, exc_info=True)
-
-                    mtime = _get_dir_mtime(p_abs)
-                    # Apply a small tolerance to avoid spurious detections due to clock/precision differences
-                    if mtime > (prev_ts + POLL_MTIME_DELTA):
-                        logger.info("(runner schedule) polling detected newer mtime for %s (mtime=%.0f prev=%.0f delta=%.1f)", p_abs, mtime, prev_ts, POLL_MTIME_DELTA)
-                        schedule_on_event(POLL_PATH)
-                        found_change = True
-                        break  # programamos solo una vez por ciclo
-                except Exception:
-                    logger.debug("polling: error comprobando %s", p, exc_info=True)
-            if not found_change:
-                logger.info("(polling) no changes detected this iteration")
+            inicio = time.monotonic()
+            cambiados = snapshot.comparar()
+            if cambiados:
+                logger.info("(runner schedule) polling detectó %d directorios cambiados (%.1fs)", len(cambiados), time.monotonic() - inicio)
+                schedule_on_event(POLL_PATH, cambiados)
+            else:
+                logger.debug("(polling) sin cambios en %d directorios (%.1fs)", len(snapshot), time.monotonic() - inicio)
         except Exception:
             logger.debug("polling: error general", exc_info=True)
-        time.sleep(POLL_INTERVAL)
 
 
 def main():
+    global engine, scheduler, watcher_metrics
     signal.signal(signal.SIGTERM, handle_exit)
     signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGUSR1, handle_profile_request)
+
+    watcher_metrics = MetricasSincronizacion(prefijo="photosync_watcher")
+
+    scheduler = PlanificadorSincronizacion(
+        trigger_sync,
+        QUIET_SECONDS,
+        MAX_WAIT_SECONDS,
+        max_dirs=MAX_DIRTY_DIRS,
+        intervalo_log=EVENT_LOG_INTERVAL,
+        logger=logger,
+    ).iniciar()
+
+    if RUNNER_IN_PROCESS:
+        try:
+            from photosync.engine import MotorResidente
+
+            engine = MotorResidente().iniciar()
+            logger.info("Motor residente iniciado; las sincronizaciones se ejecutan dentro del watcher.")
+        except Exception:
+            logger.exception("No se pudo iniciar el motor residente; se usará %s", RUNNER_PATH)
+            engine = None
 
     # Try to read watch paths with retries (allows mounts and environment to become available)
     retries = int(os.environ.get("WATCHER_READ_RETRIES", "12"))
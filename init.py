@@ -1,4 +1,5 @@
 from photosync import settings, main
+from photosync.profiling import perfilar
 
 if __name__ == "__main__":
     main.logger.info("Photosync iniciado")
@@ -15,7 +16,9 @@ if __name__ == "__main__":
         main.logger.error("No se ha encontrado el fichero de los tiempos de la última sincronización")
         # exit()
 
-    for path in settings.SOURCE_PATHS:
-        main.process_folder(path)
+    # Una sola ejecución (y un solo archivo de métricas) para todas las rutas
+    with perfilar("init", main.logpath, main.handler.backupCount, logger=main.logger), main.metricas_ejecucion():
+        for path in settings.SOURCE_PATHS:
+            main.process_folder(path)
 
     main.logger.info("Photosync finalizado")
@@ -0,0 +1,154 @@
+import errno
+import os
+import shutil
+import tempfile
+import threading
+from .hashing import crear_hasher
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no disponible fuera de Unix
+    fcntl = None
+
+# Tamaño del buffer de copia
+TAM_BUFFER_COPIA = 1024 * 1024
+
+# ioctl FICLONE de Linux (_IOW(0x94, 9, int)): clona los extents del origen (Btrfs, XFS)
+FICLONE = 0x40049409
+
+# Estrategias de copia, de la más a la menos eficiente
+REFLINK = "reflink"
+COPY_FILE_RANGE = "copy_file_range"
+USERSPACE = "userspace"
+ESTRATEGIAS = (REFLINK, COPY_FILE_RANGE, USERSPACE)
+
+# Modos de colocación en el destino (PHOTOSYNC_PLACE_MODE)
+MODO_COPY = "copy"
+MODO_LINK = "link"
+MODO_MOVE = "move"
+MODOS_COLOCACION = (MODO_COPY, MODO_LINK, MODO_MOVE)
+
+# errno que indican que el sistema de archivos no soporta la estrategia (no un fallo de E/S)
+_ERRNOS_NO_SOPORTADO = {errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY}
+
+# Primera estrategia que funcionó para cada par (dispositivo origen, dispositivo destino)
+_estrategias = {}
+_estrategias_lock = threading.Lock()
+
+
+class _NoSoportado(Exception):
+    pass
+
+
+def _copiar_atomico(origen, destino, escribir):
+    # Escribe en un temporal oculto del directorio destino y lo renombra al terminar
+    directorio, nombre = os.path.split(destino)
+    fd, temporal = tempfile.mkstemp(prefix=f".{nombre}.", suffix=".tmp", dir=directorio or ".")
+    try:
+        with open(origen, "rb") as src, os.fdopen(fd, "wb") as dst:
+            resultado = escribir(src, dst)
+        shutil.copystat(origen, temporal)
+        os.replace(temporal, destino)
+    except BaseException:
+        try:
+            os.unlink(temporal)
+        except OSError:
+            pass
+        raise
+    return resultado
+
+
+def _reflink(src, dst):
+    if fcntl is None:
+        raise _NoSoportado()
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError as e:
+        if e.errno in _ERRNOS_NO_SOPORTADO:
+            raise _NoSoportado() from e
+        raise
+    return None
+
+
+def _copy_file_range(src, dst):
+    if not hasattr(os, "copy_file_range"):
+        raise _NoSoportado()
+    restante = os.fstat(src.fileno()).st_size
+    while restante > 0:
+        try:
+            n = os.copy_file_range(src.fileno(), dst.fileno(), min(restante, 1 << 30))
+        except OSError as e:
+            if e.errno in _ERRNOS_NO_SOPORTADO:
+                raise _NoSoportado() from e
+            raise
+        if n == 0:
+            # Algunos sistemas de archivos devuelven 0 en lugar de un error
+            raise _NoSoportado()
+        restante -= n
+    return None
+
+
+def _copiar_y_hashear(src, dst):
+    hasher = crear_hasher()
+    buffer = bytearray(TAM_BUFFER_COPIA)
+    vista = memoryview(buffer)
+    while n := src.readinto(buffer):
+        hasher.update(vista[:n])
+        dst.write(vista[:n])
+    return hasher.hexdigest()
+
+
+_ESCRITORES = {REFLINK: _reflink, COPY_FILE_RANGE: _copy_file_range, USERSPACE: _copiar_y_hashear}
+
+
+def copiar_con_hash(origen, destino):
+    """Copia ``origen`` a ``destino`` leyendo el origen una sola vez y devuelve su hash.
+
+    Cada bloque leído se pasa al hash y se escribe en un temporal oculto del directorio
+    destino, que se renombra atómicamente a ``destino`` al terminar (con los metadatos
+    del origen, como shutil.copy2). Si la copia falla el temporal se elimina.
+    """
+    return _copiar_atomico(origen, destino, _copiar_y_hashear)
+
+
+def copiar_archivo(origen, destino):
+    """Copia ``origen`` a ``destino`` con la vía más rápida que soporte el par de dispositivos.
+
+    Prueba reflink (FICLONE), luego ``os.copy_file_range`` y por último la copia en espacio
+    de usuario con hash (copiar_con_hash). La estrategia que funciona se recuerda para el
+    par (st_dev origen, st_dev destino). Devuelve ``(estrategia, digest)``; ``digest`` es
+    None cuando la copia la hizo el kernel y el contenido no pasó por el proceso.
+    """
+    clave = (os.stat(origen).st_dev, os.stat(os.path.dirname(destino) or ".").st_dev)
+    with _estrategias_lock:
+        inicial = _estrategias.get(clave, ESTRATEGIAS[0])
+    for estrategia in ESTRATEGIAS[ESTRATEGIAS.index(inicial) :]:
+        try:
+            digest = _copiar_atomico(origen, destino, _ESCRITORES[estrategia])
+        except _NoSoportado:
+            continue
+        with _estrategias_lock:
+            _estrategias[clave] = estrategia
+        return estrategia, digest
+    raise AssertionError("la copia en espacio de usuario no puede ser no soportada")
+
+
+def colocar_archivo(origen, destino, modo=MODO_COPY):
+    """Coloca ``origen`` en ``destino`` según ``modo`` y devuelve ``(estrategia, digest)``.
+
+    ``link`` crea un enlace duro y ``move`` renombra el origen; ambos son O(1) pero solo
+    son posibles dentro del mismo sistema de archivos, así que si el st_dev del origen y
+    del directorio destino difieren (o el enlace/renombrado falla por EXDEV) se copia
+    con copiar_archivo.
+    """
+    if modo in (MODO_LINK, MODO_MOVE) and os.stat(origen).st_dev == os.stat(os.path.dirname(destino) or ".").st_dev:
+        try:
+            if modo == MODO_LINK:
+                os.link(origen, destino)
+            else:
+                os.rename(origen, destino)
+            return modo, None
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EOPNOTSUPP):
+                raise
+    return copiar_archivo(origen, destino)
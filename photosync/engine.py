@@ -0,0 +1,158 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from . import settings
+from . import main
+from .profiling import perfilar
+
+logger = logging.getLogger(__name__)
+
+
+# Rutas de origen configuradas (SOURCE_PATHS puede ser una cadena o una lista)
+def rutas_origen():
+    sp = getattr(settings, "SOURCE_PATHS", ())
+    if isinstance(sp, str):
+        return [sp]
+    return list(sp)
+
+
+def ejecutar_sincronizacion(dirs=None):
+    """Ejecuta una sincronización: completa de todos los SOURCE_PATHS o, si se indican dirs,
+    dirigida a esos directorios y sus subdirectorios nuevos (process_changed_dirs).
+
+    Todas las rutas comparten los mismos recursos de sincronización: los que ya estén
+    abiertos (p. ej. los del motor residente) o unos abiertos para esta ejecución.
+    """
+    paths = rutas_origen()
+    if not paths:
+        main.logger.warning("No hay rutas de origen definidas (PHOTOSYNC_SOURCE_PATHS/settings.SOURCE_PATHS); no se realiza sincronización.")
+        return
+
+    with main.metricas_ejecucion(), main.recursos_sincronizacion():
+        if dirs:
+            main.logger.info("Sincronización dirigida de %d directorios", len(dirs))
+            try:
+                main.process_changed_dirs(dirs, paths)
+            except Exception:
+                main.logger.exception("Error en la sincronización dirigida")
+            return
+
+        for p in paths:
+            if not os.path.exists(p):
+                main.logger.warning(f"Ruta de origen no existe: {p}")
+                continue
+            try:
+                main.logger.info(f"Iniciando sincronización: {p}")
+                main.process_folder(p)
+            except Exception:
+                main.logger.exception(f"Error sincronizando: {p}")
+
+
+class MotorResidente:
+    """Motor de sincronización que vive dentro del watcher.
+
+    Un hilo dedicado abre una sola vez los recursos de sincronización (sesión de exiftool,
+    índice de hashes, almacén de estado y ejecutores) y los mantiene calientes entre
+    ejecuciones, en lugar de lanzar un proceso photosync-run en frío por cada disparo. La
+    exclusión mutua con ejecuciones manuales sigue siendo el flock de quien llama.
+    """
+
+    def __init__(self):
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._listo = threading.Event()
+        self._error_inicio = None
+        self.ejecuciones = 0
+
+    # Arranca el hilo del motor y espera a que abra sus recursos. Si falla al arrancar lanza
+    # RuntimeError (con la causa) para que quien llama use photosync-run en su lugar.
+    def iniciar(self):
+        if self._hilo is None:
+            self._listo.clear()
+            self._error_inicio = None
+            self._hilo = threading.Thread(target=self._bucle, name="photosync-engine", daemon=True)
+            self._hilo.start()
+            self._listo.wait()
+            if self._error_inicio is not None:
+                self._hilo.join()
+                self._hilo = None
+                raise RuntimeError("El motor residente no pudo arrancar") from self._error_inicio
+        return self
+
+    def en_marcha(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    # Encola una sincronización y espera a que termine. dirs=None hace una completa; perfil
+    # fuerza un modo de perfilado solo para esta ejecución (por defecto PHOTOSYNC_PROFILE).
+    def ejecutar(self, dirs=None, timeout=None, perfil=None):
+        if not self.en_marcha():
+            raise RuntimeError("El motor residente no está en marcha")
+        futuro = Future()
+        self._cola.put((dirs, perfil, futuro))
+        return futuro.result(timeout)
+
+    # Termina el hilo del motor y cierra sus recursos (confirma el almacén de estado)
+    def detener(self, timeout=None):
+        if self._hilo is not None and self._hilo.is_alive():
+            self._cola.put(None)
+            self._hilo.join(timeout)
+        self._hilo = None
+
+    def _bucle(self):
+        try:
+            # Primera carga como en photosync-run (incluye la migración del antiguo JSON)
+            self._cargar_estado()
+            with main.recursos_sincronizacion():
+                self._listo.set()
+                while (tarea := self._cola.get()) is not None:
+                    dirs, perfil, futuro = tarea
+                    if not futuro.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with perfilar("engine", main.logpath, main.handler.backupCount, modo=perfil, logger=main.logger):
+                            self._sincronizar(dirs)
+                    except BaseException as e:
+                        futuro.set_exception(e)
+                    else:
+                        futuro.set_result(None)
+        except BaseException as e:
+            if self._listo.is_set():
+                raise
+            # Fallo al arrancar: lo recoge iniciar()
+            self._error_inicio = e
+        finally:
+            self._listo.set()
+
+    def _sincronizar(self, dirs):
+        self.ejecuciones += 1
+        # Otra ejecución (p. ej. photosync-run manual) puede haber avanzado el estado
+        # mientras el motor esperaba: se relee de su almacén, que ya está abierto
+        if main.estado_sync is not None:
+            main.sync_times = main.estado_sync.cargar()
+        else:
+            self._cargar_estado()
+        # Lo mismo con los nombres de la biblioteca destino cacheados en la ejecución anterior
+        main.reiniciar_cache_destino()
+        try:
+            ejecutar_sincronizacion(dirs)
+        finally:
+            # El motor no cierra el almacén entre ejecuciones: confirmar para que el watcher
+            # y las ejecuciones manuales vean el estado al liberar el lock
+            if main.estado_sync is not None:
+                main.estado_sync.confirmar()
+
+    def _cargar_estado(self):
+        try:
+            main.sync_times = main.load_sync_times()
+        except Exception:
+            logger.warning("No se pudo cargar el estado de sincronización; se parte de cero")
+            main.sync_times = {}
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
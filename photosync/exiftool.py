@@ -0,0 +1,133 @@
+import os
+import queue
+import subprocess
+import threading
+import logging
+
+# Línea de fin de respuesta que exiftool imprime tras cada -executeN
+_READY_FMT = "{{ready{0}}}"
+# Centinela que el hilo lector encola cuando exiftool cierra stdout (proceso muerto)
+_EOF = None
+
+
+class ErrorExiftool(Exception):
+    """Error de comunicación con el proceso exiftool persistente."""
+
+
+class SesionExiftool:
+    """Proceso exiftool persistente (``-stay_open True -@ -``) reutilizado entre archivos.
+
+    Cada petición se envía como argumentos por stdin terminados en ``-executeN`` y la
+    respuesta se lee hasta la línea ``{readyN}``. Si el proceso muere o no responde en
+    ``timeout`` segundos se reinicia y se reintenta la petición (watchdog).
+    """
+
+    def __init__(self, exiftool_path, timeout=60.0, reintentos=1, args_comunes=("-charset", "filename=utf8"), logger=None):
+        self.exiftool_path = exiftool_path
+        self.timeout = timeout
+        self.reintentos = reintentos
+        self.args_comunes = tuple(args_comunes)
+        self._proc = None
+        self._lineas = None
+        self._contador = 0
+        self._lock = threading.Lock()
+        self.logger = logger or logging.getLogger(__name__)
+        # Número de procesos lanzados (1 en una ejecución sin fallos)
+        self.arranques = 0
+
+    # Arranca el proceso exiftool si no está vivo
+    def iniciar(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return
+        self._detener(forzar=True)
+        cmd = [self.exiftool_path, "-stay_open", "True", "-@", "-"]
+        if self.args_comunes:
+            cmd += ["-common_args", *self.args_comunes]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._lineas = queue.Queue()
+        threading.Thread(target=self._leer_stdout, args=(self._proc.stdout, self._lineas), daemon=True).start()
+        self.arranques += 1
+        self.logger.debug("exiftool -stay_open iniciado (pid=%s)", self._proc.pid)
+
+    @staticmethod
+    def _leer_stdout(stdout, lineas):
+        try:
+            for linea in iter(stdout.readline, b""):
+                lineas.put(linea.decode("utf-8", errors="replace"))
+        except Exception:
+            pass
+        finally:
+            lineas.put(_EOF)
+
+    def ejecutar(self, *args):
+        """Ejecuta exiftool con ``args`` en el proceso persistente y devuelve su salida (texto)."""
+        for arg in args:
+            if "\n" in arg:
+                raise ValueError(f"Argumento no soportado por exiftool -@: {arg!r}")
+        with self._lock:
+            intento = 0
+            while True:
+                try:
+                    return self._ejecutar(args)
+                except ErrorExiftool:
+                    # Matar el proceso para que la siguiente petición arranque uno nuevo
+                    self._detener(forzar=True)
+                    if intento >= self.reintentos:
+                        raise
+                    intento += 1
+                    self.logger.warning("exiftool no responde; reiniciando proceso (intento %d)", intento)
+
+    def _ejecutar(self, args):
+        self.iniciar()
+        self._contador += 1
+        ready = _READY_FMT.format(self._contador)
+        peticion = b"".join(os.fsencode(arg) + b"\n" for arg in args) + f"-execute{self._contador}\n".encode()
+        try:
+            self._proc.stdin.write(peticion)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ErrorExiftool(f"No se pudo escribir en exiftool: {e}") from e
+
+        salida = []
+        while True:
+            try:
+                linea = self._lineas.get(timeout=self.timeout)
+            except queue.Empty:
+                raise ErrorExiftool(f"exiftool no respondió en {self.timeout}s")
+            if linea is _EOF:
+                raise ErrorExiftool("exiftool terminó inesperadamente")
+            if linea.rstrip("\r\n") == ready:
+                return "".join(salida)
+            salida.append(linea)
+
+    def _detener(self, forzar=False):
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            if not forzar and proc.poll() is None:
+                proc.stdin.write(b"-stay_open\nFalse\n")
+                proc.stdin.flush()
+                proc.wait(timeout=self.timeout)
+        except Exception:
+            self.logger.debug("exiftool no se cerró limpiamente", exc_info=True)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            for stream in (proc.stdin, proc.stdout):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+
+    # Cierra el proceso enviando -stay_open False
+    def cerrar(self):
+        with self._lock:
+            self._detener()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+
+
+class IndiceHashes:
+    """Índice persistente (SQLite) de hashes de los archivos de la biblioteca destino.
+
+    Cada ruta guarda (size, mtime_ns, inode, algoritmo, digest). Mientras el stat del
+    archivo no cambie y el algoritmo sea el configurado, el hash se sirve del índice sin
+    volver a leer el archivo; si no, se recalcula con ``calcular`` y se actualiza la fila
+    (invalidación por stat). Un índice SQL por (algoritmo, digest) permite buscar un
+    contenido en toda la biblioteca sin cargar el índice en memoria (deduplicación global).
+
+    Con ``solo_lectura`` (DRY_RUN) se abre un índice ya existente sin crearlo ni migrarlo
+    y no se escribe nada: los hashes que falten se calculan sin guardarse.
+    """
+
+    def __init__(self, ruta_db, calcular, algoritmo="sha256", solo_lectura=False):
+        self.ruta_db = ruta_db
+        self.calcular = calcular
+        self.algoritmo = algoritmo
+        self.solo_lectura = solo_lectura
+        self._lock = threading.Lock()
+        if solo_lectura:
+            self._conn = sqlite3.connect(f"file:{ruta_db}?mode=ro", uri=True, check_same_thread=False, isolation_level=None)
+            columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(hashes)")}
+            if "algoritmo" not in columnas:
+                self._conn.close()
+                raise sqlite3.OperationalError(f"{ruta_db}: índice sin migrar; no se puede usar en solo lectura")
+        else:
+            if os.path.dirname(ruta_db):
+                os.makedirs(os.path.dirname(ruta_db), exist_ok=True)
+            self._conn = sqlite3.connect(ruta_db, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._crear_esquema()
+        # Contadores de la ejecución actual
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _crear_esquema(self):
+        columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(hashes)")}
+        if "sha256" in columnas:
+            # Índices anteriores solo guardaban SHA256: etiquetar sus filas con el algoritmo
+            self._conn.execute("ALTER TABLE hashes RENAME COLUMN sha256 TO digest")
+            self._conn.execute("ALTER TABLE hashes ADD COLUMN algoritmo TEXT NOT NULL DEFAULT 'sha256'")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, digest TEXT NOT NULL, algoritmo TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS hashes_digest ON hashes (algoritmo, digest)")
+
+    @staticmethod
+    def _firma(st):
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    # Devuelve el hash de ruta; solo lee el archivo si no está indexado o su stat ha cambiado
+    def obtener_hash(self, ruta):
+        st = os.stat(ruta)
+        digest = self.hash_indexado(ruta, st)
+        if digest is not None:
+            return digest
+        with self._lock:
+            self.fallos += 1
+        digest = self.calcular(ruta)
+        self._guardar(ruta, st, digest)
+        return digest
+
+    # Hash indexado de ruta si la fila coincide con su stat (st), sin leer el archivo; si no, None
+    def hash_indexado(self, ruta, st):
+        with self._lock:
+            fila = self._conn.execute("SELECT size, mtime_ns, inode, digest FROM hashes WHERE path = ? AND algoritmo = ?", (ruta, self.algoritmo)).fetchone()
+            # Los contadores se comparten entre los hilos del pipeline
+            if fila is not None and tuple(fila[:3]) == self._firma(st):
+                self.aciertos += 1
+                return fila[3]
+        return None
+
+    # Registra el hash ya conocido de ruta (p. ej. el del origen tras copiarlo)
+    def registrar(self, ruta, digest):
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            return
+        self._guardar(ruta, st, digest)
+
+    def _guardar(self, ruta, st, digest):
+        if self.solo_lectura:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO hashes (path, size, mtime_ns, inode, digest, algoritmo) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, inode = excluded.inode, digest = excluded.digest, algoritmo = excluded.algoritmo",
+                (ruta, *self._firma(st), digest, self.algoritmo),
+            )
+
+    # Devuelve una ruta indexada con ese hash cuyo stat sigue coincidiendo con el del índice,
+    # o None. Las filas de archivos que ya no existen se eliminan; no se lee ningún archivo.
+    def buscar_por_digest(self, digest, limite=8):
+        with self._lock:
+            filas = self._conn.execute("SELECT path, size, mtime_ns, inode FROM hashes WHERE algoritmo = ? AND digest = ? LIMIT ?", (self.algoritmo, digest, limite)).fetchall()
+        for ruta, *firma in filas:
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                self.eliminar(ruta)
+                continue
+            if tuple(firma) == self._firma(st):
+                return ruta
+        return None
+
+    def eliminar(self, ruta):
+        if self.solo_lectura:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM hashes WHERE path = ?", (ruta,))
+
+    def reconstruir(self, raiz, saltar_ocultos=True):
+        """Recalcula el hash de todos los archivos bajo raiz y borra las filas de archivos que ya no existen.
+
+        Devuelve el número de archivos indexados.
+        """
+        raiz = os.path.abspath(raiz)
+        prefijo = raiz.rstrip(os.sep) + os.sep
+        vistos = set()
+        for dirpath, dirnames, filenames in os.walk(raiz):
+            if saltar_ocultos:
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                filenames = [f for f in filenames if not f.startswith(".")]
+            for nombre in filenames:
+                ruta = os.path.join(dirpath, nombre)
+                try:
+                    st = os.stat(ruta)
+                    self._guardar(ruta, st, self.calcular(ruta))
+                    vistos.add(ruta)
+                except OSError:
+                    continue
+        with self._lock:
+            filas = self._conn.execute("SELECT path FROM hashes WHERE substr(path, 1, ?) = ?", (len(prefijo), prefijo)).fetchall()
+            obsoletas = [(ruta,) for (ruta,) in filas if ruta not in vistos]
+            self._conn.executemany("DELETE FROM hashes WHERE path = ?", obsoletas)
+        return len(vistos)
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# Reconstrucción manual del índice: python -m photosync.hashindex rebuild [TARGET_PATH]
+def main(argv=None):
+    import argparse
+    from . import settings
+    from . import main as ps_main
+    from .hashing import algoritmo_hash
+
+    parser = argparse.ArgumentParser(prog="python -m photosync.hashindex", description="Gestiona el índice de hashes de la biblioteca destino.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    rebuild = sub.add_parser("rebuild", help="recalcula el hash de todos los archivos del destino")
+    rebuild.add_argument("target", nargs="?", default=settings.TARGET_PATH, help="directorio destino (default: PHOTOSYNC_TARGET_PATH)")
+    args = parser.parse_args(argv)
+
+    if not settings.PHOTOSYNC_HASH_INDEX_PATH:
+        parser.error("PHOTOSYNC_HASH_INDEX_PATH está vacío; el índice de hashes está desactivado")
+    if not args.target or not os.path.isdir(args.target):
+        parser.error(f"Directorio destino no válido: {args.target!r}")
+
+    with IndiceHashes(settings.PHOTOSYNC_HASH_INDEX_PATH, ps_main.calcular_hash_archivo, algoritmo_hash()) as indice:
+        total = indice.reconstruir(args.target)
+    ps_main.logger.info("Índice de hashes reconstruido: %d archivos en %s", total, args.target)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import hashlib
+import logging
+import mmap
+import os
+import threading
+from . import settings
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de cada bloque muestreado por el hash rápido
+TAM_BLOQUE_RAPIDO = 64 * 1024
+# Bloques intermedios muestreados (además de cabeza y cola)
+BLOQUES_INTERMEDIOS = 3
+
+# Algoritmos de hash de contenido disponibles (xxh3 y blake3 solo si están instalados)
+ALGORITMOS = {
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+}
+if xxhash is not None:
+    ALGORITMOS["xxh3"] = xxhash.xxh3_128
+if blake3 is not None:
+    ALGORITMOS["blake3"] = blake3.blake3
+
+# Buffer de lectura reutilizado por hilo (evita reservar memoria en cada archivo)
+_buffers = threading.local()
+
+
+# Algoritmo configurado en PHOTOSYNC_HASH_ALGORITHM; sha256 si no está disponible
+def algoritmo_hash():
+    algoritmo = str(getattr(settings, "PHOTOSYNC_HASH_ALGORITHM", "sha256")).lower()
+    if algoritmo not in ALGORITMOS:
+        logger.warning("Algoritmo de hash %s no disponible; se usa sha256", algoritmo)
+        return "sha256"
+    return algoritmo
+
+
+# Crea el objeto hash usado para el contenido de los archivos
+def crear_hasher(algoritmo=None):
+    return ALGORITMOS[algoritmo or algoritmo_hash()]()
+
+
+def _buffer_lectura(tam):
+    buffer = getattr(_buffers, "buffer", None)
+    if buffer is None or len(buffer) != tam:
+        buffer = _buffers.buffer = bytearray(tam)
+    return buffer
+
+
+# Función para calcular el hash de contenido de un archivo (PHOTOSYNC_HASH_ALGORITHM).
+# Lee con readinto sobre un buffer reutilizado de PHOTOSYNC_HASH_BUFFER_SIZE bytes; los
+# archivos de al menos PHOTOSYNC_HASH_MMAP_THRESHOLD bytes se mapean en memoria.
+def calcular_hash_archivo(archivo, algoritmo=None, tam_buffer=None, umbral_mmap=None):
+    hasher = crear_hasher(algoritmo)
+    if tam_buffer is None:
+        tam_buffer = getattr(settings, "PHOTOSYNC_HASH_BUFFER_SIZE", 1024 * 1024)
+    if umbral_mmap is None:
+        umbral_mmap = getattr(settings, "PHOTOSYNC_HASH_MMAP_THRESHOLD", 0)
+    with open(archivo, "rb") as f:
+        tam = os.fstat(f.fileno()).st_size
+        if umbral_mmap and tam >= umbral_mmap:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                vista = memoryview(mm)
+                try:
+                    for inicio in range(0, tam, tam_buffer):
+                        hasher.update(vista[inicio : inicio + tam_buffer])
+                finally:
+                    vista.release()
+            return hasher.hexdigest()
+        buffer = _buffer_lectura(tam_buffer)
+        vista = memoryview(buffer)
+        while n := f.readinto(buffer):
+            hasher.update(vista[:n])
+    return hasher.hexdigest()
+
+
+# Hash de muestra: cabeza, cola y algunos bloques intermedios (junto con el tamaño).
+# Sirve para descartar archivos distintos sin leerlos enteros; no sustituye al hash completo.
+def calcular_hash_rapido(archivo, tam=None):
+    if tam is None:
+        tam = os.stat(archivo).st_size
+    h = hashlib.blake2b(str(tam).encode(), digest_size=16)
+    with open(archivo, "rb") as f:
+        if tam <= TAM_BLOQUE_RAPIDO * (BLOQUES_INTERMEDIOS + 2):
+            h.update(f.read())
+            return h.hexdigest()
+        paso = tam // (BLOQUES_INTERMEDIOS + 1)
+        offsets = [0] + [paso * i for i in range(1, BLOQUES_INTERMEDIOS + 1)] + [tam - TAM_BLOQUE_RAPIDO]
+        for offset in offsets:
+            f.seek(offset)
+            h.update(f.read(TAM_BLOQUE_RAPIDO))
+    return h.hexdigest()
+
+
+class HuellaArchivo:
+    """Huella de un archivo origen para compararlo con varios candidatos.
+
+    El tamaño, el hash rápido y el hash completo se calculan solo cuando se necesitan
+    y una única vez, aunque el archivo se compare con muchos destinos.
+    """
+
+    def __init__(self, ruta, calcular_completo=calcular_hash_archivo):
+        self.ruta = ruta
+        self._calcular_completo = calcular_completo
+        self._stat = None
+        self._rapido = None
+        self._completo = None
+
+    @property
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.ruta)
+        return self._stat
+
+    @property
+    def tamano(self):
+        return self.stat.st_size
+
+    @property
+    def rapido(self):
+        if self._rapido is None:
+            self._rapido = calcular_hash_rapido(self.ruta, self.tamano)
+        return self._rapido
+
+    @property
+    def completo(self):
+        if self._completo is None:
+            self._completo = self._calcular_completo(self.ruta)
+        return self._completo
+
+    @completo.setter
+    def completo(self, digest):
+        self._completo = digest
+
+    @property
+    def completo_calculado(self):
+        return self._completo is not None
+
+
+def mismo_contenido(huella, destino, hash_destino=calcular_hash_archivo, hash_indexado=None):
+    """Compara el archivo de ``huella`` con ``destino`` por niveles: inode, tamaño, hash rápido y hash completo.
+
+    Cada nivel solo se evalúa si el anterior coincide, de modo que la mayoría de
+    candidatos distintos se descartan con un stat o unas pocas lecturas. Si
+    ``hash_indexado(destino, st)`` conoce el hash del destino para ese stat, el destino no
+    se lee para el hash completo; y si además el hash completo del origen ya está calculado,
+    tampoco para el rápido. El origen nunca se lee entero antes de pasar el hash rápido.
+    """
+    try:
+        st_destino = os.stat(destino)
+        # Mismo inode (p. ej. colocado con PHOTOSYNC_PLACE_MODE=link): mismo contenido sin leerlo
+        if (st_destino.st_dev, st_destino.st_ino) == (huella.stat.st_dev, huella.stat.st_ino):
+            return True
+        tam_destino = st_destino.st_size
+        if tam_destino != huella.tamano:
+            return False
+        digest_destino = hash_indexado(destino, st_destino) if hash_indexado is not None else None
+        if digest_destino is not None and huella.completo_calculado:
+            return huella.completo == digest_destino
+        # Para archivos pequeños el hash rápido ya lee el archivo entero: pasar al completo
+        if tam_destino > TAM_BLOQUE_RAPIDO * (BLOQUES_INTERMEDIOS + 2) and calcular_hash_rapido(destino, tam_destino) != huella.rapido:
+            return False
+        if digest_destino is not None:
+            return huella.completo == digest_destino
+        return huella.completo == hash_destino(destino)
+    except OSError:
+        return False
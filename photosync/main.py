@@ -1,431 +1,1084 @@
-import hashlib
-import json
-import logging
-import os
-import re
-import shutil
-import subprocess
-import shutil as _shutil
-from datetime import datetime
-from typing import Dict
-from logging.handlers import TimedRotatingFileHandler
-from . import settings
-
-# TODO: mover a settings.py
-logpath = "~/.cache/photosync/logs"
-logfilename = "photosync.log"
-
-logpath = os.path.expanduser(logpath)
-
-if not os.path.exists(logpath):
-    os.makedirs(logpath)
-
-
-# format the log entries
-formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
-
-handler = TimedRotatingFileHandler(logpath + "/" + logfilename, when="midnight", backupCount=30)
-handler.setFormatter(formatter)
-
-consoleHandler = logging.StreamHandler()
-consoleHandler.setFormatter(formatter)
-
-logger = logging.getLogger(__name__)
-logger.addHandler(handler)
-logger.addHandler(consoleHandler)
-# Establecer nivel por defecto (INFO) para reducir ruido; permitir DEBUG con PHOTOSYNC_VERBOSE o DRY_RUN
-if getattr(settings, "PHOTOSYNC_VERBOSE", False) or getattr(settings, "DRY_RUN", False):
-    logger.setLevel(logging.DEBUG)
-else:
-    logger.setLevel(logging.INFO)
-logger.propagate = False
-
-
-# Resolve exiftool path robustly (env or PATH)
-EXIFTOOL_PATH = os.environ.get("EXIFTOOL_PATH") or _shutil.which("exiftool")
-if not EXIFTOOL_PATH:
-    logger.error("exiftool no encontrado. Configure EXIFTOOL_PATH o instale exiftool en PATH.")
-
-# TODO: revisar si la fecha es UTC para las dos tags
-time_format = "%Y-%m-%d %H:%M:%S"
-images_tagname = "datetimeoriginal"
-videos_tagname = "trackcreatedate"
-
-sync_times: Dict[str, str] = {}
-
-
-# Función para detectar el tipo de archivo con el comando file
-def detectar_tipo_archivo(archivo):
-    resultado = subprocess.run(["file", "--mime-type", archivo], stdout=subprocess.PIPE, text=True)
-    parts = resultado.stdout.strip().split(": ")
-    if len(parts) > 1:
-        return parts[1]
-    return ""
-
-
-# Función para obtener la fecha de captura o creación con exiftool
-def obtener_fecha_exif(archivo):
-    if not EXIFTOOL_PATH:
-        # No exiftool configured; return None to trigger hardlink path
-        logger.error("exiftool no disponible; no se puede leer metadatos de %s", archivo)
-        return None, None
-    resultado = subprocess.run(
-        [EXIFTOOL_PATH, "-DateTimeOriginal", "-TrackCreateDate", archivo],
-        stdout=subprocess.PIPE,
-        text=True,
-    )
-    salida = resultado.stdout.strip()
-
-    fecha_str = None
-    fecha = None
-
-    # Buscar si hay una fecha para DateTimeOriginal
-    for linea in salida.splitlines():
-        if "Date/Time Original" in linea:
-            fecha_str = linea.split(": ", 1)[1]
-            break
-        elif "Track Create Date" in linea:
-            fecha_str = linea.split(": ", 1)[1]
-            break
-
-    # Si se encontró una fecha, parsearla
-    if fecha_str:
-        try:
-            fecha = datetime.strptime(fecha_str, "%Y:%m:%d %H:%M:%S")
-            return fecha.strftime("%Y%m%d_%H%M%S"), fecha
-        except ValueError:
-            return None, None
-
-    return None, None
-
-
-# Función para construir la nueva ruta basada en la fecha
-def construir_nueva_ruta(base_path, fecha):
-    year = fecha.strftime("%Y")
-    year_month = fecha.strftime("%Y-%m")
-
-    nueva_ruta = os.path.join(base_path, year, year_month)
-
-    # Crear directorios si no existen
-    os.makedirs(nueva_ruta, exist_ok=True)
-
-    return nueva_ruta
-
-
-# Función para renombrar el archivo basado en el formato IMG_XXXX.EEE
-def renombrar_archivo(archivo, fecha_formateada):
-    nombre_archivo, extension = os.path.splitext(os.path.basename(archivo))
-
-    # Detectar si el archivo tiene el formato IMG_XXXX.EEE
-    match = re.match(r"IMG_(\d+)(\..+)", nombre_archivo + extension)
-
-    if match:
-        numero = match.group(1)  # Extraer XXXX
-        nueva_extension = match.group(2)  # Extraer EEE (con punto incluido)
-        nuevo_nombre = f"{fecha_formateada}_{numero}{nueva_extension}"
-    else:
-        nuevo_nombre = f"{fecha_formateada}{extension}"
-
-    return nuevo_nombre
-
-
-# Función para calcular el hash SHA256 de un archivo
-def calcular_hash_archivo(archivo):
-    hash_sha256 = hashlib.sha256()
-    with open(archivo, "rb") as f:
-        while chunk := f.read(8192):
-            hash_sha256.update(chunk)
-    return hash_sha256.hexdigest()
-
-
-# Función para copiar y renombrar el archivo
-def copiar_y_renombrar_archivo(archivo, nueva_ruta, nuevo_nombre):
-    archivo_nuevo = os.path.join(nueva_ruta, nuevo_nombre)
-
-    # Obtener el nombre del archivo original
-    nombre_original = os.path.basename(archivo)
-
-    # Verificar si existe un archivo con el mismo nombre en la nueva ruta
-    archivo_existente = os.path.join(nueva_ruta, nombre_original)
-
-    hash_archivo = calcular_hash_archivo(archivo)
-
-    def comprobar_si_sincronizado(hash_src, destino):
-        if os.path.exists(destino):
-            try:
-                return hash_src == calcular_hash_archivo(destino)
-            except Exception:
-                return False
-        return False
-
-    def resolver_destino_unico(base_dir, base_name, hash_src):
-        """Devuelve (ruta_destino_final, ya_sincronizado_bool).
-        - Si base_name no existe -> usarlo.
-        - Si existe con mismo hash -> ya sincronizado.
-        - Si existe con distinto contenido -> probar _1, _2, ...
-        """
-        nombre, ext = os.path.splitext(base_name)
-        candidato = os.path.join(base_dir, base_name)
-        if not os.path.exists(candidato):
-            return candidato, False
-        # Existe: comprobar si ya sincronizado (mismo hash)
-        try:
-            if hash_src == calcular_hash_archivo(candidato):
-                return candidato, True
-        except Exception:
-            pass
-        # Buscar siguiente nombre libre con sufijo incremental
-        idx = 1
-        while True:
-            candidato = os.path.join(base_dir, f"{nombre}_{idx}{ext}")
-            if not os.path.exists(candidato):
-                return candidato, False
-            try:
-                if hash_src == calcular_hash_archivo(candidato):
-                    return candidato, True
-            except Exception:
-                pass
-            idx += 1
-
-    # Respectar DRY_RUN si está activado
-    if getattr(settings, "DRY_RUN", False):
-        try:
-            dest_final, ya_sync = resolver_destino_unico(nueva_ruta, nuevo_nombre, hash_archivo)
-            if ya_sync:
-                log_skip(f"(DRY) {nombre_original} se omite, ya sincronizado en: {dest_final}")
-            else:
-                if os.path.exists(archivo_existente) and hash_archivo == calcular_hash_archivo(archivo_existente):
-                    logger.info(f"(DRY) Se propondría copiar {archivo} -> {dest_final} y eliminar {archivo_existente} después de la copia")
-                else:
-                    logger.info(f"(DRY) Se propondría copiar {archivo} -> {dest_final}")
-        except Exception:
-            logger.exception(f"(DRY) Error evaluando la acción de copia para: {archivo}")
-        return
-
-    # Modo normal
-    if os.path.exists(archivo_existente):
-        # Comparar contenido de los archivos
-        if hash_archivo == calcular_hash_archivo(archivo_existente):
-            dest_final, ya_sync = resolver_destino_unico(nueva_ruta, nuevo_nombre, hash_archivo)
-            if ya_sync:
-                log_skip(f"{nombre_original} se omite, ya sincronizado en: {dest_final}")
-            else:
-                shutil.copy2(archivo, dest_final)
-                if os.path.exists(dest_final):
-                    # Eliminar el archivo existente después de una copia exitosa
-                    os.remove(archivo_existente)
-                    logger.info(f"{nombre_original} --> {dest_final} Eliminado el archivo original existente: {archivo_existente}")
-                else:
-                    logger.error(f"{nombre_original} --> {dest_final}")
-        else:
-            logger.warning(f"{nombre_original} ya existe con diferente contenido en: {archivo_existente}")
-    else:
-        dest_final, ya_sync = resolver_destino_unico(nueva_ruta, nuevo_nombre, hash_archivo)
-        if ya_sync:
-            log_skip(f"{nombre_original} se omite, ya sincronizado en: {dest_final}")
-            return
-        shutil.copy2(archivo, dest_final)  # shutil.copy2 mantiene los metadatos
-        logger.info(f"{nombre_original} --> {dest_final}")
-
-
-# Función para crear un enlace duro
-def crear_enlace_duro(archivo, links_path):
-    """
-    Crea un enlace duro al archivo especificado en el directorio links_path.
-
-    :param archivo: Ruta del archivo original.
-    :param links_path: Ruta del directorio donde se creará el enlace duro.
-    """
-    if not os.path.isfile(archivo):
-        logger.error(f"El archivo original no existe: {archivo}")
-        return
-
-    enlace_nuevo = os.path.join(links_path, os.path.basename(archivo))
-
-    os.makedirs(links_path, exist_ok=True)  # Crear directorios si no existen
-
-    if getattr(settings, "DRY_RUN", False):
-        logger.info(f"(DRY) Se propondría crear enlace duro: {archivo} -> {enlace_nuevo}")
-        return
-
-    if os.path.exists(enlace_nuevo):
-        logger.warning(f"{os.path.basename(archivo)} ya tiene un enlace duro en: {enlace_nuevo}")
-        return
-
-    try:
-        os.link(archivo, enlace_nuevo)
-        logger.info(f"{os.path.basename(archivo)} --link-> {enlace_nuevo}")
-    except Exception as e:
-        logger.error(f"{os.path.basename(archivo)} no se pudo crear el enlace duro: {e}")
-
-
-# Helper para registrar omisiones (muestra INFO en DRY_RUN o VERBOSE, DEBUG en ejecución normal)
-def log_skip(message: str):
-    if getattr(settings, "DRY_RUN", False) or getattr(settings, "PHOTOSYNC_VERBOSE", False):
-        logger.info(message)
-    else:
-        logger.debug(message)
-
-
-# Función para obtener el tiempo de modificación de un archivo
-def obtener_changed_time(archivo):
-    # TODO: revisar getmtime
-    return datetime.fromtimestamp(os.path.getctime(archivo))
-
-
-# Función principal que integra los procesos
-def process_files(base_path, target_path="./", links_path="./links"):
-    # Obtener el tiempo de modificación de base_path
-    base_path_changed_time = obtener_changed_time(base_path)
-    base_path_sync_time = None
-
-    if base_path in sync_times:
-        base_path_sync_time = datetime.strptime(sync_times[base_path], time_format)
-
-    # Iterar sobre todos los archivos en base_path
-    # TODO: ordenar los archivos por nombre
-    from photosync.utils import is_hidden_path
-
-    archivos = [entrada.name for entrada in os.scandir(base_path) if entrada.is_file() and (settings.PHOTOSYNC_SYNC_HIDDEN or not is_hidden_path(os.path.join(base_path, entrada.name)))]
-    for archivo in archivos:
-        archivo_path = os.path.join(base_path, archivo)
-        # Verificar el tiempo de modificación del archivo
-        archivo_changed_time = obtener_changed_time(archivo_path)
-
-        if base_path_sync_time is None or archivo_changed_time >= base_path_sync_time:
-            mime_type = detectar_tipo_archivo(archivo_path)
-
-            if "image" in mime_type or "video" in mime_type:
-                fecha_formateada, fecha = obtener_fecha_exif(archivo_path)
-
-                if fecha:
-                    nueva_ruta = construir_nueva_ruta(target_path, fecha)
-                    nuevo_nombre = renombrar_archivo(archivo_path, fecha_formateada)
-                    copiar_y_renombrar_archivo(archivo_path, nueva_ruta, nuevo_nombre)
-                else:
-                    # Crear enlace duro si la fecha no existe
-                    crear_enlace_duro(archivo_path, links_path)
-            else:
-                logger.warning(f"{archivo} no es una imagen ni un video.")
-        else:
-            log_skip(f"{archivo} se omite, no se ha modificado (ctime: {archivo_changed_time})")
-
-    sync_times[base_path] = base_path_changed_time.strftime(time_format)
-
-
-# # Ejemplo de uso
-# base_path = "./origen"  # Ruta base para buscar archivos
-# target_path = "./destino"  # Ruta base para copiar los archivos
-# links_path = "./links"  # Ruta base para crear enlaces duros
-# procesar_archivos(base_path, target_path, links_path)
-
-
-# Procesa un directorio recursivamente
-def process_folder(path):
-    # TODO: revisar st_mtime, utilizar la funcion obtener_changed_time
-    path_ctime = obtener_changed_time(path).replace(microsecond=0)
-    path_ctime_str = datetime.strftime(path_ctime, time_format)
-
-    from photosync.utils import is_hidden_path
-
-    if (not settings.PHOTOSYNC_SYNC_HIDDEN) and is_hidden_path(path):
-        logger.info("Se omite directorio oculto: %s", path)
-        return
-    if path not in sync_times or datetime.strptime(sync_times[path], time_format) < path_ctime:
-        logger.info("Sincronizando " + path)
-        # sync_times[path] = path_mtime_str
-        # run_sync_tool(path, images_tagname, settings.TARGET_PATH)
-        # run_sync_tool(path, videos_tagname, settings.TARGET_PATH)
-        # create_hardlink_when_tagname_notfound(path, settings.TAGNAME_NOTFOUND_PATH)
-        process_files(path, settings.TARGET_PATH, settings.TAGNAME_NOTFOUND_PATH)
-        save_sync_times()
-        logger.info("Sincronizado " + path + " con fecha de modificación: " + path_ctime_str)
-    else:
-        if path in sync_times:
-            log_skip(f"{path} se omite, ya ha sido sincronizado")
-
-    # TODO: ordenar los directorios por nombre
-    from photosync.utils import is_hidden_path
-
-    with os.scandir(path) as files:
-        subdirectories = [file.path for file in files if file.is_dir() and (settings.PHOTOSYNC_SYNC_HIDDEN or not is_hidden_path(file.path))]
-
-    for subdirectory in subdirectories:
-        process_folder(subdirectory)
-
-
-# Carga las fechas de la última sincronización
-def load_sync_times():
-    with open(os.path.expanduser(settings.LAST_SYNC_TIME_PATH), "r") as f:
-        return json.load(f)
-
-
-# Guarda las fechas de la última sincronización
-def save_sync_times():
-    # Respectar DRY_RUN
-    if getattr(settings, "DRY_RUN", False):
-        try:
-            logger.info("(DRY) save_sync_times would write to %s: %r", settings.LAST_SYNC_TIME_PATH, sync_times)
-        except Exception:
-            logger.info("(DRY) save_sync_times would write sync_times (failed to render value)")
-        return
-
-    try:
-        path = os.path.expanduser(settings.LAST_SYNC_TIME_PATH)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w") as f:
-            json.dump(sync_times, f, indent=2)
-        logger.info("save_sync_times wrote to %s", path)
-    except Exception:
-        logger.exception("Failed to persist sync_times")
-
-
-# # Ejecuta la herramienta en el directorio path
-# def run_sync_tool(path, tagname, targetpath):
-#     command = 'cd {current_path}; exiftool -if \'${tag_name} and not (${tag_name} eq "0000:00:00 00:00:00")\' -o ./%d "-filename<{tag_name}" -d {target_path}/%Y/%Y-%m/%%f.%%e  -progress .'.format(
-#         target_path=targetpath, current_path=path, tag_name=tagname
-#     )
-#     logger.info(command)
-#     process = subprocess.Popen([command], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-#
-#     while True:
-#         if process.stdout:
-#             output = process.stdout.readline()
-#
-#             if not output:
-#                 break
-#
-#             if output:
-#                 logger.info(output.decode(encoding="cp850").strip())
-#
-#     process.communicate()
-#
-#
-# def create_hardlink_when_tagname_notfound(path, targetpath):
-#     command = "cd {current_path}; exiftool -if '(not $datetimeoriginal or ($datetimeoriginal eq \"0000:00:00 00:00:00\")) and (not $trackcreatedate or ($trackcreatedate eq \"0000:00:00 00:00:00\"))' -p '$filename' -q -q .".format(current_path=path)
-#     logger.info(command)
-#     process = subprocess.Popen([command], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-#
-#     while True:
-#         if process.stdout:
-#             output = process.stdout.readline()
-#
-#             if not output:
-#                 break
-#
-#             create_hardlink(path, output.decode(encoding="cp850").strip(), targetpath)
-#
-#     process.communicate()
-#
-#
-# def create_hardlink(sourcepath, filename, targetpath):
-#     # TODO: añadir comillas para ficheros con ()
-#     command = f"ln -t {targetpath} {sourcepath}/{filename}"
-#     logger.info(command)
-#     process = subprocess.run([command], capture_output=True, shell=True)
-#     if process.stdout != b"":
-#         output = process.stdout.decode(encoding="cp850").strip()
-#         logger.info(output)
-#     if process.stderr != b"":
-#         output = process.stderr.decode(encoding="cp850").strip()
-#         logger.error(output)
+import json
+import logging
+import os
+import re
+import subprocess
+import shutil as _shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict
+from logging.handlers import TimedRotatingFileHandler
+from . import settings
+from .exiftool import ErrorExiftool, SesionExiftool
+from .hashindex import IndiceHashes
+from .copia import MODOS_COLOCACION, colocar_archivo
+from .dircache import CacheDestino
+from .hashing import HuellaArchivo, algoritmo_hash, calcular_hash_archivo, mismo_contenido
+from .metrics import MetricasSincronizacion
+from .mime import detectar_mime_por_firma
+from .state import EstadoSincronizacion, ruta_estado_por_defecto
+from .walker import escanear, recorrer
+
+# TODO: mover a settings.py
+logpath = "~/.cache/photosync/logs"
+logfilename = "photosync.log"
+
+logpath = os.path.expanduser(logpath)
+
+if not os.path.exists(logpath):
+    os.makedirs(logpath)
+
+
+# format the log entries
+formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
+
+handler = TimedRotatingFileHandler(logpath + "/" + logfilename, when="midnight", backupCount=30)
+handler.setFormatter(formatter)
+
+consoleHandler = logging.StreamHandler()
+consoleHandler.setFormatter(formatter)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(handler)
+logger.addHandler(consoleHandler)
+# Establecer nivel por defecto (INFO) para reducir ruido; permitir DEBUG con PHOTOSYNC_VERBOSE o DRY_RUN
+if getattr(settings, "PHOTOSYNC_VERBOSE", False) or getattr(settings, "DRY_RUN", False):
+    logger.setLevel(logging.DEBUG)
+else:
+    logger.setLevel(logging.INFO)
+logger.propagate = False
+
+
+# Resolve exiftool path robustly (env or PATH)
+EXIFTOOL_PATH = os.environ.get("EXIFTOOL_PATH") or _shutil.which("exiftool")
+if not EXIFTOOL_PATH:
+    logger.error("exiftool no encontrado. Configure EXIFTOOL_PATH o instale exiftool en PATH.")
+
+# TODO: revisar si la fecha es UTC para las dos tags
+time_format = "%Y-%m-%d %H:%M:%S"
+images_tagname = "datetimeoriginal"
+videos_tagname = "trackcreatedate"
+
+sync_times: Dict[str, str] = {}
+
+# Sesión exiftool persistente; la abre process_folder (ver recursos_sincronizacion)
+exiftool_sesion = None
+# Índice de hashes de los archivos destino; lo abre process_folder (ver recursos_sincronizacion)
+indice_hashes = None
+# Pools del pipeline concurrente (PHOTOSYNC_JOBS > 1); los abre process_folder
+ejecutor_trabajos = None
+ejecutor_exif = None
+# Almacén SQLite de sync_times; lo abre process_folder (ver recursos_sincronizacion)
+estado_sync = None
+# Métricas por etapa de la ejecución en curso (ver metricas_ejecucion)
+metricas = None
+# Plan en construcción (photosync.plan): el pipeline anota las operaciones en lugar de ejecutarlas
+plan = None
+# Directorios destino creados y nombres que contienen; lo abre process_folder y se vacía en cada ejecución
+cache_destino = None
+
+
+# Mide una etapa del pipeline en las métricas de la ejecución en curso, si las hay
+def medir_etapa(etapa, archivos=1, bytes_procesados=0):
+    if metricas is None:
+        return nullcontext()
+    return metricas.medir(etapa, archivos, bytes_procesados)
+
+
+# calcular_hash_archivo medido como etapa; es el que usan las huellas y el índice de hashes
+def calcular_hash_medido(archivo, *args, **kwargs):
+    if metricas is None:
+        return calcular_hash_archivo(archivo, *args, **kwargs)
+    try:
+        tam = os.path.getsize(archivo)
+    except OSError:
+        tam = 0
+    with metricas.medir("calcular_hash_archivo", 1, tam):
+        return calcular_hash_archivo(archivo, *args, **kwargs)
+
+
+# Función para detectar el tipo de archivo: firma de la cabecera y, si no se reconoce, el comando file
+def detectar_tipo_archivo(archivo):
+    with medir_etapa("detectar_tipo_archivo"):
+        mime_type = detectar_mime_por_firma(archivo)
+        if mime_type:
+            return mime_type
+        resultado = subprocess.run(["file", "--mime-type", archivo], stdout=subprocess.PIPE, text=True)
+        parts = resultado.stdout.strip().split(": ")
+        if len(parts) > 1:
+            return parts[1]
+        return ""
+
+
+# Ejecuta exiftool con los argumentos dados; usa la sesión persistente si hay una abierta
+def ejecutar_exiftool(*args):
+    if exiftool_sesion is not None:
+        try:
+            return exiftool_sesion.ejecutar(*args)
+        except ValueError:
+            # Rutas con saltos de línea no se pueden enviar por -@; usar un proceso aparte
+            pass
+        except ErrorExiftool:
+            logger.exception("Error en la sesión exiftool; se usa un proceso independiente")
+    resultado = subprocess.run(
+        [EXIFTOOL_PATH, *args],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    return resultado.stdout
+
+
+# Convierte una fecha de exiftool (YYYY:mm:dd HH:MM:SS) en (fecha_formateada, fecha)
+def _parsear_fecha_exif(fecha_str):
+    if fecha_str:
+        try:
+            fecha = datetime.strptime(fecha_str, "%Y:%m:%d %H:%M:%S")
+            return fecha.strftime("%Y%m%d_%H%M%S"), fecha
+        except ValueError:
+            return None, None
+
+    return None, None
+
+
+# Función para obtener la fecha de captura o creación con exiftool
+def obtener_fecha_exif(archivo):
+    if not EXIFTOOL_PATH:
+        # No exiftool configured; return None to trigger hardlink path
+        logger.error("exiftool no disponible; no se puede leer metadatos de %s", archivo)
+        return None, None
+    salida = ejecutar_exiftool("-DateTimeOriginal", "-TrackCreateDate", archivo).strip()
+
+    fecha_str = None
+
+    # Buscar si hay una fecha para DateTimeOriginal
+    for linea in salida.splitlines():
+        if "Date/Time Original" in linea:
+            fecha_str = linea.split(": ", 1)[1]
+            break
+        elif "Track Create Date" in linea:
+            fecha_str = linea.split(": ", 1)[1]
+            break
+
+    # Si se encontró una fecha, parsearla
+    return _parsear_fecha_exif(fecha_str)
+
+
+# Obtiene las fechas de varios archivos con una sola llamada a exiftool -json.
+# Devuelve {ruta: (fecha_formateada, fecha)} con el mismo contrato que obtener_fecha_exif.
+# Los archivos que no aparecen en la respuesta (error de exiftool, salida no JSON)
+# se consultan de uno en uno.
+def obtener_fechas_exif_lote(archivos):
+    with medir_etapa("obtener_fecha_exif", len(archivos)):
+        return _obtener_fechas_exif_lote(archivos)
+
+
+def _obtener_fechas_exif_lote(archivos):
+    if not EXIFTOOL_PATH or len(archivos) <= 1:
+        return {archivo: obtener_fecha_exif(archivo) for archivo in archivos}
+
+    salida = ejecutar_exiftool("-json", "-DateTimeOriginal", "-TrackCreateDate", *archivos)
+    try:
+        entradas = json.loads(salida) if salida.strip() else []
+    except ValueError:
+        logger.debug("Salida de exiftool -json no válida; se consultan los archivos de uno en uno")
+        entradas = []
+
+    pendientes = set(archivos)
+    fechas = {}
+    for entrada in entradas:
+        if not isinstance(entrada, dict) or entrada.get("SourceFile") not in pendientes:
+            continue
+        fecha_str = entrada.get("DateTimeOriginal") or entrada.get("TrackCreateDate")
+        fechas[entrada["SourceFile"]] = _parsear_fecha_exif(str(fecha_str) if fecha_str else None)
+
+    for archivo in archivos:
+        if archivo not in fechas:
+            fechas[archivo] = obtener_fecha_exif(archivo)
+    return fechas
+
+
+# Crea un directorio destino (una sola vez por ejecución si hay caché)
+def asegurar_directorio(ruta):
+    if cache_destino is not None:
+        cache_destino.asegurar(ruta)
+    else:
+        os.makedirs(ruta, exist_ok=True)
+
+
+# Indica si existe una ruta destino; con la caché abierta no toca el disco salvo la primera
+# vez que se pregunta por su directorio
+def existe_destino(ruta):
+    if cache_destino is not None:
+        return cache_destino.existe(ruta)
+    return os.path.exists(ruta)
+
+
+# Mantiene la caché de nombres al crear (creado=True) o borrar un archivo destino
+def anotar_destino(ruta, creado=True):
+    if cache_destino is not None:
+        if creado:
+            cache_destino.anotar(ruta)
+        else:
+            cache_destino.quitar(ruta)
+
+
+# Vacía la caché de destino (al empezar cada ejecución del motor residente)
+def reiniciar_cache_destino():
+    if cache_destino is not None:
+        cache_destino.vaciar()
+
+
+# Función para construir la nueva ruta basada en la fecha
+def construir_nueva_ruta(base_path, fecha):
+    year = fecha.strftime("%Y")
+    year_month = fecha.strftime("%Y-%m")
+
+    nueva_ruta = os.path.join(base_path, year, year_month)
+
+    # Crear directorios si no existen (al planificar los crea la fase de aplicación)
+    if plan is None:
+        asegurar_directorio(nueva_ruta)
+
+    return nueva_ruta
+
+
+# Función para renombrar el archivo basado en el formato IMG_XXXX.EEE
+def renombrar_archivo(archivo, fecha_formateada):
+    nombre_archivo, extension = os.path.splitext(os.path.basename(archivo))
+
+    # Detectar si el archivo tiene el formato IMG_XXXX.EEE
+    match = re.match(r"IMG_(\d+)(\..+)", nombre_archivo + extension)
+
+    if match:
+        numero = match.group(1)  # Extraer XXXX
+        nueva_extension = match.group(2)  # Extraer EEE (con punto incluido)
+        nuevo_nombre = f"{fecha_formateada}_{numero}{nueva_extension}"
+    else:
+        nuevo_nombre = f"{fecha_formateada}{extension}"
+
+    return nuevo_nombre
+
+
+# Hash de un archivo de la biblioteca destino; usa el índice persistente si está abierto
+def hash_destino(archivo):
+    if indice_hashes is not None:
+        return indice_hashes.obtener_hash(archivo)
+    return calcular_hash_medido(archivo)
+
+
+# Hash de un archivo de la biblioteca destino si el índice lo tiene para ese stat (sin leerlo)
+def hash_indexado_destino(archivo, st):
+    if indice_hashes is not None:
+        return indice_hashes.hash_indexado(archivo, st)
+    return None
+
+
+# Guarda en el índice el hash de un archivo recién colocado en el destino
+def registrar_hash_destino(archivo, digest):
+    if indice_hashes is not None:
+        indice_hashes.registrar(archivo, digest)
+
+
+# Compara el origen (huella) con un archivo destino: tamaño, hash indexado o hash rápido y,
+# si hace falta, hash completo
+def es_mismo_contenido(huella, destino):
+    return mismo_contenido(huella, destino, hash_destino, hash_indexado_destino)
+
+
+# Modo de colocación configurado (PHOTOSYNC_PLACE_MODE): copy, link o move
+def modo_colocacion():
+    modo = str(getattr(settings, "PHOTOSYNC_PLACE_MODE", "copy")).lower()
+    if modo not in MODOS_COLOCACION:
+        logger.warning("PHOTOSYNC_PLACE_MODE=%s no válido; se usa copy", modo)
+        return "copy"
+    return modo
+
+
+# Modo de deduplicación global configurado (PHOTOSYNC_GLOBAL_DEDUP): off, skip o link
+def modo_dedup_global():
+    modo = str(getattr(settings, "PHOTOSYNC_GLOBAL_DEDUP", "off")).strip().lower()
+    if modo not in ("off", "skip", "link"):
+        logger.warning("PHOTOSYNC_GLOBAL_DEDUP=%s no válido; se usa off", modo)
+        return "off"
+    return modo
+
+
+# Busca en toda la biblioteca un archivo con el mismo contenido que el origen, por su hash
+# completo, en el índice de hashes (consulta indexada: no se carga el índice en memoria).
+# Con planificados (plan en construcción: hash -> destino planificado) cuentan también
+# las copias del plan. Devuelve la ruta del original o None.
+def buscar_duplicado_global(huella, planificados=None):
+    if modo_dedup_global() == "off" or indice_hashes is None:
+        return None
+    digest = huella.completo
+    if planificados and digest in planificados:
+        return planificados[digest]
+    with medir_etapa("buscar_duplicado", 0):
+        return indice_hashes.buscar_por_digest(digest)
+
+
+# Verbo de los mensajes DRY_RUN según el modo de colocación
+_VERBOS_COLOCACION = {"copy": "copiar", "link": "enlazar", "move": "mover"}
+
+
+# Un candidato está ocupado si existe en disco o lo tiene reservado un plan en construcción
+# (reservados: destino -> archivo origen que se colocará allí)
+def _destino_ocupado(candidato, reservados):
+    return existe_destino(candidato) or (reservados is not None and candidato in reservados)
+
+
+# Compara el origen con el ocupante de un candidato: el archivo destino o, si está reservado
+# por el plan, el origen que se colocará allí
+def _mismo_contenido_que(huella, candidato, reservados):
+    if reservados is not None and candidato in reservados:
+        return mismo_contenido(huella, reservados[candidato], calcular_hash_medido)
+    return es_mismo_contenido(huella, candidato)
+
+
+def resolver_destino_unico(base_dir, base_name, huella_src, reservados=None):
+    """Devuelve (ruta_destino_final, ya_sincronizado_bool).
+    - Si base_name no existe -> usarlo.
+    - Si existe con mismo contenido -> ya sincronizado.
+    - Si existe con distinto contenido -> probar _1, _2, ...
+    Con reservados (plan en construcción) los destinos reservados cuentan como existentes.
+    """
+    nombre, ext = os.path.splitext(base_name)
+    candidato = os.path.join(base_dir, base_name)
+    if not _destino_ocupado(candidato, reservados):
+        return candidato, False
+    # Existe: comprobar si ya sincronizado (mismo contenido)
+    if _mismo_contenido_que(huella_src, candidato, reservados):
+        return candidato, True
+    # Buscar siguiente nombre libre con sufijo incremental
+    idx = 1
+    while True:
+        candidato = os.path.join(base_dir, f"{nombre}_{idx}{ext}")
+        if not _destino_ocupado(candidato, reservados):
+            return candidato, False
+        if _mismo_contenido_que(huella_src, candidato, reservados):
+            return candidato, True
+        idx += 1
+
+
+# Decide qué hacer con un archivo con fecha, sin tocar el disco. Devuelve (acción, destino, existente):
+# - ("skip", destino, None): ya sincronizado en destino,
+# - ("copy", destino, existente): colocarlo en destino; si existente no es None es un archivo
+#   con el nombre original y el mismo contenido que se elimina después de colocarlo,
+# - ("conflict", existente, None): ya hay un archivo con el nombre original y otro contenido,
+# - ("duplicate", destino, original): con deduplicación global, el mismo contenido ya está
+#   en original, en otro lugar de la biblioteca; se omite o se enlaza en destino.
+def decidir_colocacion(archivo, nueva_ruta, nuevo_nombre, huella, reservados=None, planificados=None):
+    # Verificar si existe un archivo con el mismo nombre en la nueva ruta
+    archivo_existente = os.path.join(nueva_ruta, os.path.basename(archivo))
+    existente = None
+    if existe_destino(archivo_existente):
+        # Comparar contenido de los archivos
+        if not es_mismo_contenido(huella, archivo_existente):
+            return "conflict", archivo_existente, None
+        existente = archivo_existente
+    dest_final, ya_sync = resolver_destino_unico(nueva_ruta, nuevo_nombre, huella, reservados)
+    if ya_sync:
+        return "skip", dest_final, None
+    if existente is None:
+        original = buscar_duplicado_global(huella, planificados)
+        if original is not None:
+            return "duplicate", dest_final, original
+    return "copy", dest_final, existente
+
+
+# Coloca archivo en dest_final (decidido por decidir_colocacion) y, si se indica, elimina
+# después el archivo existente con el mismo contenido. Devuelve (destino, hash) o (None, None).
+def colocar_en_destino(archivo, dest_final, huella, existente=None, modo="copy"):
+    nombre_original = os.path.basename(archivo)
+    # link/move si está configurado y es el mismo sistema de archivos; si no, reflink o
+    # copy_file_range cuando se puede y, en último caso, copia con hash en una sola lectura
+    # del origen (en todos los casos mantiene los metadatos como shutil.copy2)
+    with medir_etapa("copy", 1, huella.tamano):
+        estrategia, digest = colocar_archivo(archivo, dest_final, modo)
+    anotar_destino(dest_final)
+    if existente is None:
+        if digest:
+            huella.completo = digest
+        if huella.completo_calculado:
+            registrar_hash_destino(dest_final, huella.completo)
+        logger.info(f"{nombre_original} --> {dest_final} ({estrategia})")
+    elif os.path.exists(dest_final):
+        huella.completo = digest or huella.completo
+        registrar_hash_destino(dest_final, huella.completo)
+        # Eliminar el archivo existente después de una copia exitosa
+        os.remove(existente)
+        anotar_destino(existente, creado=False)
+        if indice_hashes is not None:
+            indice_hashes.eliminar(existente)
+        logger.info(f"{nombre_original} --> {dest_final} ({estrategia}) Eliminado el archivo original existente: {existente}")
+    else:
+        logger.error(f"{nombre_original} --> {dest_final}")
+        return None, None
+    return dest_final, huella.completo if huella.completo_calculado else None
+
+
+# Trata un duplicado global (decidir_colocacion): en modo skip no coloca nada y devuelve el
+# original como destino; en modo link crea dest_final como enlace duro del original (si no se
+# puede, se copia). Los bytes que no se escriben se suman a la etapa "dedup" de las métricas.
+def colocar_duplicado(archivo, dest_final, huella, original, modo=None):
+    nombre_original = os.path.basename(archivo)
+    modo = modo or modo_dedup_global()
+    if modo == "link":
+        try:
+            asegurar_directorio(os.path.dirname(dest_final))
+            with medir_etapa("link"):
+                os.link(original, dest_final)
+        except OSError as e:
+            logger.warning(f"{nombre_original}: no se pudo enlazar {dest_final} a {original} ({e}); se copia")
+            return colocar_en_destino(archivo, dest_final, huella, None, modo_colocacion())
+        anotar_destino(dest_final)
+        registrar_hash_destino(dest_final, huella.completo)
+        logger.info(f"{nombre_original} --dedup-link-> {dest_final} (mismo contenido que {original})")
+        destino = dest_final
+    else:
+        log_skip(f"{nombre_original} se omite, mismo contenido que {original}")
+        destino = original
+    if metricas is not None:
+        metricas.observar("dedup", 0.0, 1, huella.tamano)
+    return destino, huella.completo
+
+
+# Función para copiar y renombrar el archivo. Devuelve (destino, hash) si el archivo queda
+# en la biblioteca (colocado o ya sincronizado) y (None, None) si no se ha colocado.
+def copiar_y_renombrar_archivo(archivo, nueva_ruta, nuevo_nombre, huella=None):
+    # Obtener el nombre del archivo original
+    nombre_original = os.path.basename(archivo)
+
+    # El hash del origen solo se calcula si algún candidato coincide en tamaño y hash rápido
+    if huella is None:
+        huella = HuellaArchivo(archivo, calcular_hash_medido)
+
+    modo = modo_colocacion()
+
+    # Respectar DRY_RUN si está activado
+    if getattr(settings, "DRY_RUN", False):
+        try:
+            verbo = _VERBOS_COLOCACION[modo]
+            accion, dest_final, existente = decidir_colocacion(archivo, nueva_ruta, nuevo_nombre, huella)
+            if accion == "skip":
+                log_skip(f"(DRY) {nombre_original} se omite, ya sincronizado en: {dest_final}")
+            elif accion == "conflict":
+                logger.warning(f"(DRY) {nombre_original} ya existe con diferente contenido en: {dest_final}")
+            elif accion == "duplicate":
+                if modo_dedup_global() == "link":
+                    logger.info(f"(DRY) Se propondría enlazar {dest_final} a {existente} (mismo contenido que {archivo})")
+                else:
+                    log_skip(f"(DRY) {nombre_original} se omite, mismo contenido que {existente}")
+            elif existente:
+                logger.info(f"(DRY) Se propondría {verbo} {archivo} -> {dest_final} y eliminar {existente} después de la copia")
+            else:
+                logger.info(f"(DRY) Se propondría {verbo} {archivo} -> {dest_final}")
+        except Exception:
+            logger.exception(f"(DRY) Error evaluando la acción de copia para: {archivo}")
+        return None, None
+
+    # Modo normal
+    accion, dest_final, existente = decidir_colocacion(archivo, nueva_ruta, nuevo_nombre, huella)
+    if accion == "conflict":
+        logger.warning(f"{nombre_original} ya existe con diferente contenido en: {dest_final}")
+        return None, None
+    if accion == "skip":
+        log_skip(f"{nombre_original} se omite, ya sincronizado en: {dest_final}")
+        return dest_final, huella.completo if huella.completo_calculado else None
+    if accion == "duplicate":
+        return colocar_duplicado(archivo, dest_final, huella, existente)
+    return colocar_en_destino(archivo, dest_final, huella, existente, modo)
+
+
+# Función para crear un enlace duro
+def crear_enlace_duro(archivo, links_path):
+    """
+    Crea un enlace duro al archivo especificado en el directorio links_path.
+
+    :param archivo: Ruta del archivo original.
+    :param links_path: Ruta del directorio donde se creará el enlace duro.
+    :return: Ruta del enlace si queda creado, o None.
+    """
+    if not os.path.isfile(archivo):
+        logger.error(f"El archivo original no existe: {archivo}")
+        return None
+
+    enlace_nuevo = os.path.join(links_path, os.path.basename(archivo))
+
+    asegurar_directorio(links_path)  # Crear directorios si no existen
+
+    if getattr(settings, "DRY_RUN", False):
+        logger.info(f"(DRY) Se propondría crear enlace duro: {archivo} -> {enlace_nuevo}")
+        return None
+
+    if existe_destino(enlace_nuevo):
+        logger.warning(f"{os.path.basename(archivo)} ya tiene un enlace duro en: {enlace_nuevo}")
+        try:
+            return enlace_nuevo if os.path.samefile(archivo, enlace_nuevo) else None
+        except OSError:
+            return None
+
+    try:
+        with medir_etapa("link"):
+            os.link(archivo, enlace_nuevo)
+        anotar_destino(enlace_nuevo)
+        logger.info(f"{os.path.basename(archivo)} --link-> {enlace_nuevo}")
+        return enlace_nuevo
+    except Exception as e:
+        logger.error(f"{os.path.basename(archivo)} no se pudo crear el enlace duro: {e}")
+        return None
+
+
+# Helper para registrar omisiones (muestra INFO en DRY_RUN o VERBOSE, DEBUG en ejecución normal)
+def log_skip(message: str):
+    if getattr(settings, "DRY_RUN", False) or getattr(settings, "PHOTOSYNC_VERBOSE", False):
+        logger.info(message)
+    else:
+        logger.debug(message)
+
+
+# Función para obtener el tiempo de modificación de un archivo
+def obtener_changed_time(archivo):
+    # TODO: revisar getmtime
+    return datetime.fromtimestamp(os.path.getctime(archivo))
+
+
+# Devuelve True si el tipo MIME corresponde a una imagen o un vídeo
+def es_multimedia(mime_type):
+    return "image" in mime_type or "video" in mime_type
+
+
+# Devuelve True si ruta está dentro del directorio raiz
+def _dentro_de(ruta, raiz):
+    return os.path.abspath(ruta).startswith(os.path.abspath(raiz).rstrip(os.sep) + os.sep)
+
+
+# Consulta el manifiesto por archivo (solo con el almacén de estado abierto). Devuelve la
+# entrada si el archivo no ha cambiado (mismo dev, inode, tamaño y mtime_ns) y su destino
+# sigue existiendo dentro de target_path o links_path; si no, None y se procesa de nuevo.
+def consultar_manifiesto(st, target_path, links_path):
+    if estado_sync is None:
+        return None
+    entrada = estado_sync.consultar_archivo(st)
+    if entrada is None:
+        return None
+    destino = entrada["destino"]
+    if destino and not ((_dentro_de(destino, target_path) or _dentro_de(destino, links_path)) and os.path.exists(destino)):
+        return None
+    return entrada
+
+
+# Completa la firma de un archivo con su tipo MIME una vez clasificado
+def anotar_tipo(firmas, archivo_path, mime_type):
+    if firmas and archivo_path in firmas:
+        firmas[archivo_path] = (firmas[archivo_path][0], mime_type)
+
+
+# Anota en el manifiesto el resultado de un archivo; firmas guarda (stat, tipo MIME) de
+# los archivos de la pasada actual tomados antes de procesarlos
+def registrar_manifiesto(firmas, archivo_path, fecha=None, digest=None, destino=None):
+    if estado_sync is None or not firmas or archivo_path not in firmas:
+        return
+    st, mime_type = firmas[archivo_path]
+    estado_sync.registrar_archivo(st, mime_type, fecha.strftime(time_format) if fecha else None, digest, destino)
+
+
+# Coloca en la biblioteca un archivo con fecha y anota el resultado en el manifiesto
+def colocar_con_fecha(archivo_path, nueva_ruta, nuevo_nombre, fecha, firmas=None, huella=None):
+    if plan is not None:
+        plan.anotar_copia(archivo_path, nueva_ruta, nuevo_nombre, fecha, firmas, huella)
+        return
+    destino, digest = copiar_y_renombrar_archivo(archivo_path, nueva_ruta, nuevo_nombre, huella=huella)
+    if destino:
+        registrar_manifiesto(firmas, archivo_path, fecha, digest, destino)
+
+
+# Enlaza un archivo sin fecha y anota el resultado (negativo) en el manifiesto
+def enlazar_sin_fecha(archivo_path, links_path, firmas=None):
+    if plan is not None:
+        plan.anotar_enlace(archivo_path, links_path, firmas)
+        return
+    destino = crear_enlace_duro(archivo_path, links_path)
+    if destino:
+        registrar_manifiesto(firmas, archivo_path, destino=destino)
+
+
+# Descarta un archivo que no es imagen ni vídeo y lo anota (negativo) en el manifiesto
+def omitir_no_multimedia(archivo_path, firmas=None):
+    logger.warning(f"{os.path.basename(archivo_path)} no es una imagen ni un video.")
+    if plan is not None:
+        plan.anotar_omision(archivo_path, firmas, "no_multimedia")
+        return
+    registrar_manifiesto(firmas, archivo_path)
+
+
+# Copia o enlaza un lote de imágenes/vídeos usando las fechas obtenidas en bloque
+def procesar_lote(lote, target_path, links_path, firmas=None):
+    fechas = obtener_fechas_exif_lote(lote)
+
+    for archivo_path in lote:
+        fecha_formateada, fecha = fechas[archivo_path]
+
+        if fecha:
+            nueva_ruta = construir_nueva_ruta(target_path, fecha)
+            nuevo_nombre = renombrar_archivo(archivo_path, fecha_formateada)
+            colocar_con_fecha(archivo_path, nueva_ruta, nuevo_nombre, fecha, firmas)
+        else:
+            # Crear enlace duro si la fecha no existe
+            enlazar_sin_fecha(archivo_path, links_path, firmas)
+
+
+# Ejecutores del pipeline concurrente (PHOTOSYNC_JOBS > 1): reutiliza los de la
+# sincronización en curso o crea unos temporales para una llamada suelta a process_files
+@contextmanager
+def ejecutores_pipeline(jobs):
+    if ejecutor_trabajos is not None:
+        yield ejecutor_trabajos, ejecutor_exif
+        return
+    with ThreadPoolExecutor(jobs, thread_name_prefix="photosync") as trabajos, ThreadPoolExecutor(1, thread_name_prefix="photosync-exif") as exif:
+        yield trabajos, exif
+
+
+# Etapa de hash: si el nombre destino ya existe con el mismo tamaño, la colocación tendrá
+# que comparar contenidos, así que el hash completo del origen se adelanta en el pool
+def preparar_huella(huella, candidato):
+    try:
+        if os.stat(candidato).st_size == huella.tamano:
+            huella.completo
+    except OSError:
+        pass
+
+
+def _colocar_grupo(tareas):
+    for fut_hash, funcion, args, kwargs in tareas:
+        if fut_hash is not None:
+            fut_hash.result()
+        funcion(*args, **kwargs)
+
+
+# Etapas de hash y colocación de un lote. Los archivos de un mismo directorio destino se
+# colocan en un único hilo y en el orden del lote, de modo que los sufijos _1, _2 son
+# los mismos que en el modo secuencial; directorios distintos se colocan en paralelo.
+def colocar_lote_en_paralelo(lote, fechas, target_path, links_path, ejecutor, firmas=None):
+    grupos = {}
+    for archivo_path in lote:
+        fecha_formateada, fecha = fechas[archivo_path]
+
+        if fecha:
+            nueva_ruta = construir_nueva_ruta(target_path, fecha)
+            nuevo_nombre = renombrar_archivo(archivo_path, fecha_formateada)
+            huella = HuellaArchivo(archivo_path, calcular_hash_medido)
+            fut_hash = ejecutor.submit(preparar_huella, huella, os.path.join(nueva_ruta, nuevo_nombre))
+            grupos.setdefault(nueva_ruta, []).append((fut_hash, colocar_con_fecha, (archivo_path, nueva_ruta, nuevo_nombre, fecha, firmas), {"huella": huella}))
+        else:
+            grupos.setdefault(links_path, []).append((None, enlazar_sin_fecha, (archivo_path, links_path, firmas), {}))
+
+    # Todas las tareas de hash se encolan antes que las de colocación: cuando un hilo toma
+    # un grupo, los hashes que espera ya están en ejecución y no puede haber bloqueo mutuo.
+    futuros = [ejecutor.submit(_colocar_grupo, tareas) for tareas in grupos.values()]
+    for futuro in futuros:
+        futuro.result()
+
+
+# Pipeline concurrente: clasificar (pool) -> fechas exif (hilo exiftool) -> hash -> colocar.
+# Se trabaja por ventanas de tam_lote archivos con como mucho dos ventanas en vuelo, lo que
+# acota la memoria y frena la clasificación si exiftool o la copia van por detrás.
+def procesar_en_paralelo(archivos_paths, target_path, links_path, ejecutor, ejecutor_exif, tam_lote, firmas=None):
+    pendiente = None
+    for inicio in range(0, len(archivos_paths), tam_lote):
+        ventana = archivos_paths[inicio : inicio + tam_lote]
+        lote = []
+        for archivo_path, mime_type in zip(ventana, ejecutor.map(detectar_tipo_archivo, ventana)):
+            anotar_tipo(firmas, archivo_path, mime_type)
+            if es_multimedia(mime_type):
+                lote.append(archivo_path)
+            else:
+                omitir_no_multimedia(archivo_path, firmas)
+
+        siguiente = (lote, ejecutor_exif.submit(obtener_fechas_exif_lote, lote)) if lote else None
+        if pendiente:
+            colocar_lote_en_paralelo(pendiente[0], pendiente[1].result(), target_path, links_path, ejecutor, firmas)
+        pendiente = siguiente
+
+    if pendiente:
+        colocar_lote_en_paralelo(pendiente[0], pendiente[1].result(), target_path, links_path, ejecutor, firmas)
+
+
+# Función principal que integra los procesos. entradas y st_base son los DirEntry de los
+# archivos de base_path y su stat cuando los aporta el recorrido de process_folder; si no
+# se indican, se lee el directorio aquí.
+def process_files(base_path, target_path="./", links_path="./links", entradas=None, st_base=None):
+    # Obtener el tiempo de modificación de base_path
+    if st_base is None:
+        st_base = os.stat(base_path)
+    base_path_changed_time = datetime.fromtimestamp(st_base.st_ctime)
+    base_path_sync_time = None
+
+    if base_path in sync_times:
+        base_path_sync_time = datetime.strptime(sync_times[base_path], time_format)
+
+    # Iterar sobre todos los archivos en base_path
+    # TODO: ordenar los archivos por nombre
+    from photosync.utils import is_hidden_name, is_hidden_path
+
+    if entradas is None:
+        # Llamada suelta: la ruta completa se comprueba una vez; un directorio oculto ni se lee
+        if not settings.PHOTOSYNC_SYNC_HIDDEN and is_hidden_path(base_path):
+            entradas = []
+        else:
+            with medir_etapa("scan"):
+                entradas = escanear(base_path)[0]
+    # base_path no es oculto (lo garantiza el recorrido): basta con el nombre de cada archivo
+    archivos = [entrada for entrada in entradas if settings.PHOTOSYNC_SYNC_HIDDEN or not is_hidden_name(entrada.name)]
+
+    modificados = []
+    # (stat, tipo MIME) de los archivos modificados, para el manifiesto por archivo y el plan
+    firmas = {}
+    for entrada in archivos:
+        archivo = entrada.name
+        archivo_path = entrada.path
+        # Verificar el tiempo de modificación del archivo (stat en caché en la entrada de scandir)
+        st = entrada.stat()
+        archivo_changed_time = datetime.fromtimestamp(st.st_ctime)
+
+        if base_path_sync_time is None or archivo_changed_time >= base_path_sync_time:
+            # Un cambio en el ctime del directorio no implica que cambie cada archivo: los
+            # que siguen igual que en el manifiesto no pasan de nuevo por el pipeline
+            if estado_sync is not None and consultar_manifiesto(st, target_path, links_path) is not None:
+                log_skip(f"{archivo} se omite, sin cambios desde la última sincronización (manifiesto)")
+                continue
+            firmas[archivo_path] = (st, None)
+            modificados.append(archivo_path)
+        else:
+            log_skip(f"{archivo} se omite, no se ha modificado (ctime: {archivo_changed_time})")
+
+    # Los candidatos (imágenes y vídeos modificados) se procesan en lotes de tamaño
+    # PHOTOSYNC_EXIF_BATCH_SIZE: una llamada a exiftool por lote y luego copia/enlace.
+    tam_lote = max(1, int(getattr(settings, "PHOTOSYNC_EXIF_BATCH_SIZE", 100)))
+    jobs = max(1, int(getattr(settings, "PHOTOSYNC_JOBS", 1)))
+    if jobs > 1 and modificados:
+        with ejecutores_pipeline(jobs) as (ejecutor, ejecutor_exif):
+            procesar_en_paralelo(modificados, target_path, links_path, ejecutor, ejecutor_exif, tam_lote, firmas)
+    else:
+        lote = []
+        for archivo_path in modificados:
+            mime_type = detectar_tipo_archivo(archivo_path)
+            anotar_tipo(firmas, archivo_path, mime_type)
+
+            if es_multimedia(mime_type):
+                lote.append(archivo_path)
+                if len(lote) >= tam_lote:
+                    procesar_lote(lote, target_path, links_path, firmas)
+                    lote = []
+            else:
+                omitir_no_multimedia(archivo_path, firmas)
+
+        if lote:
+            procesar_lote(lote, target_path, links_path, firmas)
+
+    sync_times[base_path] = base_path_changed_time.strftime(time_format)
+
+
+# # Ejemplo de uso
+# base_path = "./origen"  # Ruta base para buscar archivos
+# target_path = "./destino"  # Ruta base para copiar los archivos
+# links_path = "./links"  # Ruta base para crear enlaces duros
+# procesar_archivos(base_path, target_path, links_path)
+
+
+# Abre los recursos compartidos por toda una sincronización y los cierra al terminar.
+# Las llamadas anidadas (process_folder recursivo) reutilizan los recursos ya abiertos.
+@contextmanager
+def recursos_sincronizacion():
+    global exiftool_sesion, indice_hashes, ejecutor_trabajos, ejecutor_exif, estado_sync, cache_destino
+    sesion_propia = exiftool_sesion is None and bool(EXIFTOOL_PATH)
+    if sesion_propia:
+        exiftool_sesion = SesionExiftool(EXIFTOOL_PATH, timeout=getattr(settings, "PHOTOSYNC_EXIFTOOL_TIMEOUT", 60.0), logger=logger)
+    ruta_indice = getattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", "")
+    # En DRY_RUN no se escribe nada: el índice solo se consulta, si ya existe
+    dry_run = getattr(settings, "DRY_RUN", False)
+    indice_propio = indice_hashes is None and bool(ruta_indice) and not (dry_run and not os.path.exists(ruta_indice))
+    if indice_propio:
+        try:
+            indice_hashes = IndiceHashes(ruta_indice, calcular_hash_medido, algoritmo_hash(), solo_lectura=dry_run)
+        except Exception:
+            logger.exception("No se pudo abrir el índice de hashes %s; se calcularán los hashes sin caché", ruta_indice)
+            indice_propio = False
+    estado_propio = estado_sync is None and not dry_run
+    if estado_propio:
+        try:
+            estado_sync = abrir_estado()
+        except Exception:
+            logger.exception("No se pudo abrir el almacén de estado %s", ruta_estado())
+            estado_propio = False
+    cache_propia = cache_destino is None
+    if cache_propia:
+        cache_destino = CacheDestino()
+    jobs = max(1, int(getattr(settings, "PHOTOSYNC_JOBS", 1)))
+    ejecutores_propios = ejecutor_trabajos is None and jobs > 1
+    if ejecutores_propios:
+        ejecutor_trabajos = ThreadPoolExecutor(jobs, thread_name_prefix="photosync")
+        ejecutor_exif = ThreadPoolExecutor(1, thread_name_prefix="photosync-exif")
+    try:
+        yield
+    finally:
+        if ejecutores_propios:
+            trabajos, exif = ejecutor_trabajos, ejecutor_exif
+            ejecutor_trabajos = ejecutor_exif = None
+            trabajos.shutdown(wait=True)
+            exif.shutdown(wait=True)
+        if cache_propia:
+            cache_destino = None
+        if estado_propio:
+            estado, estado_sync = estado_sync, None
+            estado.cerrar()
+        if indice_propio:
+            indice, indice_hashes = indice_hashes, None
+            logger.debug("Índice de hashes: %d aciertos, %d recalculados", indice.aciertos, indice.fallos)
+            indice.cerrar()
+        if sesion_propia:
+            sesion, exiftool_sesion = exiftool_sesion, None
+            sesion.cerrar()
+
+
+# Métricas de una ejecución. Las llamadas anidadas reutilizan las abiertas y la más externa
+# las escribe al terminar en PHOTOSYNC_METRICS_DIR (textfile de Prometheus y resumen JSON).
+@contextmanager
+def metricas_ejecucion():
+    global metricas
+    if metricas is not None:
+        yield metricas
+        return
+    metricas = MetricasSincronizacion()
+    try:
+        yield metricas
+    finally:
+        registro, metricas = metricas, None
+        registro.finalizar()
+        dedup = registro.resumen()["etapas"].get("dedup")
+        if dedup:
+            logger.info("Deduplicación global: %d archivos ya en la biblioteca, %d bytes ahorrados", dedup["archivos"], dedup["bytes"])
+        directorio = getattr(settings, "PHOTOSYNC_METRICS_DIR", "")
+        if directorio:
+            try:
+                ruta_prom, _ = registro.exportar(directorio)
+                logger.debug("Métricas de la sincronización escritas en %s", ruta_prom)
+            except OSError:
+                logger.exception("No se pudieron escribir las métricas en %s", directorio)
+
+
+# Procesa un directorio recursivamente
+def process_folder(path):
+    with metricas_ejecucion(), recursos_sincronizacion():
+        _process_folder(path)
+
+
+# Sincronización dirigida: solo los directorios indicados (p. ej. los que el watcher ha visto
+# cambiar) y sus subdirectorios nuevos, sin recorrer los árboles de SOURCE_PATHS completos.
+# Las rutas fuera de las raíces (SOURCE_PATHS por defecto) o que ya no existen se ignoran.
+def process_changed_dirs(paths, raices=None):
+    if raices is None:
+        raices = [settings.SOURCE_PATHS] if isinstance(settings.SOURCE_PATHS, str) else list(settings.SOURCE_PATHS)
+    directorios = []
+    for path in paths:
+        directorio = _ruta_en_raiz(path, raices)
+        if directorio is None:
+            logger.warning("Se ignora %s: no está dentro de las rutas de origen", path)
+        elif not os.path.isdir(directorio):
+            log_skip(f"{directorio} se omite, ya no existe")
+        elif directorio not in directorios:
+            directorios.append(directorio)
+
+    with metricas_ejecucion(), recursos_sincronizacion():
+        visitados = set()
+        for directorio in sorted(directorios):
+            _process_folder(directorio, solo_nuevos=True, visitados=visitados)
+
+
+# Reescribe path con la raíz tal y como está configurada, para que coincida con las claves
+# de sync_times que genera el recorrido completo; None si path no está bajo ninguna raíz
+def _ruta_en_raiz(path, raices):
+    absoluta = os.path.abspath(path)
+    for raiz in raices:
+        raiz_abs = os.path.abspath(raiz)
+        if absoluta == raiz_abs:
+            return raiz
+        if _dentro_de(absoluta, raiz_abs):
+            return os.path.join(raiz, os.path.relpath(absoluta, raiz_abs))
+    return None
+
+
+# Recorre el árbol de path de forma iterativa (sin límite de profundidad por recursión).
+# Cada directorio se lee con un único scandir y su stat y el de sus archivos se reutilizan
+# desde las entradas de scandir. Lo oculto se decide de forma incremental: la ruta raíz se
+# comprueba entera una vez y después solo el nombre de cada hijo, y los subárboles ocultos
+# (p. ej. .thumbnails) se podan sin llegar a leerlos. Con solo_nuevos solo se desciende a
+# subdirectorios que aún no están en sync_times; visitados evita repetir directorios.
+def _process_folder(path, solo_nuevos=False, visitados=None):
+    from photosync.utils import is_hidden_name, is_hidden_path
+
+    if (not settings.PHOTOSYNC_SYNC_HIDDEN) and is_hidden_path(path):
+        logger.info("Se omite directorio oculto: %s", path)
+        return
+
+    for directorio in _recorrer_medido(path):
+        if visitados is not None:
+            if directorio.ruta in visitados:
+                directorio.subdirectorios.clear()
+                continue
+            visitados.add(directorio.ruta)
+        sincronizar_directorio(directorio)
+
+        # TODO: ordenar los directorios por nombre
+        if not settings.PHOTOSYNC_SYNC_HIDDEN:
+            directorio.subdirectorios[:] = [sub for sub in directorio.subdirectorios if not is_hidden_name(sub.name)]
+        if solo_nuevos:
+            directorio.subdirectorios[:] = [sub for sub in directorio.subdirectorios if sub.path not in sync_times]
+
+
+# recorrer con el tiempo de lectura de cada directorio (y sus archivos) medido como etapa scan
+def _recorrer_medido(path):
+    directorios = recorrer(path)
+    while True:
+        inicio = time.perf_counter()
+        directorio = next(directorios, None)
+        if directorio is None:
+            return
+        if metricas is not None:
+            metricas.observar("scan", time.perf_counter() - inicio, len(directorio.archivos))
+        yield directorio
+
+
+# Sincroniza los archivos de un directorio del recorrido si ha cambiado desde la última vez
+def sincronizar_directorio(directorio):
+    path = directorio.ruta
+    # TODO: revisar st_mtime
+    path_ctime = datetime.fromtimestamp(directorio.stat.st_ctime).replace(microsecond=0)
+    path_ctime_str = datetime.strftime(path_ctime, time_format)
+
+    if path not in sync_times or datetime.strptime(sync_times[path], time_format) < path_ctime:
+        logger.info("Sincronizando " + path)
+        # sync_times[path] = path_mtime_str
+        # run_sync_tool(path, images_tagname, settings.TARGET_PATH)
+        # run_sync_tool(path, videos_tagname, settings.TARGET_PATH)
+        # create_hardlink_when_tagname_notfound(path, settings.TAGNAME_NOTFOUND_PATH)
+        process_files(path, settings.TARGET_PATH, settings.TAGNAME_NOTFOUND_PATH, entradas=directorio.archivos, st_base=directorio.stat)
+        if plan is not None:
+            # La marca se guarda al aplicar el plan
+            plan.anotar_directorio(path, sync_times[path])
+        else:
+            save_sync_times(path)
+        logger.info("Sincronizado " + path + " con fecha de modificación: " + path_ctime_str)
+    else:
+        if path in sync_times:
+            log_skip(f"{path} se omite, ya ha sido sincronizado")
+
+
+# Ruta del almacén SQLite de estado (PHOTOSYNC_STATE_DB_PATH o junto a LAST_SYNC_TIME_PATH)
+def ruta_estado():
+    return ruta_estado_por_defecto(settings.LAST_SYNC_TIME_PATH, getattr(settings, "PHOTOSYNC_STATE_DB_PATH", ""))
+
+
+# Abre el almacén de estado con la política de confirmación configurada
+def abrir_estado():
+    return EstadoSincronizacion(
+        ruta_estado(),
+        lote_dirs=getattr(settings, "PHOTOSYNC_STATE_COMMIT_DIRS", 100),
+        intervalo=getattr(settings, "PHOTOSYNC_STATE_COMMIT_SECONDS", 5.0),
+        algoritmo=algoritmo_hash(),
+    )
+
+
+# Carga las fechas de la última sincronización. La primera vez importa el antiguo JSON
+# (LAST_SYNC_TIME_PATH) en el almacén SQLite; en DRY_RUN sin almacén se lee el JSON.
+def load_sync_times():
+    if getattr(settings, "DRY_RUN", False) and not os.path.exists(ruta_estado()):
+        with open(os.path.expanduser(settings.LAST_SYNC_TIME_PATH), "r") as f:
+            return json.load(f)
+
+    with abrir_estado() as estado:
+        migrados = estado.migrar_json(os.path.expanduser(settings.LAST_SYNC_TIME_PATH))
+        if migrados:
+            logger.info("Migrados %d tiempos de sincronización de %s a %s", migrados, settings.LAST_SYNC_TIME_PATH, estado.ruta_db)
+        return estado.cargar()
+
+
+# Guarda las fechas de la última sincronización: solo la entrada de path si se indica
+# (upsert confirmado en bloque por el almacén abierto) o todas si no
+def save_sync_times(path=None):
+    # Respectar DRY_RUN
+    if getattr(settings, "DRY_RUN", False):
+        try:
+            if path is not None:
+                logger.info("(DRY) save_sync_times would write to %s: %s=%r", ruta_estado(), path, sync_times.get(path))
+            else:
+                logger.info("(DRY) save_sync_times would write to %s: %r", ruta_estado(), sync_times)
+        except Exception:
+            logger.info("(DRY) save_sync_times would write sync_times (failed to render value)")
+        return
+
+    try:
+        entradas = {path: sync_times[path]} if path is not None else dict(sync_times)
+        with medir_etapa("save_sync_times", 0):
+            if estado_sync is not None:
+                for p, valor in entradas.items():
+                    estado_sync.guardar(p, valor)
+            else:
+                with abrir_estado() as estado:
+                    estado.guardar_todos(entradas)
+        logger.debug("save_sync_times wrote %d entries to %s", len(entradas), ruta_estado())
+    except Exception:
+        logger.exception("Failed to persist sync_times")
+
+
+# # Ejecuta la herramienta en el directorio path
+# def run_sync_tool(path, tagname, targetpath):
+#     command = 'cd {current_path}; exiftool -if \'${tag_name} and not (${tag_name} eq "0000:00:00 00:00:00")\' -o ./%d "-filename<{tag_name}" -d {target_path}/%Y/%Y-%m/%%f.%%e  -progress .'.format(
+#         target_path=targetpath, current_path=path, tag_name=tagname
+#     )
+#     logger.info(command)
+#     process = subprocess.Popen([command], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
+#
+#     while True:
+#         if process.stdout:
+#             output = process.stdout.readline()
+#
+#             if not output:
+#                 break
+#
+#             if output:
+#                 logger.info(output.decode(encoding="cp850").strip())
+#
+#     process.communicate()
+#
+#
+# def create_hardlink_when_tagname_notfound(path, targetpath):
+#     command = "cd {current_path}; exiftool -if '(not $datetimeoriginal or ($datetimeoriginal eq \"0000:00:00 00:00:00\")) and (not $trackcreatedate or ($trackcreatedate eq \"0000:00:00 00:00:00\"))' -p '$filename' -q -q .".format(current_path=path)
+#     logger.info(command)
+#     process = subprocess.Popen([command], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
+#
+#     while True:
+#         if process.stdout:
+#             output = process.stdout.readline()
+#
+#             if not output:
+#                 break
+#
+#             create_hardlink(path, output.decode(encoding="cp850").strip(), targetpath)
+#
+#     process.communicate()
+#
+#
+# def create_hardlink(sourcepath, filename, targetpath):
+#     # TODO: añadir comillas para ficheros con ()
+#     command = f"ln -t {targetpath} {sourcepath}/{filename}"
+#     logger.info(command)
+#     process = subprocess.run([command], capture_output=True, shell=True)
+#     if process.stdout != b"":
+#         output = process.stdout.decode(encoding="cp850").strip()
+#         logger.info(output)
+#     if process.stderr != b"":
+#         output = process.stderr.decode(encoding="cp850").strip()
+#         logger.error(output)
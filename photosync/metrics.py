@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites superiores (segundos) de los buckets de los histogramas de latencia
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Etapa:
+    __slots__ = ("buckets", "suma", "llamadas", "archivos", "bytes", "errores")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.suma = 0.0
+        self.llamadas = 0
+        self.archivos = 0
+        self.bytes = 0
+        self.errores = 0
+
+
+class MetricasSincronizacion:
+    """Contadores, bytes e histogramas de latencia por etapa de una ejecución.
+
+    Cada observación de una etapa (scan, detectar_tipo_archivo, obtener_fecha_exif, ...)
+    suma una llamada al histograma de su latencia y los archivos y bytes que ha tratado.
+    Es seguro usarla desde los hilos del pipeline. Al terminar se escribe como textfile de
+    Prometheus (para el textfile collector de node_exporter) y como resumen JSON.
+    """
+
+    def __init__(self, prefijo="photosync"):
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._etapas = {}
+        self.inicio = time.time()
+        self._t0 = time.perf_counter()
+        self.duracion = None
+
+    @contextmanager
+    def medir(self, etapa, archivos=1, bytes_procesados=0):
+        t0 = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observar(etapa, time.perf_counter() - t0, archivos, bytes_procesados, error)
+
+    def observar(self, etapa, segundos, archivos=1, bytes_procesados=0, error=False):
+        with self._lock:
+            datos = self._etapas.get(etapa)
+            if datos is None:
+                datos = self._etapas[etapa] = _Etapa()
+            for i, limite in enumerate(BUCKETS):
+                if segundos <= limite:
+                    datos.buckets[i] += 1
+                    break
+            datos.suma += segundos
+            datos.llamadas += 1
+            datos.archivos += archivos
+            datos.bytes += bytes_procesados or 0
+            if error:
+                datos.errores += 1
+
+    # Fija la duración de la ejecución (si no, se toma al exportar)
+    def finalizar(self):
+        self.duracion = time.perf_counter() - self._t0
+
+    def resumen(self):
+        duracion = self.duracion if self.duracion is not None else time.perf_counter() - self._t0
+        with self._lock:
+            etapas = {
+                nombre: {
+                    "llamadas": d.llamadas,
+                    "archivos": d.archivos,
+                    "bytes": d.bytes,
+                    "errores": d.errores,
+                    "segundos": round(d.suma, 6),
+                    "media_ms": round(1000 * d.suma / d.llamadas, 3) if d.llamadas else None,
+                }
+                for nombre, d in sorted(self._etapas.items())
+            }
+        return {"inicio": self.inicio, "duracion": round(duracion, 6), "etapas": etapas}
+
+    def texto_prometheus(self):
+        p = self.prefijo
+        duracion = self.duracion if self.duracion is not None else time.perf_counter() - self._t0
+        lineas = [
+            f"# HELP {p}_stage_seconds Latencia de cada llamada a una etapa de la sincronización.",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        with self._lock:
+            etapas = sorted(self._etapas.items())
+            for nombre, d in etapas:
+                acumulado = 0
+                for limite, cuenta in zip(BUCKETS, d.buckets):
+                    acumulado += cuenta
+                    lineas.append(f'{p}_stage_seconds_bucket{{stage="{nombre}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{p}_stage_seconds_bucket{{stage="{nombre}",le="+Inf"}} {d.llamadas}')
+                lineas.append(f'{p}_stage_seconds_sum{{stage="{nombre}"}} {d.suma:.6f}')
+                lineas.append(f'{p}_stage_seconds_count{{stage="{nombre}"}} {d.llamadas}')
+            for metrica, ayuda, campo in (
+                ("stage_files_total", "Archivos tratados por cada etapa.", "archivos"),
+                ("stage_bytes_total", "Bytes tratados por cada etapa.", "bytes"),
+                ("stage_errors_total", "Llamadas a cada etapa terminadas con excepción.", "errores"),
+            ):
+                lineas.append(f"# HELP {p}_{metrica} {ayuda}")
+                lineas.append(f"# TYPE {p}_{metrica} counter")
+                lineas.extend(f'{p}_{metrica}{{stage="{nombre}"}} {getattr(d, campo)}' for nombre, d in etapas)
+        lineas += [
+            f"# HELP {p}_last_run_timestamp_seconds Inicio de la última ejecución (epoch).",
+            f"# TYPE {p}_last_run_timestamp_seconds gauge",
+            f"{p}_last_run_timestamp_seconds {self.inicio:.3f}",
+            f"# HELP {p}_last_run_duration_seconds Duración de la última ejecución.",
+            f"# TYPE {p}_last_run_duration_seconds gauge",
+            f"{p}_last_run_duration_seconds {duracion:.6f}",
+        ]
+        return "\n".join(lineas) + "\n"
+
+    # Escribe <directorio>/<prefijo>.prom y <prefijo>.json de forma atómica (el textfile
+    # collector nunca lee un archivo a medias). Devuelve las dos rutas.
+    def exportar(self, directorio):
+        directorio = os.path.expanduser(directorio)
+        os.makedirs(directorio, exist_ok=True)
+        ruta_prom = os.path.join(directorio, f"{self.prefijo}.prom")
+        ruta_json = os.path.join(directorio, f"{self.prefijo}.json")
+        _escribir_atomico(ruta_prom, self.texto_prometheus())
+        _escribir_atomico(ruta_json, json.dumps(self.resumen(), indent=2) + "\n")
+        return ruta_prom, ruta_json
+
+
+def _escribir_atomico(ruta, contenido):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
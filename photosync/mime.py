@@ -0,0 +1,96 @@
+import struct
+
+# Bytes leídos de la cabecera; suficientes para todas las firmas soportadas
+TAM_CABECERA = 512
+
+# Marcas ISO BMFF (ftyp) -> tipo MIME, con la misma clasificación que `file`
+_MARCAS_FTYP = {
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"heim": "image/heic",
+    b"heis": "image/heic",
+    b"hevc": "image/heic-sequence",
+    b"hevx": "image/heic-sequence",
+    b"mif1": "image/heif",
+    b"msf1": "image/heif-sequence",
+    b"avif": "image/avif",
+    b"avis": "image/avif",
+    b"crx ": "image/x-canon-cr3",
+    b"qt  ": "video/quicktime",
+    b"3gp4": "video/3gpp",
+    b"3gp5": "video/3gpp",
+    b"3gp6": "video/3gpp",
+    b"3gs7": "video/3gpp",
+    b"3ge6": "video/3gpp",
+    b"3ge7": "video/3gpp",
+    b"3gg6": "video/3gpp",
+    b"3g2a": "video/3gpp2",
+    b"3g2b": "video/3gpp2",
+    b"3g2c": "video/3gpp2",
+    b"M4V ": "video/x-m4v",
+    b"M4VH": "video/x-m4v",
+    b"M4VP": "video/x-m4v",
+}
+# Cualquier otra marca ftyp conocida de vídeo MP4 (isom, mp41, mp42, avc1, ...)
+_MARCAS_MP4 = {b"isom", b"iso2", b"iso4", b"iso5", b"iso6", b"mp41", b"mp42", b"avc1", b"mmp4", b"dash", b"MSNV", b"NDAS", b"F4V ", b"XAVC"}
+
+# Átomos QuickTime antiguos (sin ftyp) al inicio del archivo; el resto se deja a `file`
+_ATOMOS_QUICKTIME = {b"moov", b"mdat"}
+
+
+def _tipo_iso_bmff(cabecera):
+    marca = cabecera[8:12]
+    if marca in _MARCAS_FTYP:
+        return _MARCAS_FTYP[marca]
+    if marca in _MARCAS_MP4:
+        return "video/mp4"
+    return None
+
+
+def _tipo_tiff(cabecera):
+    # CR2 es un TIFF con la marca "CR" en el offset 8; NEF, ARW y DNG se identifican como TIFF
+    if cabecera[8:10] == b"CR":
+        return "image/x-canon-cr2"
+    return "image/tiff"
+
+
+def _tipo_matroska(cabecera):
+    # El DocType EBML ("matroska" o "webm") aparece dentro de la cabecera
+    if b"webm" in cabecera[:64]:
+        return "video/webm"
+    return "video/x-matroska"
+
+
+def tipo_mime_por_firma(cabecera):
+    """Devuelve el tipo MIME deducido de los primeros bytes del archivo, o None si la firma no se reconoce."""
+    if cabecera.startswith(b"\xff\xd8\xff") and len(cabecera) > 3:
+        return "image/jpeg"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if cabecera[:4] in (b"II*\x00", b"MM\x00*"):
+        return _tipo_tiff(cabecera)
+    if cabecera[:4] == b"RIFF" and len(cabecera) >= 12:
+        if cabecera[8:12] == b"WEBP":
+            return "image/webp"
+        if cabecera[8:12] == b"AVI ":
+            return "video/x-msvideo"
+        return None
+    if cabecera.startswith(b"\x1a\x45\xdf\xa3"):
+        return _tipo_matroska(cabecera)
+    if len(cabecera) >= 12 and cabecera[4:8] == b"ftyp":
+        return _tipo_iso_bmff(cabecera)
+    if len(cabecera) >= 8 and cabecera[4:8] in _ATOMOS_QUICKTIME and struct.unpack(">I", cabecera[:4])[0] >= 8:
+        return "video/quicktime"
+    return None
+
+
+def detectar_mime_por_firma(archivo):
+    """Lee la cabecera de ``archivo`` y devuelve su tipo MIME, o None si es desconocido o ilegible."""
+    try:
+        with open(archivo, "rb") as f:
+            cabecera = f.read(TAM_CABECERA)
+    except OSError:
+        return None
+    return tipo_mime_por_firma(cabecera)
@@ -0,0 +1,272 @@
+import collections
+import json
+import os
+import threading
+
+from . import main, settings
+from .engine import rutas_origen
+from .hashing import HuellaArchivo
+
+# Operaciones de archivo de un plan; "dir" marca un directorio origen como sincronizado
+OPERACIONES = ("copy", "link", "skip", "dir")
+
+
+class PlanSincronizacion:
+    """Plan de una sincronización: las operaciones que haría el pipeline, sin ejecutarlas.
+
+    Mientras está activo (``main.plan``) el recorrido y la clasificación son los de una
+    sincronización normal, pero la colocación solo decide: cada archivo produce una
+    operación copy, link o skip con origen, destino, hash (si se ha calculado para
+    resolver una colisión) y el stat del origen, que se escribe como una línea JSON.
+    Los destinos ya planificados se reservan, de modo que los sufijos _1, _2 son los
+    mismos que al sincronizar directamente. Con deduplicación global, el hash de cada copia
+    planificada se recuerda para que los duplicados dentro del mismo plan tampoco se copien.
+    """
+
+    def __init__(self, salida):
+        self._salida = salida
+        self._lock = threading.Lock()
+        # destino -> origen que se colocará allí
+        self.reservados = {}
+        # hash -> destino de las copias planificadas (solo con deduplicación global)
+        self.planificados = {}
+        self.operaciones = collections.Counter()
+
+    def anotar_copia(self, archivo, nueva_ruta, nuevo_nombre, fecha, firmas=None, huella=None):
+        if huella is None:
+            huella = HuellaArchivo(archivo, main.calcular_hash_medido)
+        accion, destino, existente = main.decidir_colocacion(archivo, nueva_ruta, nuevo_nombre, huella, self.reservados, self.planificados)
+        digest = huella.completo if huella.completo_calculado else None
+        if accion == "copy":
+            self.reservados[destino] = archivo
+            if digest and main.modo_dedup_global() != "off":
+                self.planificados.setdefault(digest, destino)
+            self._anotar("copy", archivo, firmas, destino, digest, fecha, modo=main.modo_colocacion(), elimina=existente)
+        elif accion == "duplicate":
+            if main.modo_dedup_global() == "link":
+                self.reservados[destino] = archivo
+                self._anotar("link", archivo, firmas, destino, digest, fecha, desde=existente)
+            else:
+                self._anotar("skip", archivo, firmas, existente, digest, fecha, motivo="duplicado")
+        elif accion == "skip":
+            self._anotar("skip", archivo, firmas, destino, digest, fecha, motivo="sincronizado")
+        else:
+            main.logger.warning(f"{os.path.basename(archivo)} ya existe con diferente contenido en: {destino}")
+            self._anotar("skip", archivo, firmas, destino, digest, fecha, motivo="conflicto")
+
+    def anotar_enlace(self, archivo, links_path, firmas=None):
+        destino = os.path.join(links_path, os.path.basename(archivo))
+        if main.existe_destino(destino):
+            mismo = os.path.exists(destino) and os.path.samefile(archivo, destino)
+            self._anotar("skip", archivo, firmas, destino, motivo="enlazado" if mismo else "conflicto")
+        elif destino in self.reservados:
+            self._anotar("skip", archivo, firmas, destino, motivo="conflicto")
+        else:
+            self.reservados[destino] = archivo
+            self._anotar("link", archivo, firmas, destino)
+
+    def anotar_omision(self, archivo, firmas=None, motivo="no_multimedia"):
+        self._anotar("skip", archivo, firmas, motivo=motivo)
+
+    def anotar_directorio(self, ruta, sincronizado):
+        self._escribir({"op": "dir", "ruta": ruta, "sincronizado": sincronizado})
+
+    def _anotar(self, op, archivo, firmas, destino=None, digest=None, fecha=None, **extra):
+        st, mime_type = (firmas or {}).get(archivo, (None, None))
+        if st is None:
+            st = os.stat(archivo)
+        registro = {
+            "op": op,
+            "origen": archivo,
+            "destino": destino,
+            "digest": digest,
+            "st": firma_stat(st),
+            "mime": mime_type,
+            "fecha": fecha.strftime(main.time_format) if fecha else None,
+        }
+        registro.update((clave, valor) for clave, valor in extra.items() if valor is not None)
+        self._escribir(registro)
+
+    def _escribir(self, registro):
+        with self._lock:
+            self._salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self.operaciones[registro["op"]] += 1
+
+
+# Tupla con la que se revalida un origen al aplicar el plan
+def firma_stat(st):
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def planificar(ruta_plan, dirs=None):
+    """Escribe en ruta_plan (JSONL) el plan de sincronizar SOURCE_PATHS o, si se indican dirs,
+    solo esos directorios y sus subdirectorios nuevos. Devuelve el número de operaciones por tipo.
+
+    No coloca archivos ni guarda marcas ni manifiesto: eso lo hace aplicar.
+    """
+    temporal = f"{ruta_plan}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, "w", encoding="utf-8") as salida, main.metricas_ejecucion(), main.recursos_sincronizacion():
+            plan = main.plan = PlanSincronizacion(salida)
+            try:
+                if dirs:
+                    main.process_changed_dirs(dirs, rutas_origen())
+                else:
+                    for p in rutas_origen():
+                        if not os.path.exists(p):
+                            main.logger.warning(f"Ruta de origen no existe: {p}")
+                            continue
+                        main.process_folder(p)
+            finally:
+                main.plan = None
+        os.replace(temporal, ruta_plan)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    main.logger.info("Plan escrito en %s: %s", ruta_plan, dict(plan.operaciones))
+    return plan.operaciones
+
+
+def leer_plan(ruta_plan):
+    with open(ruta_plan, "r", encoding="utf-8") as f:
+        for numero, linea in enumerate(f, 1):
+            if not linea.strip():
+                continue
+            registro = json.loads(linea)
+            if registro.get("op") not in OPERACIONES:
+                raise ValueError(f"{ruta_plan}:{numero}: operación desconocida {registro.get('op')!r}")
+            yield registro
+
+
+# Orden de aplicación: por directorio destino y, dentro de él, por inode del origen, para
+# que las escrituras de un directorio vayan juntas y las lecturas sigan el disco. Los
+# duplicados globales van al final: su original puede ser una copia del mismo plan.
+def _clave_localidad(op):
+    duplicado = bool(op.get("desde")) or op.get("motivo") == "duplicado"
+    return (duplicado, os.path.dirname(op["destino"] or ""), op["st"][1])
+
+
+def aplicar(ruta_plan):
+    """Ejecuta un plan de planificar. Solo se revalida el stat de cada origen (dispositivo,
+    inode, tamaño y mtime): si ha cambiado, o si el destino de una copia ya existe, la
+    operación no se aplica y el directorio origen queda pendiente para la siguiente
+    sincronización. Los hashes del plan no se recalculan. Devuelve un contador de resultados.
+    """
+    operaciones = list(leer_plan(ruta_plan))
+    archivos = sorted((op for op in operaciones if op["op"] != "dir"), key=_clave_localidad)
+    directorios = [op for op in operaciones if op["op"] == "dir"]
+    resumen = collections.Counter()
+
+    if getattr(settings, "DRY_RUN", False):
+        for op in archivos:
+            main.logger.info(f"(DRY) {op['op']} {op['origen']} -> {op['destino']}")
+        resumen["dry_run"] = len(archivos)
+        return resumen
+
+    pendientes = set()
+    with main.metricas_ejecucion(), main.recursos_sincronizacion():
+        for op in archivos:
+            try:
+                resultado = _aplicar_operacion(op)
+            except Exception:
+                main.logger.exception(f"Error aplicando {op['op']} {op['origen']}")
+                resultado = "error"
+            resumen[resultado] += 1
+            if resultado not in ("aplicada", "omitida"):
+                pendientes.add(os.path.dirname(op["origen"]))
+        for op in directorios:
+            if op["ruta"] in pendientes:
+                resumen["directorios_pendientes"] += 1
+                continue
+            main.sync_times[op["ruta"]] = op["sincronizado"]
+            main.save_sync_times(op["ruta"])
+            resumen["directorios"] += 1
+    main.logger.info("Plan %s aplicado: %s", ruta_plan, dict(resumen))
+    return resumen
+
+
+def _aplicar_operacion(op):
+    origen = op["origen"]
+    try:
+        st = os.stat(origen)
+    except OSError:
+        main.logger.warning(f"{origen} ya no existe; se omite (replanificar)")
+        return "invalida"
+    if firma_stat(st) != op["st"]:
+        main.logger.warning(f"{origen} ha cambiado desde el plan; se omite (replanificar)")
+        return "invalida"
+
+    destino, digest = op["destino"], op["digest"]
+    if op["op"] == "copy":
+        if os.path.exists(destino):
+            main.logger.warning(f"{destino} ya existe; no se sobrescribe (replanificar)")
+            return "invalida"
+        huella = HuellaArchivo(origen, main.calcular_hash_medido)
+        if digest:
+            huella.completo = digest
+        existente = op.get("elimina")
+        if existente and not os.path.exists(existente):
+            existente = None
+        main.asegurar_directorio(os.path.dirname(destino))
+        destino, digest = main.colocar_en_destino(origen, destino, huella, existente, op.get("modo") or main.modo_colocacion())
+        if destino is None:
+            return "error"
+        resultado = "aplicada"
+    elif op["op"] == "link" and op.get("desde"):
+        # Duplicado global: enlace al original de la biblioteca (o copia si ya no se puede)
+        if os.path.exists(destino):
+            main.logger.warning(f"{destino} ya existe; no se sobrescribe (replanificar)")
+            return "invalida"
+        huella = HuellaArchivo(origen, main.calcular_hash_medido)
+        huella.completo = digest
+        main.asegurar_directorio(os.path.dirname(destino))
+        destino, digest = main.colocar_duplicado(origen, destino, huella, op["desde"], "link")
+        if destino is None:
+            return "error"
+        resultado = "aplicada"
+    elif op["op"] == "link":
+        destino = main.crear_enlace_duro(origen, os.path.dirname(destino))
+        if destino is None:
+            return "error"
+        resultado = "aplicada"
+    else:
+        if op.get("motivo") == "conflicto":
+            # Como al sincronizar: el archivo no se coloca ni se anota en el manifiesto
+            return "omitida"
+        if op.get("motivo") == "duplicado":
+            if not os.path.exists(destino):
+                main.logger.warning(f"{destino} ya no existe; {origen} no se omite (replanificar)")
+                return "invalida"
+            huella = HuellaArchivo(origen, main.calcular_hash_medido)
+            huella.completo = digest
+            destino, digest = main.colocar_duplicado(origen, None, huella, destino, "skip")
+        resultado = "omitida"
+
+    if main.estado_sync is not None:
+        main.estado_sync.registrar_archivo(st, op["mime"], op["fecha"], digest, destino)
+    return resultado
+
+
+# python -m photosync.plan plan PLAN.jsonl [DIR ...] | apply PLAN.jsonl
+def cli(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m photosync.plan", description="Planifica una sincronización y la aplica después.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    planificar_cmd = sub.add_parser("plan", help="escribe el plan (JSONL) sin colocar archivos")
+    planificar_cmd.add_argument("plan", help="archivo JSONL de salida")
+    planificar_cmd.add_argument("dirs", nargs="*", help="directorios cambiados (por defecto, todos los SOURCE_PATHS)")
+    aplicar_cmd = sub.add_parser("apply", help="aplica un plan")
+    aplicar_cmd.add_argument("plan", help="archivo JSONL de planificar")
+    args = parser.parse_args(argv)
+
+    main.sync_times = main.load_sync_times()
+    if args.comando == "plan":
+        planificar(args.plan, args.dirs)
+    else:
+        aplicar(args.plan)
+
+
+if __name__ == "__main__":
+    cli()
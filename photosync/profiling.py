@@ -0,0 +1,147 @@
+import collections
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from . import settings
+
+# Intervalo entre muestras del muestreador de pilas (segundos)
+INTERVALO_MUESTREO = 0.005
+
+_DESACTIVADO = ("", "0", "false", "no", "off")
+_AMBOS = ("1", "true", "yes", "on", "both")
+
+
+# Modo de perfilado configurado en PHOTOSYNC_PROFILE: None (desactivado), "cprofile",
+# "sample" o "both" (1/true/yes/on)
+def modo_perfil(valor=None):
+    if valor is None:
+        valor = getattr(settings, "PHOTOSYNC_PROFILE", "")
+    valor = str(valor).strip().lower()
+    if valor in _DESACTIVADO:
+        return None
+    if valor in _AMBOS:
+        return "both"
+    if valor in ("cprofile", "sample"):
+        return valor
+    logging.getLogger(__name__).warning("PHOTOSYNC_PROFILE=%s no válido; no se perfila", valor)
+    return None
+
+
+class MuestreadorPilas:
+    """Perfilador por muestreo de bajo coste para todos los hilos del proceso.
+
+    Un hilo toma cada ``intervalo`` segundos las pilas de los demás hilos con
+    ``sys._current_frames()`` y cuenta cada pila en formato collapsed (``hilo;f1;f2 N``,
+    de la raíz a la hoja), el que consumen flamegraph.pl o speedscope. A diferencia de
+    cProfile, ve también los hilos del pipeline (PHOTOSYNC_JOBS > 1) y el de exiftool.
+    """
+
+    def __init__(self, intervalo=INTERVALO_MUESTREO):
+        self.intervalo = intervalo
+        self.pilas = collections.Counter()
+        self.muestras = 0
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._parar.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="photosync-profiler", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._parar.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+    def _bucle(self):
+        propio = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                marcos = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    marcos.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    frame = frame.f_back
+                marcos.append(nombres.get(ident, str(ident)))
+                self.pilas[";".join(reversed(marcos))] += 1
+            self.muestras += 1
+
+    def escribir(self, ruta):
+        with open(ruta, "w", encoding="utf-8") as f:
+            for pila, cuenta in self.pilas.most_common():
+                f.write(f"{pila} {cuenta}\n")
+
+
+# Perfila el bloque según modo (por defecto PHOTOSYNC_PROFILE) y deja en directorio
+# profile-<nombre>-<fecha>-<pid>.pstats (cProfile, solo el hilo que llama) y/o .collapsed
+# (muestreo de todos los hilos). Conserva los artefactos de las últimas `conservar` ejecuciones.
+@contextmanager
+def perfilar(nombre, directorio, conservar=30, modo=None, logger=None):
+    modo = modo_perfil() if modo is None else modo_perfil(modo)
+    if modo is None:
+        yield None
+        return
+    logger = logger or logging.getLogger(__name__)
+    directorio = os.path.expanduser(directorio)
+    base = os.path.join(directorio, f"profile-{nombre}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}")
+
+    perfil = None
+    if modo in ("cprofile", "both"):
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otro perfilador ya activo en este hilo
+            logger.warning("No se puede activar cProfile; se continúa sin él")
+            perfil = None
+    muestreador = MuestreadorPilas().iniciar() if modo in ("sample", "both") else None
+    inicio = time.perf_counter()
+    try:
+        yield base
+    finally:
+        if perfil is not None:
+            perfil.disable()
+        if muestreador is not None:
+            muestreador.detener()
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            escritos = []
+            if perfil is not None:
+                perfil.dump_stats(base + ".pstats")
+                escritos.append(base + ".pstats")
+            if muestreador is not None:
+                muestreador.escribir(base + ".collapsed")
+                escritos.append(base + ".collapsed")
+            logger.info("Perfil de la ejecución (%.1fs) escrito en %s", time.perf_counter() - inicio, ", ".join(escritos))
+            limpiar_perfiles(directorio, conservar)
+        except OSError:
+            logger.exception("No se pudo escribir el perfil en %s", directorio)
+
+
+# Borra los artefactos de perfilado más antiguos y deja los de las últimas `conservar` ejecuciones
+def limpiar_perfiles(directorio, conservar):
+    ejecuciones = {}
+    for entrada in os.scandir(directorio):
+        raiz, ext = os.path.splitext(entrada.name)
+        if entrada.name.startswith("profile-") and ext in (".pstats", ".collapsed"):
+            mtime = entrada.stat().st_mtime
+            ejecuciones.setdefault(raiz, [0, []])
+            ejecuciones[raiz][0] = max(ejecuciones[raiz][0], mtime)
+            ejecuciones[raiz][1].append(entrada.path)
+    antiguas = sorted(ejecuciones.values(), key=lambda e: e[0], reverse=True)[max(0, conservar) :]
+    for _, rutas in antiguas:
+        for ruta in rutas:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
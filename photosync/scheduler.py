@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+
+
+class PlanificadorSincronizacion:
+    """Debounce de eventos del sistema de archivos con un único hilo.
+
+    Cada evento solo actualiza, bajo un lock, la ventana de espera (primer y último evento
+    con reloj monotónico) y el conjunto de directorios cambiados; no crea hilos ni timers.
+    El hilo del planificador duerme en una Condition hasta el plazo
+    ``min(último + quiet_seconds, primero + max_wait_seconds)`` y entonces llama a
+    ``disparar(motivo)`` ("quiet" o "max_wait") fuera del lock.
+
+    Los directorios se acumulan sin duplicados hasta ``max_dirs``; por encima, o si un
+    evento no indica directorios, se pide una sincronización completa. Los mensajes de
+    cada evento van a DEBUG y a INFO solo un resumen cada ``intervalo_log`` segundos.
+
+    Los eventos que llegan mientras ``disparar`` está en curso no se pierden: quedan como
+    pendientes y, al terminar, se dispara enseguida una sincronización de seguimiento
+    ("seguimiento"). Si ``disparar`` devuelve False (p. ej. el lock lo tiene otra
+    ejecución), los pendientes se conservan y se reintenta tras otra ventana de espera.
+    Si la sincronización ya había tomado los pendientes y falla, los devuelve con
+    ``devolver_pendientes`` antes de devolver False.
+
+    ``tomar_pendientes`` deja en ``ultima_espera`` los segundos transcurridos desde el
+    primer evento de lo que entrega (None si no había eventos), para medir la espera hasta
+    el inicio de cada sincronización.
+    """
+
+    def __init__(self, disparar, quiet_seconds, max_wait_seconds, max_dirs=10000, intervalo_log=30.0, logger=None, reloj=time.monotonic):
+        self.disparar = disparar
+        self.quiet_seconds = quiet_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.max_dirs = max_dirs
+        self.intervalo_log = intervalo_log
+        self.logger = logger or logging.getLogger(__name__)
+        self.reloj = reloj
+        self._cond = threading.Condition()
+        self._primero = None
+        self._ultimo = None
+        self._dirs = set()
+        self._completa = False
+        self._eventos = 0
+        self._eventos_log = 0
+        self._ultimo_log = None
+        self._parar = False
+        self._hilo = None
+        self._ejecutando = False
+        self._seguimiento = False
+        self._primer_pendiente = None
+        self.ultima_espera = None
+        self.disparos = 0
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._parar = False
+            self._hilo = threading.Thread(target=self._bucle, name="photosync-scheduler", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self, timeout=None):
+        with self._cond:
+            self._parar = True
+            self._cond.notify()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    # Registra un evento. dirs son los directorios afectados; None pide una sincronización completa.
+    def notificar(self, path, dirs=None):
+        ahora = self.reloj()
+        with self._cond:
+            self._acumular(dirs)
+            self._eventos += 1
+            if self._primer_pendiente is None:
+                self._primer_pendiente = ahora
+            if self._ejecutando:
+                # Sin ventana: se atiende con el seguimiento al terminar la ejecución en curso
+                self._seguimiento = True
+                self.logger.debug("(runner schedule) evento durante la sincronización path=%s", path)
+                return
+            self._ultimo = ahora
+            if self._primero is None:
+                self._primero = ahora
+                self._eventos_log = 0
+                self._ultimo_log = ahora
+                self.logger.info("Primer evento detectado: %s; iniciando ventana de espera (QUIET_SECONDS=%ss MAX_WAIT_SECONDS=%ss).", path, self.quiet_seconds, self.max_wait_seconds)
+                # Solo el primer evento de una ventana despierta al hilo; los demás solo
+                # retrasan el plazo, que el hilo recalcula al despertar
+                self._cond.notify()
+                return
+            self._eventos_log += 1
+            self.logger.debug("(runner schedule) evento path=%s", path)
+            if ahora - self._ultimo_log >= self.intervalo_log:
+                self.logger.info(
+                    "(runner schedule) %d eventos en los últimos %.0fs; %d directorios pendientes; disparo en %.1fs",
+                    self._eventos_log,
+                    ahora - self._ultimo_log,
+                    len(self._dirs),
+                    self._plazo() - ahora,
+                )
+                self._eventos_log = 0
+                self._ultimo_log = ahora
+
+    # Vuelve a dejar pendiente lo que tomó una sincronización que ha fallado (dirs y completa
+    # como los devolvió tomar_pendientes). No dispara nada por sí mismo: quien llama devuelve
+    # False desde disparar y el reintento llega tras otra ventana de espera.
+    def devolver_pendientes(self, dirs, completa=False):
+        if not dirs and not completa:
+            return
+        ahora = self.reloj()
+        with self._cond:
+            self._acumular(None if completa else dirs)
+            if self._primer_pendiente is None:
+                self._primer_pendiente = ahora
+
+    def _acumular(self, dirs):
+        if dirs is None:
+            self._completa = True
+            self._dirs.clear()
+        elif not self._completa:
+            self._dirs.update(dirs)
+            if len(self._dirs) > self.max_dirs:
+                self.logger.info("Más de %d directorios cambiados; se hará una sincronización completa.", self.max_dirs)
+                self._completa = True
+                self._dirs.clear()
+
+    # Devuelve (directorios ordenados, completa) acumulados hasta ahora y los vacía. Lo que
+    # se entrega ya no necesita seguimiento: solo lo piden los eventos posteriores.
+    def tomar_pendientes(self):
+        ahora = self.reloj()
+        with self._cond:
+            dirs, completa = sorted(self._dirs), self._completa
+            self._dirs = set()
+            self._completa = False
+            self._seguimiento = False
+            self.ultima_espera = None if self._primer_pendiente is None else ahora - self._primer_pendiente
+            self._primer_pendiente = None
+        return dirs, completa
+
+    @property
+    def eventos(self):
+        return self._eventos
+
+    def _plazo(self):
+        return min(self._ultimo + self.quiet_seconds, self._primero + self.max_wait_seconds)
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._parar:
+                        return
+                    if self._seguimiento:
+                        self._seguimiento = False
+                        motivo = "seguimiento"
+                        break
+                    if self._primero is None:
+                        self._cond.wait()
+                        continue
+                    ahora = self.reloj()
+                    plazo = self._plazo()
+                    if ahora < plazo:
+                        self._cond.wait(plazo - ahora)
+                        continue
+                    motivo = "quiet" if ahora - self._ultimo >= self.quiet_seconds else "max_wait"
+                    break
+                self._primero = self._ultimo = None
+                self._ejecutando = True
+            if motivo == "quiet":
+                self.logger.info("Quiet period completado; disparando sincronización.")
+            elif motivo == "max_wait":
+                self.logger.info("MAX_WAIT_SECONDS alcanzado; disparando sincronización.")
+            else:
+                self.logger.info("Cambios recibidos durante la sincronización; disparando sincronización de seguimiento.")
+            self.disparos += 1
+            resultado = None
+            try:
+                resultado = self.disparar(motivo)
+            except Exception:
+                self.logger.exception("Error en la sincronización disparada (%s)", motivo)
+            with self._cond:
+                self._ejecutando = False
+                if resultado is False and (self._dirs or self._completa):
+                    # No se pudo sincronizar: reintentar tras otra ventana sin perder pendientes
+                    self._seguimiento = False
+                    self._primero = self._ultimo = self.reloj()
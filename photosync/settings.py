@@ -9,8 +9,22 @@ from pathlib import Path
 #   PHOTOSYNC_SOURCE_PATHS       - colon-separated source directories (e.g. /mnt/a:/mnt/b)
 #   PHOTOSYNC_TARGET_PATH        - target directory for organized photos
 #   PHOTOSYNC_TAGNAME_NOTFOUND_PATH - directory for files without date metadata
-#   PHOTOSYNC_LAST_SYNC_TIME_PATH   - path to last sync timestamp file
+#   PHOTOSYNC_LAST_SYNC_TIME_PATH   - legacy JSON sync timestamp file (migrated once into the state store)
+#   PHOTOSYNC_STATE_DB_PATH      - SQLite sync state store (default: LAST_SYNC_TIME_PATH with .sqlite extension)
+#   PHOTOSYNC_STATE_COMMIT_DIRS  - commit the state store every N directories
+#   PHOTOSYNC_STATE_COMMIT_SECONDS - ... or every T seconds, whichever comes first
+#   PHOTOSYNC_HASH_INDEX_PATH    - SQLite index of target file hashes (empty disables it)
+#   PHOTOSYNC_HASH_ALGORITHM     - content hash: sha256 (default), blake2b, xxh3 or blake3 (last two if installed)
+#   PHOTOSYNC_HASH_BUFFER_SIZE   - read buffer in bytes for hashing (default 1 MiB)
+#   PHOTOSYNC_HASH_MMAP_THRESHOLD - hash files of at least this many bytes through mmap (0 disables)
 #   PHOTOSYNC_DRY_RUN            - set to "1", "true", "yes", or "on" to enable dry-run mode
+#   PHOTOSYNC_PLACE_MODE         - copy (default), link (hardlink) or move; falls back to copy across filesystems
+#   PHOTOSYNC_JOBS               - worker threads for the file pipeline (1 = sequential)
+#   PHOTOSYNC_EXIF_BATCH_SIZE    - files per exiftool -json call (1 disables batching)
+#   PHOTOSYNC_EXIFTOOL_TIMEOUT   - seconds to wait for the persistent exiftool process before restarting it
+#   PHOTOSYNC_GLOBAL_DEDUP       - off (default), skip or link: content already anywhere in TARGET_PATH (per the hash index) is not copied again
+#   PHOTOSYNC_PROFILE            - profile each run: cprofile (.pstats), sample (collapsed stacks) or 1 for both; written to ~/.cache/photosync/logs
+#   PHOTOSYNC_METRICS_DIR        - directory for the per-run metrics (photosync.prom textfile + photosync.json); empty (default) disables
 
 try:
     from dotenv import load_dotenv
@@ -41,8 +55,38 @@ else:
 TARGET_PATH = _expand_path(os.environ.get("PHOTOSYNC_TARGET_PATH", ""))
 TAGNAME_NOTFOUND_PATH = _expand_path(os.environ.get("PHOTOSYNC_TAGNAME_NOTFOUND_PATH", ""))
 LAST_SYNC_TIME_PATH = _expand_path(os.environ.get("PHOTOSYNC_LAST_SYNC_TIME_PATH", "~/.cache/photosync/.photosync_last.json"))
+PHOTOSYNC_HASH_INDEX_PATH = _expand_path(os.environ.get("PHOTOSYNC_HASH_INDEX_PATH", "~/.cache/photosync/hash_index.sqlite"))
+PHOTOSYNC_STATE_DB_PATH = _expand_path(os.environ.get("PHOTOSYNC_STATE_DB_PATH", ""))
+PHOTOSYNC_STATE_COMMIT_DIRS = max(1, int(os.environ.get("PHOTOSYNC_STATE_COMMIT_DIRS", "100")))
+PHOTOSYNC_STATE_COMMIT_SECONDS = float(os.environ.get("PHOTOSYNC_STATE_COMMIT_SECONDS", "5"))
 DRY_RUN = os.environ.get("PHOTOSYNC_DRY_RUN", "").lower() in ("1", "true", "yes", "on")
 PHOTOSYNC_SYNC_HIDDEN = os.environ.get("PHOTOSYNC_SYNC_HIDDEN", "0").lower() in ("1", "true", "yes", "on")
 
 # Habilita modo verbose (mostrar DEBUG y permitir ver mensajes de omisión)
 PHOTOSYNC_VERBOSE = os.environ.get("PHOTOSYNC_VERBOSE", "0").lower() in ("1", "true", "yes", "on")
+
+# Segundos de espera a la sesión exiftool persistente antes de reiniciarla
+PHOTOSYNC_EXIFTOOL_TIMEOUT = float(os.environ.get("PHOTOSYNC_EXIFTOOL_TIMEOUT", "60"))
+
+# Número de archivos por llamada a exiftool -json (1 = una llamada por archivo)
+PHOTOSYNC_EXIF_BATCH_SIZE = max(1, int(os.environ.get("PHOTOSYNC_EXIF_BATCH_SIZE", "100")))
+
+# Hilos del pipeline de archivos (clasificar, fechas, hash, colocar); 1 = secuencial
+PHOTOSYNC_JOBS = max(1, int(os.environ.get("PHOTOSYNC_JOBS", "1")))
+
+# Cómo se colocan los archivos con fecha en TARGET_PATH: copy, link (enlace duro) o move
+PHOTOSYNC_PLACE_MODE = os.environ.get("PHOTOSYNC_PLACE_MODE", "copy").strip().lower()
+
+# Algoritmo del hash de contenido y parámetros de lectura
+PHOTOSYNC_HASH_ALGORITHM = os.environ.get("PHOTOSYNC_HASH_ALGORITHM", "sha256").strip().lower()
+PHOTOSYNC_HASH_BUFFER_SIZE = max(4096, int(os.environ.get("PHOTOSYNC_HASH_BUFFER_SIZE", str(1024 * 1024))))
+PHOTOSYNC_HASH_MMAP_THRESHOLD = max(0, int(os.environ.get("PHOTOSYNC_HASH_MMAP_THRESHOLD", "0")))
+
+# Directorio de las métricas por etapa de cada ejecución (textfile de Prometheus y JSON); vacío (por defecto) las desactiva
+PHOTOSYNC_METRICS_DIR = _expand_path(os.environ.get("PHOTOSYNC_METRICS_DIR", ""))
+
+# Perfilado de cada ejecución (init.py, photosync-run y el motor residente): cprofile, sample o 1 (ambos)
+PHOTOSYNC_PROFILE = os.environ.get("PHOTOSYNC_PROFILE", "0").strip().lower()
+
+# Deduplicación global por contenido en toda la biblioteca destino (índice de hashes): off, skip o link
+PHOTOSYNC_GLOBAL_DEDUP = os.environ.get("PHOTOSYNC_GLOBAL_DEDUP", "off").strip().lower()
@@ -0,0 +1,100 @@
+import os
+from datetime import datetime
+
+from .utils import is_hidden_name, is_hidden_path
+from .walker import escanear, recorrer
+
+# Formato de los tiempos de sincronización guardados por photosync.main
+FORMATO_SYNC = "%Y-%m-%d %H:%M:%S"
+
+
+class InstantaneaDirectorios:
+    """Instantánea en memoria de (mtime_ns, inode) de cada directorio de los árboles origen.
+
+    Pensada para sondear sistemas de archivos sin inotify (NFS/SMB): cada ciclo hace un
+    stat por directorio conocido, sin leer JSON ni parsear fechas, y solo vuelve a leer
+    (scandir) los directorios cuyo mtime o inode ha cambiado, para descubrir subdirectorios
+    nuevos, que se añaden con todo su subárbol. Las raíces que aún no existían se
+    incorporan en cuanto aparecen.
+    """
+
+    def __init__(self, raices, incluir_ocultos=False):
+        self.raices = list(raices)
+        self.incluir_ocultos = incluir_ocultos
+        self._dirs = {}
+
+    def __len__(self):
+        return len(self._dirs)
+
+    def __contains__(self, ruta):
+        return ruta in self._dirs
+
+    def construir(self, sync_times=None, tolerancia=0.0):
+        """Recorre las raíces y guarda la firma de cada directorio.
+
+        Si se pasa sync_times (ruta -> "YYYY-mm-dd HH:MM:SS"), devuelve los directorios que
+        han cambiado desde su última sincronización o que nunca se han sincronizado, para
+        recuperar los cambios ocurridos mientras el watcher no estaba en marcha.
+        """
+        self._dirs = {}
+        pendientes = set()
+        for raiz in self.raices:
+            for ruta, st in self._recorrer(raiz):
+                if sync_times is not None and _pendiente(ruta, st, sync_times, tolerancia):
+                    pendientes.add(ruta)
+        return pendientes
+
+    def comparar(self):
+        """Devuelve el conjunto de directorios cambiados desde la última llamada y actualiza la instantánea."""
+        cambiados = set()
+        for ruta, firma in list(self._dirs.items()):
+            if ruta not in self._dirs:
+                continue
+            try:
+                st = os.stat(ruta)
+            except OSError:
+                # Directorio borrado: el cambio lo refleja el mtime de su padre
+                del self._dirs[ruta]
+                continue
+            if (st.st_mtime_ns, st.st_ino) == firma:
+                continue
+            cambiados.add(ruta)
+            self._dirs[ruta] = (st.st_mtime_ns, st.st_ino)
+            try:
+                _, subdirectorios = escanear(ruta)
+            except OSError:
+                continue
+            for sub in subdirectorios:
+                if sub.path not in self._dirs and self._visible(sub.name):
+                    cambiados.update(r for r, _ in self._recorrer(sub.path))
+        for raiz in self.raices:
+            if raiz not in self._dirs and os.path.isdir(raiz):
+                cambiados.update(r for r, _ in self._recorrer(raiz))
+        return cambiados
+
+    def _visible(self, nombre):
+        return self.incluir_ocultos or not is_hidden_name(nombre)
+
+    # Añade el subárbol de ruta a la instantánea y genera (ruta, stat) de cada directorio
+    def _recorrer(self, ruta):
+        if not self.incluir_ocultos and is_hidden_path(ruta):
+            return
+        try:
+            for directorio in recorrer(ruta):
+                directorio.subdirectorios[:] = [sub for sub in directorio.subdirectorios if self._visible(sub.name)]
+                self._dirs[directorio.ruta] = (directorio.stat.st_mtime_ns, directorio.stat.st_ino)
+                yield directorio.ruta, directorio.stat
+        except OSError:
+            return
+
+
+def _pendiente(ruta, st, sync_times, tolerancia):
+    registro = sync_times.get(ruta)
+    if registro is None:
+        return True
+    try:
+        sincronizado = datetime.strptime(str(registro), FORMATO_SYNC).timestamp()
+    except ValueError:
+        return True
+    # main guarda el ctime truncado a segundos: hay cambios si ctime >= guardado + 1 s
+    return st.st_ctime >= sincronizado + 1 + tolerancia
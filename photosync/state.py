@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Ruta del almacén: PHOTOSYNC_STATE_DB_PATH o, si no se define, junto al antiguo JSON
+# de tiempos (LAST_SYNC_TIME_PATH) con extensión .sqlite
+def ruta_estado_por_defecto(ruta_json, ruta_db=None):
+    if ruta_db:
+        return os.path.abspath(os.path.expanduser(ruta_db))
+    return os.path.splitext(os.path.abspath(os.path.expanduser(ruta_json)))[0] + ".sqlite"
+
+
+def leer_sync_times(ruta_db):
+    """Lee el estado sin tomar locks de escritura (modo solo lectura; WAL permite leer mientras se escribe).
+
+    Devuelve {} si el almacén no existe o no se puede leer.
+    """
+    if not os.path.exists(ruta_db):
+        return {}
+    try:
+        conn = sqlite3.connect(f"file:{ruta_db}?mode=ro", uri=True, timeout=1.0)
+        try:
+            return dict(conn.execute("SELECT path, synced_at FROM sync_times"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+
+
+class EstadoSincronizacion:
+    """Almacén SQLite (modo WAL) de los tiempos de sincronización por directorio.
+
+    Sustituye al JSON que se reescribía entero tras cada directorio: cada directorio es
+    un upsert y las escrituras se confirman en bloque cada ``lote_dirs`` directorios o
+    ``intervalo`` segundos, y siempre al cerrar. Un corte a mitad de ejecución pierde
+    como mucho el último bloque sin confirmar, nunca el almacén completo.
+
+    También guarda el manifiesto por archivo: para cada (st_dev, st_ino) del origen, el
+    tamaño y mtime_ns con los que se procesó, su tipo MIME, la fecha extraída, el hash y
+    el destino final, incluidos los resultados negativos (sin fecha, no multimedia). El
+    hash se guarda con su algoritmo: una entrada con hash de otro algoritmo (tras cambiar
+    PHOTOSYNC_HASH_ALGORITHM) cuenta como ausente, igual que en el índice de hashes.
+    """
+
+    def __init__(self, ruta_db, lote_dirs=100, intervalo=5.0, algoritmo="sha256"):
+        self.ruta_db = ruta_db
+        self.lote_dirs = lote_dirs
+        self.intervalo = intervalo
+        self.algoritmo = algoritmo
+        if os.path.dirname(ruta_db):
+            os.makedirs(os.path.dirname(ruta_db), exist_ok=True)
+        self._conn = sqlite3.connect(ruta_db, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sync_times (path TEXT PRIMARY KEY, synced_at TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest (dev INTEGER NOT NULL, ino INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "mime TEXT, fecha TEXT, digest TEXT, destino TEXT, algoritmo TEXT, PRIMARY KEY (dev, ino))"
+        )
+        columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(manifest)")}
+        if "algoritmo" not in columnas:
+            # Manifiestos anteriores no guardaban el algoritmo: sus hashes no se reutilizan
+            self._conn.execute("ALTER TABLE manifest ADD COLUMN algoritmo TEXT")
+        self._lock = threading.RLock()
+        self._pendientes = 0
+        self._inicio_transaccion = None
+
+    def cargar(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT path, synced_at FROM sync_times"))
+
+    # Resultado guardado para el archivo con stat st, o None si no hay entrada o el archivo ha cambiado
+    def consultar_archivo(self, st):
+        with self._lock:
+            fila = self._conn.execute("SELECT size, mtime_ns, mime, fecha, digest, destino, algoritmo FROM manifest WHERE dev = ? AND ino = ?", (st.st_dev, st.st_ino)).fetchone()
+        if fila is None or (fila[0], fila[1]) != (st.st_size, st.st_mtime_ns):
+            return None
+        if fila[4] is not None and fila[6] != self.algoritmo:
+            return None
+        return {"mime": fila[2], "fecha": fila[3], "digest": fila[4], "destino": fila[5]}
+
+    def registrar_archivo(self, st, mime, fecha=None, digest=None, destino=None):
+        self._escribir(
+            "INSERT INTO manifest (dev, ino, size, mtime_ns, mime, fecha, digest, destino, algoritmo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(dev, ino) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns, mime = excluded.mime, fecha = excluded.fecha, digest = excluded.digest, destino = excluded.destino, algoritmo = excluded.algoritmo",
+            (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, mime, fecha, digest, destino, self.algoritmo if digest is not None else None),
+        )
+
+    # Importa el antiguo JSON de tiempos si el almacén está vacío (una sola vez)
+    def migrar_json(self, ruta_json):
+        if not ruta_json or not os.path.exists(ruta_json):
+            return 0
+        with self._lock:
+            ya_migrado = self._conn.execute("SELECT 1 FROM sync_times LIMIT 1").fetchone() is not None
+        if ya_migrado:
+            return 0
+        try:
+            with open(ruta_json, "r") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if not isinstance(datos, dict):
+            return 0
+        self.guardar_todos(datos)
+        return len(datos)
+
+    def guardar(self, path, synced_at):
+        self._escribir(
+            "INSERT INTO sync_times (path, synced_at) VALUES (?, ?) ON CONFLICT(path) DO UPDATE SET synced_at = excluded.synced_at",
+            (path, synced_at),
+            cuenta=True,
+        )
+
+    # Ejecuta una escritura dentro de la transacción en curso; cuenta=True la computa
+    # como un directorio para la confirmación en bloque
+    def _escribir(self, sql, params, cuenta=False):
+        with self._lock:
+            if self._inicio_transaccion is None:
+                self._conn.execute("BEGIN")
+                self._inicio_transaccion = time.monotonic()
+            self._conn.execute(sql, params)
+            if cuenta:
+                self._pendientes += 1
+            if self._pendientes >= self.lote_dirs or time.monotonic() - self._inicio_transaccion >= self.intervalo:
+                self.confirmar()
+
+    def guardar_todos(self, entradas):
+        with self._lock:
+            for path, synced_at in entradas.items():
+                self.guardar(path, str(synced_at))
+            self.confirmar()
+
+    def confirmar(self):
+        with self._lock:
+            if self._inicio_transaccion is not None:
+                self._conn.execute("COMMIT")
+            self._pendientes = 0
+            self._inicio_transaccion = None
+
+    def cerrar(self):
+        with self._lock:
+            self.confirmar()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -1,17 +1,38 @@
+import functools
 import os
 from pathlib import Path
 
 
+def is_hidden_name(name: str) -> bool:
+    """Return True if a single path component (a basename) is hidden."""
+    return name.startswith(".")
+
+
+@functools.lru_cache(maxsize=4096)
 def is_hidden_path(p: str) -> bool:
     """Return True if any path component starts with a dot.
 
     Uses realpath() to canonicalize path; falls back to basename check on error.
+    Results are cached (LRU) because the watcher asks about the same directories for
+    every event inside them. Tree walks should check the root once with this function
+    and then only each child's basename with is_hidden_name.
     """
     if not p:
         return False
     try:
         rp = os.path.realpath(p)
         parts = Path(rp).parts
-        return any(part.startswith(".") for part in parts)
+        return any(is_hidden_name(part) for part in parts)
     except Exception:
-        return Path(p).name.startswith(".")
+        return is_hidden_name(Path(p).name)
+
+
+def is_hidden_entry(p: str) -> bool:
+    """Same answer as is_hidden_path for a file or directory path, checking only its basename
+    and caching the (usually repeated) parent directory. Meant for event handlers, where many
+    distinct files arrive under the same few directories.
+    """
+    if not p:
+        return False
+    p = os.path.abspath(p)
+    return is_hidden_name(os.path.basename(p)) or is_hidden_path(os.path.dirname(p))
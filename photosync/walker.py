@@ -0,0 +1,54 @@
+import os
+
+
+class Directorio:
+    """Un directorio visitado por ``recorrer``.
+
+    ``archivos`` y ``subdirectorios`` son los ``os.DirEntry`` devueltos por scandir:
+    su ``stat()`` se hace como mucho una vez y queda en caché en la propia entrada.
+    ``stat`` es el del directorio, tomado de la entrada de su padre (o de la raíz).
+    """
+
+    __slots__ = ("ruta", "stat", "archivos", "subdirectorios")
+
+    def __init__(self, ruta, stat, archivos, subdirectorios):
+        self.ruta = ruta
+        self.stat = stat
+        self.archivos = archivos
+        self.subdirectorios = subdirectorios
+
+
+def escanear(ruta):
+    """Lee un directorio con una sola pasada de scandir y separa archivos y subdirectorios."""
+    archivos = []
+    subdirectorios = []
+    with os.scandir(ruta) as entradas:
+        for entrada in entradas:
+            if entrada.is_dir():
+                subdirectorios.append(entrada)
+            elif entrada.is_file():
+                archivos.append(entrada)
+    return archivos, subdirectorios
+
+
+def recorrer(raiz):
+    """Recorre el árbol bajo raiz en preorden, sin recursión, y genera un ``Directorio`` por nivel.
+
+    El orden es el mismo que el de la recursión clásica (directorio y después sus
+    subdirectorios en el orden de scandir). Como en ``os.walk`` con topdown, quien
+    consume el generador puede podar ``subdirectorios`` antes de pedir el siguiente.
+    Los directorios que desaparecen o no se pueden leer durante el recorrido se omiten.
+    """
+    pila = [(raiz, None)]
+    while pila:
+        ruta, entrada = pila.pop()
+        try:
+            st = entrada.stat() if entrada is not None else os.stat(ruta)
+            archivos, subdirectorios = escanear(ruta)
+        except OSError:
+            if entrada is None:
+                raise
+            continue
+        directorio = Directorio(ruta, st, archivos, subdirectorios)
+        yield directorio
+        pila.extend((sub.path, sub) for sub in reversed(directorio.subdirectorios))
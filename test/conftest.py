@@ -0,0 +1,8 @@
+import pytest
+from photosync import settings
+
+
+# Ningún test escribe métricas en el directorio real (PHOTOSYNC_METRICS_DIR puede venir del entorno)
+@pytest.fixture(autouse=True)
+def sin_exportar_metricas(monkeypatch):
+    monkeypatch.setattr(settings, "PHOTOSYNC_METRICS_DIR", "")
@@ -0,0 +1,67 @@
+import os
+from photosync import main, settings
+
+
+def _crear(base, rutas):
+    for ruta in rutas:
+        completa = os.path.join(base, ruta)
+        os.makedirs(os.path.dirname(completa), exist_ok=True)
+        with open(completa, "wb") as f:
+            f.write(ruta.encode())
+
+
+def _preparar(tmp_path, monkeypatch):
+    base = os.path.join(tmp_path, "movil")
+    target = os.path.join(tmp_path, "fotos")
+    _crear(base, ["DCIM/IMG_0001.jpg", "WhatsApp/IMG_0002.jpg", "WhatsApp/Sent/IMG_0003.jpg"])
+
+    clasificados = []
+
+    def detectar(archivo):
+        clasificados.append(os.path.relpath(archivo, base))
+        return "image/jpeg"
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+    monkeypatch.setattr(main, "detectar_tipo_archivo", detectar)
+    monkeypatch.setattr(main, "obtener_fechas_exif_lote", lambda lote: {a: (None, None) for a in lote})
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(settings, "SOURCE_PATHS", [base])
+    monkeypatch.setattr(settings, "TARGET_PATH", target)
+    monkeypatch.setattr(settings, "TAGNAME_NOTFOUND_PATH", os.path.join(target, "no_date"))
+    monkeypatch.setattr(settings, "LAST_SYNC_TIME_PATH", os.path.join(tmp_path, ".photosync_last.json"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+    return base, clasificados
+
+
+def test_solo_directorios_cambiados_y_subdirectorios_nuevos(tmp_path, monkeypatch):
+    base, clasificados = _preparar(tmp_path, monkeypatch)
+    main.process_folder(base)
+    assert len(clasificados) == 3
+
+    # Foto nueva en DCIM y un álbum nuevo dentro; WhatsApp no cambia y no se lee
+    clasificados.clear()
+    _crear(base, ["DCIM/IMG_0004.jpg", "DCIM/Album/IMG_0005.jpg"])
+    for path in list(main.sync_times):
+        main.sync_times[path] = "2000-01-01 00:00:00" if path.endswith("DCIM") else main.sync_times[path]
+
+    leidos = []
+    sincronizar = main.sincronizar_directorio
+    monkeypatch.setattr(main, "sincronizar_directorio", lambda d: leidos.append(os.path.relpath(d.ruta, base)) or sincronizar(d))
+
+    main.process_changed_dirs([os.path.join(base, "DCIM"), os.path.join(base, "DCIM") + os.sep])
+
+    assert leidos == ["DCIM", os.path.join("DCIM", "Album")]
+    assert sorted(clasificados) == [os.path.join("DCIM", "Album", "IMG_0005.jpg"), os.path.join("DCIM", "IMG_0004.jpg")]
+    assert os.path.join(base, "DCIM", "Album") in main.sync_times
+
+
+def test_ignora_rutas_fuera_de_origen(tmp_path, monkeypatch):
+    base, clasificados = _preparar(tmp_path, monkeypatch)
+
+    main.process_changed_dirs([str(tmp_path), os.path.join(base, "no_existe")])
+
+    assert clasificados == []
+    assert main.sync_times == {}
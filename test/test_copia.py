@@ -0,0 +1,69 @@
+import errno
+import os
+import pytest
+from photosync import copia
+from photosync.copia import copiar_con_hash
+from photosync.hashing import calcular_hash_archivo
+
+
+def test_copia_y_hash_en_una_pasada(tmp_path):
+    origen = os.path.join(tmp_path, "IMG_5154.MP4")
+    destino_dir = os.path.join(tmp_path, "fotos")
+    os.makedirs(destino_dir)
+    contenido = os.urandom(3 * 1024 * 1024 + 17)
+    with open(origen, "wb") as f:
+        f.write(contenido)
+    os.utime(origen, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+
+    destino = os.path.join(destino_dir, "20240901_190032_5154.MP4")
+    digest = copiar_con_hash(origen, destino)
+
+    assert digest == calcular_hash_archivo(origen)
+    with open(destino, "rb") as f:
+        assert f.read() == contenido
+    assert os.stat(destino).st_mtime_ns == os.stat(origen).st_mtime_ns
+    assert os.listdir(destino_dir) == ["20240901_190032_5154.MP4"]
+
+
+def test_copia_fallida_no_deja_temporales(tmp_path):
+    destino_dir = os.path.join(tmp_path, "fotos")
+    os.makedirs(destino_dir)
+
+    with pytest.raises(FileNotFoundError):
+        copiar_con_hash(os.path.join(tmp_path, "no_existe.jpg"), os.path.join(destino_dir, "x.jpg"))
+
+    assert os.listdir(destino_dir) == []
+
+
+def test_copiar_archivo_recuerda_estrategia(tmp_path, monkeypatch):
+    origen = os.path.join(tmp_path, "IMG_5155.MOV")
+    with open(origen, "wb") as f:
+        f.write(os.urandom(256 * 1024))
+    monkeypatch.setattr(copia, "_estrategias", {})
+
+    estrategia, digest = copia.copiar_archivo(origen, os.path.join(tmp_path, "a.MOV"))
+
+    assert estrategia in copia.ESTRATEGIAS
+    assert digest is None or digest == calcular_hash_archivo(origen)
+    with open(os.path.join(tmp_path, "a.MOV"), "rb") as f, open(origen, "rb") as g:
+        assert f.read() == g.read()
+    assert list(copia._estrategias.values()) == [estrategia]
+
+
+def test_copiar_archivo_cae_a_espacio_de_usuario(tmp_path, monkeypatch):
+    origen = os.path.join(tmp_path, "IMG_5155.MOV")
+    with open(origen, "wb") as f:
+        f.write(b"contenido")
+
+    def sin_soporte(*args):
+        raise OSError(errno.EXDEV, "cross-device")
+
+    monkeypatch.setattr(copia, "_estrategias", {})
+    monkeypatch.setattr(copia, "fcntl", None)
+    monkeypatch.setattr(os, "copy_file_range", sin_soporte, raising=False)
+
+    estrategia, digest = copia.copiar_archivo(origen, os.path.join(tmp_path, "a.MOV"))
+
+    assert estrategia == copia.USERSPACE
+    assert digest == calcular_hash_archivo(origen)
+    assert sorted(os.listdir(tmp_path)) == ["IMG_5155.MOV", "a.MOV"]
@@ -0,0 +1,70 @@
+import os
+from photosync import main, settings
+from photosync.hashindex import IndiceHashes
+from photosync.metrics import MetricasSincronizacion
+
+
+def _escribir(ruta, contenido):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+
+
+def _biblioteca(tmp_path):
+    original = os.path.join(tmp_path, "fotos", "2023", "2023-01", "20230105_101010.jpg")
+    _escribir(original, b"misma foto")
+    origen = os.path.join(tmp_path, "movil", "copia.jpg")
+    _escribir(origen, b"misma foto")
+    return original, origen, os.path.join(tmp_path, "fotos", "2024", "2024-09")
+
+
+def test_buscar_por_digest_valida_stat(tmp_path):
+    a = os.path.join(tmp_path, "a.jpg")
+    b = os.path.join(tmp_path, "b.jpg")
+    _escribir(a, b"igual")
+    _escribir(b, b"igual")
+    digest = main.calcular_hash_archivo(a)
+
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), main.calcular_hash_archivo) as indice:
+        indice.registrar(a, digest)
+        indice.registrar(b, digest)
+        assert indice.buscar_por_digest("otro") is None
+        # a ha desaparecido (se borra su fila) y b ha cambiado desde que se indexó
+        os.remove(a)
+        os.utime(b, ns=(1, 1))
+        assert indice.buscar_por_digest(digest) is None
+        assert indice._conn.execute("SELECT path FROM hashes").fetchall() == [(b,)]
+
+
+def test_dedup_skip_no_copia_contenido_de_la_biblioteca(tmp_path, monkeypatch):
+    original, origen, nueva_ruta = _biblioteca(tmp_path)
+    monkeypatch.setattr(settings, "PHOTOSYNC_GLOBAL_DEDUP", "skip")
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+    monkeypatch.setattr(main, "metricas", MetricasSincronizacion())
+
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), main.calcular_hash_archivo) as indice:
+        monkeypatch.setattr(main, "indice_hashes", indice)
+        indice.reconstruir(os.path.join(tmp_path, "fotos"))
+        destino, digest = main.copiar_y_renombrar_archivo(origen, nueva_ruta, "20240901_102905.jpg")
+
+    assert destino == original
+    assert digest == main.calcular_hash_archivo(origen)
+    assert not os.path.exists(nueva_ruta)
+    dedup = main.metricas.resumen()["etapas"]["dedup"]
+    assert (dedup["archivos"], dedup["bytes"]) == (1, len(b"misma foto"))
+
+
+def test_dedup_link_enlaza_al_original(tmp_path, monkeypatch):
+    original, origen, nueva_ruta = _biblioteca(tmp_path)
+    monkeypatch.setattr(settings, "PHOTOSYNC_GLOBAL_DEDUP", "link")
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), main.calcular_hash_archivo) as indice:
+        monkeypatch.setattr(main, "indice_hashes", indice)
+        indice.reconstruir(os.path.join(tmp_path, "fotos"))
+        destino, _ = main.copiar_y_renombrar_archivo(origen, nueva_ruta, "20240901_102905.jpg")
+        assert destino == os.path.join(nueva_ruta, "20240901_102905.jpg")
+        assert os.path.samefile(destino, original)
+        # El enlace queda indexado como cualquier otro archivo de la biblioteca
+        assert indice.obtener_hash(destino) == main.calcular_hash_archivo(origen)
+        assert indice.fallos == 0
@@ -0,0 +1,71 @@
+import os
+from photosync import main, settings
+from photosync.dircache import CacheDestino
+
+
+def test_cache_destino_un_scandir_por_directorio(tmp_path, monkeypatch):
+    directorio = os.path.join(tmp_path, "2024", "2024-09")
+    cache = CacheDestino()
+    cache.asegurar(directorio)
+    open(os.path.join(directorio, "a.jpg"), "w").close()
+
+    lecturas = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda ruta: lecturas.append(ruta) or scandir(ruta))
+    makedirs = []
+    monkeypatch.setattr(os, "makedirs", lambda ruta, exist_ok=False: makedirs.append(ruta))
+
+    assert cache.existe(os.path.join(directorio, "a.jpg"))
+    assert not cache.existe(os.path.join(directorio, "a_1.jpg"))
+    cache.anotar(os.path.join(directorio, "a_1.jpg"))
+    assert cache.existe(os.path.join(directorio, "a_1.jpg"))
+    cache.quitar(os.path.join(directorio, "a.jpg"))
+    assert not cache.existe(os.path.join(directorio, "a.jpg"))
+    cache.asegurar(directorio)
+    assert lecturas == [directorio] and makedirs == []
+
+    # Un directorio que aún no existe se cachea vacío
+    assert not cache.existe(os.path.join(tmp_path, "2025", "2025-01", "b.jpg"))
+
+    cache.vaciar()
+    assert cache.existe(os.path.join(directorio, "a.jpg"))
+    assert len(lecturas) == 3
+
+
+def test_rafaga_sin_stat_por_sufijo(tmp_path, monkeypatch):
+    base = os.path.join(tmp_path, "movil")
+    target = os.path.join(tmp_path, "fotos")
+    os.makedirs(base)
+    for i in range(5):
+        os.makedirs(os.path.join(base, f"r{i}"))
+        with open(os.path.join(base, f"r{i}", "IMG_0001.jpg"), "wb") as f:
+            f.write(f"rafaga {i}".encode())
+
+    def fechas(lote):
+        fecha = main.datetime(2024, 9, 1, 10, 29, 5)
+        return {a: (fecha.strftime("%Y%m%d_%H%M%S"), fecha) for a in lote}
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+    monkeypatch.setattr(main, "detectar_tipo_archivo", lambda archivo: "image/jpeg")
+    monkeypatch.setattr(main, "obtener_fechas_exif_lote", fechas)
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(settings, "TARGET_PATH", target)
+    monkeypatch.setattr(settings, "TAGNAME_NOTFOUND_PATH", os.path.join(target, "no_date"))
+    monkeypatch.setattr(settings, "LAST_SYNC_TIME_PATH", os.path.join(tmp_path, ".photosync_last.json"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_METRICS_DIR", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+
+    mes = os.path.join(target, "2024", "2024-09")
+    sondeos = []
+    exists = os.path.exists
+    monkeypatch.setattr(os.path, "exists", lambda ruta: (str(ruta).startswith(mes) and sondeos.append(ruta)) or exists(ruta))
+
+    main.process_folder(base)
+
+    assert sorted(os.listdir(mes)) == ["20240901_102905_0001.jpg"] + [f"20240901_102905_0001_{i}.jpg" for i in range(1, 5)]
+    # Ningún os.path.exists en el mes: los sufijos libres salen de la caché de nombres
+    assert sondeos == []
+    assert main.cache_destino is None
@@ -0,0 +1,69 @@
+import os
+import pytest
+from photosync import main, settings
+from photosync.engine import MotorResidente
+from photosync.state import leer_sync_times
+
+
+def test_motor_mantiene_recursos_entre_ejecuciones(tmp_path, monkeypatch):
+    base = os.path.join(tmp_path, "movil")
+    target = os.path.join(tmp_path, "fotos")
+    os.makedirs(os.path.join(base, "DCIM"))
+    with open(os.path.join(base, "DCIM", "IMG_0001.jpg"), "wb") as f:
+        f.write(b"foto")
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+    monkeypatch.setattr(main, "detectar_tipo_archivo", lambda archivo: "image/jpeg")
+    monkeypatch.setattr(main, "obtener_fechas_exif_lote", lambda lote: {a: (None, None) for a in lote})
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(settings, "SOURCE_PATHS", [base])
+    monkeypatch.setattr(settings, "TARGET_PATH", target)
+    monkeypatch.setattr(settings, "TAGNAME_NOTFOUND_PATH", os.path.join(target, "no_date"))
+    monkeypatch.setattr(settings, "LAST_SYNC_TIME_PATH", os.path.join(tmp_path, ".photosync_last.json"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", os.path.join(tmp_path, "hash_index.sqlite"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+
+    recursos = []
+    sincronizar = main.sincronizar_directorio
+
+    def sincronizar_registrando(directorio):
+        recursos.append((main.estado_sync, main.indice_hashes))
+        sincronizar(directorio)
+
+    monkeypatch.setattr(main, "sincronizar_directorio", sincronizar_registrando)
+
+    with MotorResidente() as motor:
+        motor.ejecutar()
+        # El estado queda confirmado al terminar cada ejecución, aunque el almacén siga abierto
+        assert os.path.join(base, "DCIM") in leer_sync_times(main.ruta_estado())
+        motor.ejecutar([os.path.join(base, "DCIM")])
+        assert motor.ejecuciones == 2
+
+    # Completa (raíz y DCIM) y dirigida (DCIM)
+    assert len(recursos) == 3
+    assert recursos[0][0] is not None and recursos[0][1] is not None
+    assert all(r == recursos[0] for r in recursos)
+    # Al detener el motor se cierran sus recursos
+    assert main.estado_sync is None and main.indice_hashes is None
+    assert os.path.exists(os.path.join(target, "no_date", "IMG_0001.jpg"))
+
+
+def test_motor_que_falla_al_arrancar_lanza_error(monkeypatch):
+    from contextlib import contextmanager
+
+    @contextmanager
+    def recursos_rotos():
+        raise OSError("sin acceso al almacén")
+        yield
+
+    monkeypatch.setattr(main, "load_sync_times", lambda: {})
+    monkeypatch.setattr(main, "recursos_sincronizacion", recursos_rotos)
+
+    motor = MotorResidente()
+    # No devuelve un motor parado: el watcher recurre a photosync-run
+    with pytest.raises(RuntimeError) as error:
+        motor.iniciar()
+    assert isinstance(error.value.__cause__, OSError)
+    assert motor._hilo is None
@@ -0,0 +1,109 @@
+import os
+import sys
+import stat
+import pytest
+from photosync import main
+from photosync.exiftool import ErrorExiftool, SesionExiftool
+
+# Simula el protocolo de exiftool -stay_open: lee argumentos por stdin y responde
+# con "{readyN}" tras cada -executeN. Un archivo llamado "crash" termina el proceso.
+FAKE_EXIFTOOL = """#!{python}
+import os, sys
+print("start", os.getpid(), file=open({log!r}, "a"))
+args = []
+for linea in sys.stdin:
+    linea = linea.rstrip("\\n")
+    if linea.startswith("-execute"):
+        if any(a.endswith("crash") for a in args):
+            sys.exit(1)
+        for a in args:
+            if not a.startswith("-"):
+                print("Date/Time Original              : 2024:09:01 10:29:05")
+        print("{{ready" + linea[len("-execute"):] + "}}", flush=True)
+        args = []
+    elif args[-1:] == ["-stay_open"] and linea == "False":
+        sys.exit(0)
+    else:
+        args.append(linea)
+"""
+
+
+@pytest.fixture
+def fake_exiftool(tmp_path):
+    log = os.path.join(tmp_path, "arranques.log")
+    script = os.path.join(tmp_path, "exiftool")
+    with open(script, "w") as f:
+        f.write(FAKE_EXIFTOOL.format(python=sys.executable, log=log))
+    os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+    return script, log
+
+
+def _arranques(log):
+    with open(log) as f:
+        return len(f.readlines())
+
+
+def test_sesion_reutiliza_proceso(fake_exiftool):
+    script, log = fake_exiftool
+    with SesionExiftool(script, timeout=10) as sesion:
+        for i in range(5):
+            salida = sesion.ejecutar("-DateTimeOriginal", f"/tmp/IMG_{i}.jpg")
+            assert "2024:09:01 10:29:05" in salida
+    assert _arranques(log) == 1
+
+
+def test_sesion_reinicia_tras_caida(fake_exiftool):
+    script, log = fake_exiftool
+    with SesionExiftool(script, timeout=10, reintentos=1) as sesion:
+        with pytest.raises(ErrorExiftool):
+            sesion.ejecutar("-DateTimeOriginal", "/tmp/crash")
+        # El watchdog relanza el proceso en la siguiente petición
+        assert "2024:09:01" in sesion.ejecutar("-DateTimeOriginal", "/tmp/ok.jpg")
+    assert sesion.arranques == 3
+
+
+def test_process_folder_usa_una_sesion(fake_exiftool, tmp_path, monkeypatch):
+    script, log = fake_exiftool
+    base = os.path.join(tmp_path, "movil")
+    target = os.path.join(tmp_path, "fotos")
+    os.makedirs(os.path.join(base, "sub"))
+    for nombre in ("A.jpg", os.path.join("sub", "B.jpg")):
+        with open(os.path.join(base, nombre), "wb") as f:
+            f.write(nombre.encode())
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", script)
+    monkeypatch.setattr(main, "detectar_tipo_archivo", lambda archivo: "image/jpeg")
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(main.settings, "TARGET_PATH", target)
+    monkeypatch.setattr(main.settings, "TAGNAME_NOTFOUND_PATH", os.path.join(target, "no_date"))
+    monkeypatch.setattr(main.settings, "LAST_SYNC_TIME_PATH", os.path.join(tmp_path, ".photosync_last.json"))
+    monkeypatch.setattr(main.settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(main.settings, "PHOTOSYNC_HASH_INDEX_PATH", os.path.join(tmp_path, "hash_index.sqlite"))
+
+    main.process_folder(base)
+
+    assert sorted(os.listdir(os.path.join(target, "2024", "2024-09"))) == ["20240901_102905.jpg", "20240901_102905_1.jpg"]
+    assert _arranques(log) == 1
+    assert main.exiftool_sesion is None
+
+
+def test_fechas_lote_json_con_reintento_individual(monkeypatch):
+    llamadas = []
+
+    def fake_ejecutar(*args):
+        llamadas.append(args)
+        if args[0] == "-json":
+            return '[{"SourceFile": "/m/a.jpg", "DateTimeOriginal": "2024:09:01 10:29:05"},' ' {"SourceFile": "/m/b.mp4", "TrackCreateDate": "2024:09:03 15:11:41"},' ' {"SourceFile": "/m/c.jpg"}]'
+        return "Date/Time Original              : 2023:01:02 03:04:05"
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "exiftool")
+    monkeypatch.setattr(main, "ejecutar_exiftool", fake_ejecutar)
+
+    fechas = main.obtener_fechas_exif_lote(["/m/a.jpg", "/m/b.mp4", "/m/c.jpg", "/m/d.jpg"])
+
+    assert fechas["/m/a.jpg"][0] == "20240901_102905"
+    assert fechas["/m/b.mp4"][0] == "20240903_151141"
+    assert fechas["/m/c.jpg"] == (None, None)
+    # d.jpg no vino en la respuesta: se consulta de forma individual
+    assert fechas["/m/d.jpg"][0] == "20230102_030405"
+    assert len(llamadas) == 2
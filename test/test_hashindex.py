@@ -0,0 +1,170 @@
+import os
+from photosync import main
+from photosync.hashindex import IndiceHashes
+
+
+def _escribir(ruta, contenido):
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+
+
+def test_hash_se_reutiliza_mientras_no_cambia_stat(tmp_path):
+    calculados = []
+
+    def calcular(ruta):
+        calculados.append(ruta)
+        return main.calcular_hash_archivo(ruta)
+
+    archivo = os.path.join(tmp_path, "20240901_102905.jpg")
+    _escribir(archivo, b"uno")
+
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), calcular) as indice:
+        h1 = indice.obtener_hash(archivo)
+        assert indice.obtener_hash(archivo) == h1
+        assert calculados == [archivo]
+
+        # Cambia el contenido (y el stat): se invalida y se recalcula
+        _escribir(archivo, b"otro contenido")
+        os.utime(archivo, ns=(1, 1))
+        assert indice.obtener_hash(archivo) == main.calcular_hash_archivo(archivo)
+        assert len(calculados) == 2
+
+    # El índice persiste entre aperturas
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), calcular) as indice:
+        indice.obtener_hash(archivo)
+        assert len(calculados) == 2
+
+
+def test_reconstruir_elimina_entradas_obsoletas(tmp_path):
+    destino = os.path.join(tmp_path, "fotos", "2024", "2024-09")
+    os.makedirs(destino)
+    a = os.path.join(destino, "a.jpg")
+    b = os.path.join(destino, "b.jpg")
+    _escribir(a, b"a")
+    _escribir(b, b"b")
+
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), main.calcular_hash_archivo) as indice:
+        assert indice.reconstruir(os.path.join(tmp_path, "fotos")) == 2
+        os.remove(b)
+        assert indice.reconstruir(os.path.join(tmp_path, "fotos")) == 1
+        filas = indice._conn.execute("SELECT path FROM hashes").fetchall()
+        assert filas == [(a,)]
+
+
+def test_colision_no_relee_destino_indexado(tmp_path, monkeypatch):
+    destino = os.path.join(tmp_path, "fotos", "2026", "2026-01")
+    os.makedirs(destino)
+    origen = os.path.join(tmp_path, "B.jpg")
+    _escribir(origen, b"dos")
+    existente = os.path.join(destino, "20260103_193638.jpg")
+    _escribir(existente, b"uno")
+
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), main.calcular_hash_archivo) as indice:
+        monkeypatch.setattr(main, "indice_hashes", indice)
+        main.copiar_y_renombrar_archivo(origen, destino, "20260103_193638.jpg")
+        assert sorted(os.listdir(destino)) == ["20260103_193638.jpg", "20260103_193638_1.jpg"]
+        # Segunda pasada: los dos destinos se resuelven desde el índice
+        main.copiar_y_renombrar_archivo(origen, destino, "20260103_193638.jpg")
+        assert sorted(os.listdir(destino)) == ["20260103_193638.jpg", "20260103_193638_1.jpg"]
+        assert indice.fallos == 1
+
+
+def test_cambio_de_algoritmo_invalida_entradas(tmp_path):
+    archivo = os.path.join(tmp_path, "a.jpg")
+    _escribir(archivo, b"contenido")
+    db = os.path.join(tmp_path, "indice.sqlite")
+
+    with IndiceHashes(db, lambda ruta: main.calcular_hash_archivo(ruta, algoritmo="sha256"), "sha256") as indice:
+        sha = indice.obtener_hash(archivo)
+    with IndiceHashes(db, lambda ruta: main.calcular_hash_archivo(ruta, algoritmo="blake2b"), "blake2b") as indice:
+        blake = indice.obtener_hash(archivo)
+        assert indice.fallos == 1
+
+    assert sha != blake
+    assert len(blake) == 128
+
+
+def test_migra_indice_sha256_sin_algoritmo(tmp_path):
+    import sqlite3
+
+    archivo = os.path.join(tmp_path, "a.jpg")
+    _escribir(archivo, b"contenido")
+    st = os.stat(archivo)
+    db = os.path.join(tmp_path, "indice.sqlite")
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE hashes (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, sha256 TEXT NOT NULL)")
+    conn.execute("INSERT INTO hashes VALUES (?, ?, ?, ?, ?)", (archivo, st.st_size, st.st_mtime_ns, st.st_ino, "abc"))
+    conn.commit()
+    conn.close()
+
+    with IndiceHashes(db, main.calcular_hash_archivo, "sha256") as indice:
+        assert indice.obtener_hash(archivo) == "abc"
+
+
+def test_colision_con_destino_indexado(tmp_path, monkeypatch):
+    from photosync import hashing
+    from photosync.hashing import HuellaArchivo
+
+    destino = os.path.join(tmp_path, "fotos", "2026", "2026-01")
+    os.makedirs(destino)
+    origen = os.path.join(tmp_path, "B.jpg")
+    existente = os.path.join(destino, "20260103_193638.jpg")
+    # Mismo tamaño y por encima del umbral del hash rápido
+    _escribir(origen, b"b" * 400 * 1024)
+    _escribir(existente, b"a" * 400 * 1024)
+
+    muestreados, completos = [], []
+    rapido = hashing.calcular_hash_rapido
+    monkeypatch.setattr(hashing, "calcular_hash_rapido", lambda ruta, *args: muestreados.append(ruta) or rapido(ruta, *args))
+
+    def calcular(ruta):
+        completos.append(ruta)
+        return main.calcular_hash_archivo(ruta)
+
+    with IndiceHashes(os.path.join(tmp_path, "indice.sqlite"), calcular) as indice:
+        indice.registrar(existente, main.calcular_hash_archivo(existente))
+        monkeypatch.setattr(main, "indice_hashes", indice)
+
+        # Sin el hash completo del origen: el hash rápido descarta el candidato y el origen no se lee entero
+        huella = HuellaArchivo(origen, calcular)
+        assert not main.es_mismo_contenido(huella, existente)
+        assert not huella.completo_calculado
+        assert completos == []
+
+        # Con el hash completo del origen ya calculado basta el índice: el destino no se lee
+        muestreados.clear()
+        huella.completo = main.calcular_hash_archivo(origen)
+        main.copiar_y_renombrar_archivo(origen, destino, "20260103_193638.jpg", huella=huella)
+
+    assert sorted(os.listdir(destino)) == ["20260103_193638.jpg", "20260103_193638_1.jpg"]
+    assert existente not in muestreados and existente not in completos
+
+
+def test_dry_run_no_escribe_el_indice(tmp_path, monkeypatch):
+    from photosync import settings
+
+    destino = os.path.join(tmp_path, "fotos", "2026", "2026-01")
+    os.makedirs(destino)
+    origen = os.path.join(tmp_path, "B.jpg")
+    _escribir(origen, b"dos")
+    _escribir(os.path.join(destino, "20260103_193638.jpg"), b"uno")
+    db = os.path.join(tmp_path, "indice.sqlite")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", db)
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "DRY_RUN", True)
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+
+    # Sin índice previo no se crea
+    with main.recursos_sincronizacion():
+        assert main.indice_hashes is None
+        main.copiar_y_renombrar_archivo(origen, destino, "20260103_193638.jpg")
+    assert not os.path.exists(db)
+
+    # Con índice previo se consulta en solo lectura: no se añaden filas
+    with IndiceHashes(db, main.calcular_hash_archivo):
+        pass
+    with main.recursos_sincronizacion():
+        assert main.indice_hashes.solo_lectura
+        main.copiar_y_renombrar_archivo(origen, destino, "20260103_193638.jpg")
+    with IndiceHashes(db, main.calcular_hash_archivo) as indice:
+        assert indice._conn.execute("SELECT COUNT(*) FROM hashes").fetchone() == (0,)
@@ -0,0 +1,50 @@
+import os
+from photosync.hashing import TAM_BLOQUE_RAPIDO, HuellaArchivo, calcular_hash_rapido, mismo_contenido
+
+
+def _escribir(ruta, contenido):
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+
+
+def test_hash_rapido_descarta_sin_hash_completo(tmp_path):
+    tam = TAM_BLOQUE_RAPIDO * 8
+    origen = os.path.join(tmp_path, "origen.mp4")
+    destino = os.path.join(tmp_path, "destino.mp4")
+    _escribir(origen, b"\0" * tam)
+    # Mismo tamaño, distinto contenido en la cola
+    _escribir(destino, b"\0" * (tam - 1) + b"\1")
+
+    completos = []
+    huella = HuellaArchivo(origen, lambda ruta: completos.append(ruta) or "x")
+
+    assert calcular_hash_rapido(origen) != calcular_hash_rapido(destino)
+    assert not mismo_contenido(huella, destino, lambda ruta: completos.append(ruta) or "x")
+    assert completos == []
+
+
+def test_iguales_requieren_hash_completo(tmp_path):
+    contenido = os.urandom(TAM_BLOQUE_RAPIDO * 6)
+    origen = os.path.join(tmp_path, "origen.mp4")
+    destino = os.path.join(tmp_path, "destino.mp4")
+    _escribir(origen, contenido)
+    _escribir(destino, contenido)
+
+    huella = HuellaArchivo(origen)
+    assert mismo_contenido(huella, destino)
+    assert huella.completo_calculado
+    assert not mismo_contenido(huella, os.path.join(tmp_path, "no_existe.mp4"))
+
+
+def test_hash_con_mmap_y_buffers_coincide(tmp_path):
+    import hashlib
+    from photosync.hashing import calcular_hash_archivo
+
+    contenido = os.urandom(3 * 1024 * 1024 + 5)
+    ruta = os.path.join(tmp_path, "video.mp4")
+    _escribir(ruta, contenido)
+
+    esperado = hashlib.sha256(contenido).hexdigest()
+    assert calcular_hash_archivo(ruta, algoritmo="sha256", tam_buffer=8192, umbral_mmap=0) == esperado
+    assert calcular_hash_archivo(ruta, algoritmo="sha256", tam_buffer=1024 * 1024, umbral_mmap=1) == esperado
+    assert calcular_hash_archivo(ruta, algoritmo="blake2b") == hashlib.blake2b(contenido).hexdigest()
@@ -63,3 +63,37 @@ def test_hidden_file_processed_when_enabled(mock_run, tmp_path):
 
     dest_dir = os.path.join(target, "2026", "2026-01")
     assert os.path.isdir(dest_dir), "Debe procesar ocultos cuando está habilitado"
+
+
+def test_hidden_subtree_not_descended(tmp_path, monkeypatch):
+    from photosync import walker
+
+    base, target, links = _prep_env(str(tmp_path), sync_hidden=False)
+    os.makedirs(os.path.join(base, ".thumbnails", "cache"))
+    os.makedirs(os.path.join(base, "DCIM"))
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+
+    leidos = []
+    escanear = walker.escanear
+
+    def escanear_registrando(ruta):
+        leidos.append(os.path.relpath(ruta, base))
+        return escanear(ruta)
+
+    monkeypatch.setattr(walker, "escanear", escanear_registrando)
+
+    main.process_folder(base)
+
+    assert sorted(leidos) == [".", "DCIM"]
+
+
+def test_is_hidden_entry_matches_is_hidden_path(tmp_path):
+    from photosync.utils import is_hidden_entry, is_hidden_path
+
+    for ruta in ("a/b.jpg", "a/.b.jpg", ".a/b.jpg", "a/.thumbnails/c/d.jpg", "a/b/"):
+        completa = os.path.join(tmp_path, ruta)
+        assert is_hidden_entry(completa) == is_hidden_path(completa), ruta
@@ -0,0 +1,63 @@
+import json
+import os
+from photosync import main, settings
+from photosync.metrics import MetricasSincronizacion
+
+
+def test_histograma_y_textfile_prometheus(tmp_path):
+    metricas = MetricasSincronizacion()
+    metricas.observar("copy", 0.003, bytes_procesados=1000)
+    metricas.observar("copy", 2.0, bytes_procesados=500)
+    try:
+        with metricas.medir("link"):
+            raise OSError("sin permiso")
+    except OSError:
+        pass
+    metricas.finalizar()
+
+    texto = metricas.texto_prometheus()
+    assert 'photosync_stage_seconds_bucket{stage="copy",le="0.0025"} 0' in texto
+    assert 'photosync_stage_seconds_bucket{stage="copy",le="0.005"} 1' in texto
+    assert 'photosync_stage_seconds_bucket{stage="copy",le="+Inf"} 2' in texto
+    assert 'photosync_stage_bytes_total{stage="copy"} 1500' in texto
+    assert 'photosync_stage_errors_total{stage="link"} 1' in texto
+
+    ruta_prom, ruta_json = metricas.exportar(os.path.join(tmp_path, "metrics"))
+    assert os.path.basename(ruta_prom) == "photosync.prom"
+    with open(ruta_json) as f:
+        resumen = json.load(f)
+    assert resumen["etapas"]["copy"]["llamadas"] == 2
+    assert resumen["etapas"]["link"]["errores"] == 1
+    assert sorted(os.listdir(os.path.join(tmp_path, "metrics"))) == ["photosync.json", "photosync.prom"]
+
+
+def test_process_folder_escribe_metricas_por_etapa(tmp_path, monkeypatch):
+    base = os.path.join(tmp_path, "movil")
+    target = os.path.join(tmp_path, "fotos")
+    directorio_metricas = os.path.join(tmp_path, "metrics")
+    os.makedirs(os.path.join(base, "DCIM"))
+    for nombre in ("IMG_0001.jpg", "IMG_0002.jpg"):
+        with open(os.path.join(base, "DCIM", nombre), "wb") as f:
+            f.write(b"\xff\xd8\xff\xe0" + nombre.encode())
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(settings, "TARGET_PATH", target)
+    monkeypatch.setattr(settings, "TAGNAME_NOTFOUND_PATH", os.path.join(target, "no_date"))
+    monkeypatch.setattr(settings, "LAST_SYNC_TIME_PATH", os.path.join(tmp_path, ".photosync_last.json"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+    monkeypatch.setattr(settings, "PHOTOSYNC_METRICS_DIR", directorio_metricas)
+
+    main.process_folder(base)
+
+    assert main.metricas is None
+    with open(os.path.join(directorio_metricas, "photosync.json")) as f:
+        etapas = json.load(f)["etapas"]
+    assert etapas["scan"]["llamadas"] == 2 and etapas["scan"]["archivos"] == 2
+    assert etapas["detectar_tipo_archivo"]["archivos"] == 2
+    assert etapas["obtener_fecha_exif"]["archivos"] == 2
+    assert etapas["link"]["llamadas"] == 2
+    assert etapas["save_sync_times"]["llamadas"] == 2
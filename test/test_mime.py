@@ -0,0 +1,77 @@
+import os
+import shutil
+import struct
+import subprocess
+import zlib
+import pytest
+from unittest.mock import patch, Mock
+from photosync import main
+from photosync.mime import detectar_mime_por_firma
+
+
+def _box(tipo, datos):
+    return struct.pack(">I", 8 + len(datos)) + tipo + datos
+
+
+def _ftyp(marca, compatibles):
+    return _box(b"ftyp", marca + b"\0\0\0\0" + b"".join(compatibles)) + _box(b"mdat", b"\0" * 64)
+
+
+def _png():
+    ihdr = b"\0\0\0\x10\0\0\0\x10\x08\x02\0\0\0"
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+
+
+def _ebml(doctype):
+    return b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\xf7\x81\x01\x42\xf2\x81\x04\x42\xf3\x81\x08\x42\x82" + bytes([0x80 | len(doctype)]) + doctype + b"\x42\x87\x81\x04\x42\x85\x81\x02" + b"\0" * 64
+
+
+# Corpus sintético con las cabeceras mínimas de los formatos que sincronizamos
+CORPUS = [
+    ("jfif.jpg", b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00" + b"\0" * 64, "image/jpeg"),
+    ("exif.jpg", b"\xff\xd8\xff\xe1\x00\x20Exif\x00\x00" + b"\0" * 64, "image/jpeg"),
+    ("imagen.png", _png(), "image/png"),
+    ("imagen.gif", b"GIF89a\x10\x00\x10\x00\x00\x00\x00" + b"\0" * 32, "image/gif"),
+    ("intel.tif", b"II*\x00\x08\x00\x00\x00" + b"\0" * 64, "image/tiff"),
+    ("motorola.tif", b"MM\x00*\x00\x00\x00\x08" + b"\0" * 64, "image/tiff"),
+    ("canon.cr2", b"II*\x00\x10\x00\x00\x00CR\x02\x00" + b"\0" * 64, "image/x-canon-cr2"),
+    ("imagen.webp", b"RIFF\x24\x00\x00\x00WEBPVP8 " + b"\0" * 64, "image/webp"),
+    ("IMG_5153.HEIC", _ftyp(b"heic", [b"mif1", b"heic"]), "image/heic"),
+    ("imagen.heif", _ftyp(b"mif1", [b"mif1", b"heic"]), "image/heif"),
+    ("imagen.avif", _ftyp(b"avif", [b"avif", b"mif1"]), "image/avif"),
+    ("VID_20240903_161055.mp4", _ftyp(b"isom", [b"isom", b"iso2", b"avc1", b"mp41"]), "video/mp4"),
+    ("IMG_5154.MP4", _ftyp(b"mp42", [b"isom", b"mp42"]), "video/mp4"),
+    ("IMG_5155.MOV", _ftyp(b"qt  ", [b"qt  "]), "video/quicktime"),
+    ("antiguo.mov", _box(b"moov", b"\0" * 32) + b"\0" * 64, "video/quicktime"),
+    ("video.3gp", _ftyp(b"3gp4", [b"isom", b"3gp4"]), "video/3gpp"),
+    ("video.3g2", _ftyp(b"3g2a", [b"3g2a"]), "video/3gpp2"),
+    ("video.avi", b"RIFF\x24\x00\x00\x00AVI LIST" + b"\0" * 64, "video/x-msvideo"),
+    ("video.mkv", _ebml(b"matroska"), "video/x-matroska"),
+    ("video.webm", _ebml(b"webm"), "video/webm"),
+]
+
+
+@pytest.mark.parametrize("nombre, contenido, esperado", CORPUS, ids=[c[0] for c in CORPUS])
+def test_firma_coincide_con_file(tmp_path, nombre, contenido, esperado):
+    ruta = os.path.join(tmp_path, nombre)
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+
+    assert detectar_mime_por_firma(ruta) == esperado
+
+    if shutil.which("file") is None:
+        pytest.skip("comando file no disponible")
+    resultado = subprocess.run(["file", "--mime-type", "-b", ruta], capture_output=True, text=True)
+    assert resultado.stdout.strip() == esperado
+
+
+@pytest.mark.parametrize("contenido", [b"", b"one", b"\xff\xd8\xff", b"RIFF\x24\x00\x00\x00WAVEfmt "])
+def test_firma_desconocida_usa_file(tmp_path, contenido):
+    ruta = os.path.join(tmp_path, "desconocido.bin")
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+
+    assert detectar_mime_por_firma(ruta) is None
+    with patch("subprocess.run", return_value=Mock(stdout=f"{ruta}: audio/x-wav")) as mock_run:
+        assert main.detectar_tipo_archivo(ruta) == "audio/x-wav"
+    assert mock_run.call_args[0][0][0] == "file"
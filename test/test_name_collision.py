@@ -83,3 +83,22 @@ def test_idempotent_no_extra_suffix(mock_run, tmp_path):
     main.process_files(base, target, links)
     files_second = sorted(os.listdir(dest_dir))
     assert files_second == files_first
+
+
+def test_probe_descarta_por_tamano_sin_hash_completo(tmp_path, monkeypatch):
+    dest_dir = os.path.join(str(tmp_path), "fotos", "2026", "2026-01")
+    Path(dest_dir).mkdir(parents=True)
+    # Ráfaga: varios archivos del mismo segundo ya sincronizados, todos de distinto tamaño
+    _touch(os.path.join(dest_dir, "20260103_193638.jpg"), b"a")
+    for idx in range(1, 6):
+        _touch(os.path.join(dest_dir, f"20260103_193638_{idx}.jpg"), b"b" * (idx + 1))
+    origen = os.path.join(str(tmp_path), "C.jpg")
+    _touch(origen, b"nuevo contenido")
+
+    hashes_destino = []
+    monkeypatch.setattr(main, "hash_destino", lambda archivo: hashes_destino.append(archivo) or main.calcular_hash_archivo(archivo))
+
+    main.copiar_y_renombrar_archivo(origen, dest_dir, "20260103_193638.jpg")
+
+    assert os.path.exists(os.path.join(dest_dir, "20260103_193638_6.jpg"))
+    assert hashes_destino == []
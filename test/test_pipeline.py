@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+from unittest.mock import patch, Mock
+import pytest
+from photosync import main, settings
+
+# nombre -> (contenido, fecha exif o None)
+ARCHIVOS = {
+    "A.jpg": (b"one", "2026:01:03 19:36:38"),
+    "B.jpg": (b"two", "2026:01:03 19:36:38"),
+    "C.jpg": (b"one", "2026:01:03 19:36:38"),
+    "D.jpg": (b"three", "2026:01:03 19:36:38"),
+    "E.mp4": (b"video", "2025:12:31 23:59:59"),
+    "F.mp4": (b"video2", "2025:12:31 23:59:59"),
+    "G.jpg": (b"sin fecha", None),
+    "H.jpg": (b"otra sin fecha", None),
+    "notas.txt": (b"texto", None),
+}
+
+
+def _sincronizar(tmp_root, jobs, monkeypatch):
+    base = os.path.join(tmp_root, "movil")
+    target = os.path.join(tmp_root, "fotos")
+    links = os.path.join(target, "no_date")
+    Path(base).mkdir(parents=True)
+    Path(target).mkdir(parents=True)
+    for nombre, (contenido, _) in ARCHIVOS.items():
+        with open(os.path.join(base, nombre), "wb") as f:
+            f.write(contenido)
+    # Un destino previo con el mismo nombre fuerza colisiones y comparaciones de hash
+    Path(os.path.join(target, "2026", "2026-01")).mkdir(parents=True)
+    with open(os.path.join(target, "2026", "2026-01", "20260103_193638.jpg"), "wb") as f:
+        f.write(b"two")
+
+    monkeypatch.setattr(settings, "PHOTOSYNC_JOBS", jobs)
+    monkeypatch.setattr(settings, "PHOTOSYNC_EXIF_BATCH_SIZE", 3)
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "exiftool")
+    monkeypatch.setattr(main, "sync_times", {})
+
+    def side_effect(*args, **kwargs):
+        command = args[0]
+        cmd = os.path.basename(command[0])
+        nombre = os.path.basename(command[-1])
+        if cmd == "file":
+            tipo = "text/plain" if nombre.endswith(".txt") else "image/jpeg"
+            return Mock(stdout=f"{command[-1]}: {tipo}")
+        elif cmd == "exiftool" and command[1] != "-json":
+            fecha = ARCHIVOS[nombre][1]
+            return Mock(stdout=f"Date/Time Original: {fecha}" if fecha else "")
+        return Mock(stdout="")
+
+    with patch("subprocess.run", side_effect=side_effect):
+        main.process_files(base, target, links)
+
+    resultado = {}
+    for dirpath, _, filenames in os.walk(target):
+        for nombre in filenames:
+            ruta = os.path.join(dirpath, nombre)
+            with open(ruta, "rb") as f:
+                resultado[os.path.relpath(ruta, target)] = f.read()
+    return resultado
+
+
+@pytest.mark.parametrize("jobs", [2, 4])
+def test_pipeline_concurrente_igual_que_secuencial(tmp_path, monkeypatch, jobs):
+    secuencial = _sincronizar(os.path.join(tmp_path, "serie"), 1, monkeypatch)
+    concurrente = _sincronizar(os.path.join(tmp_path, "paralelo"), jobs, monkeypatch)
+
+    assert concurrente == secuencial
+    assert "2026/2026-01/20260103_193638_1.jpg" in secuencial
+    assert "no_date/G.jpg" in secuencial
@@ -0,0 +1,73 @@
+import os
+from pathlib import Path
+from unittest.mock import patch, Mock
+import pytest
+from photosync import main, settings
+
+
+def _prep_env(tmp_root, modo, monkeypatch):
+    base = os.path.join(tmp_root, "movil")
+    target = os.path.join(tmp_root, "fotos")
+    Path(base).mkdir(parents=True, exist_ok=True)
+    Path(target).mkdir(parents=True, exist_ok=True)
+    with open(os.path.join(base, "A.jpg"), "wb") as f:
+        f.write(b"one")
+    monkeypatch.setattr(settings, "PHOTOSYNC_PLACE_MODE", modo)
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "exiftool")
+    monkeypatch.setattr(main, "sync_times", {})
+    return base, target, os.path.join(target, "no_date")
+
+
+def _side_effect(*args, **kwargs):
+    cmd = os.path.basename(args[0][0])
+    if cmd == "file":
+        return Mock(stdout="whatever: image/jpeg")
+    elif cmd == "exiftool":
+        return Mock(stdout="Date/Time Original: 2026:01:03 19:36:38")
+    return Mock(stdout="")
+
+
+@patch("subprocess.run", side_effect=_side_effect)
+def test_modo_link_crea_enlace_duro(mock_run, tmp_path, monkeypatch):
+    base, target, links = _prep_env(str(tmp_path), "link", monkeypatch)
+
+    main.process_files(base, target, links)
+    main.process_files(base, target, links)
+
+    dest_dir = os.path.join(target, "2026", "2026-01")
+    assert os.listdir(dest_dir) == ["20260103_193638.jpg"]
+    assert os.path.samefile(os.path.join(base, "A.jpg"), os.path.join(dest_dir, "20260103_193638.jpg"))
+
+
+@patch("subprocess.run", side_effect=_side_effect)
+def test_modo_move_renombra_origen(mock_run, tmp_path, monkeypatch):
+    base, target, links = _prep_env(str(tmp_path), "move", monkeypatch)
+
+    main.process_files(base, target, links)
+
+    assert os.listdir(base) == []
+    with open(os.path.join(target, "2026", "2026-01", "20260103_193638.jpg"), "rb") as f:
+        assert f.read() == b"one"
+
+
+@pytest.mark.parametrize("modo", ["link", "move"])
+def test_distinto_dispositivo_copia(tmp_path, monkeypatch, modo):
+    origen = os.path.join(tmp_path, "A.jpg")
+    with open(origen, "wb") as f:
+        f.write(b"one")
+    real_stat = os.stat
+
+    def stat_otro_dispositivo(ruta, *args, **kwargs):
+        st = real_stat(ruta, *args, **kwargs)
+        if os.fspath(ruta) == origen:
+            extra = {campo: getattr(st, campo) for campo in ("st_atime", "st_mtime", "st_ctime", "st_atime_ns", "st_mtime_ns", "st_ctime_ns")}
+            return os.stat_result((st.st_mode, st.st_ino, st.st_dev + 1) + tuple(st)[3:], extra)
+        return st
+
+    monkeypatch.setattr(os, "stat", stat_otro_dispositivo)
+    estrategia, _ = main.colocar_archivo(origen, os.path.join(tmp_path, "B.jpg"), modo)
+
+    assert estrategia not in ("link", "move")
+    assert os.path.exists(origen)
+    assert not os.path.samefile(origen, os.path.join(tmp_path, "B.jpg"))
@@ -0,0 +1,131 @@
+import json
+import os
+from photosync import main, settings
+from photosync.plan import aplicar, leer_plan, planificar
+
+
+def _configurar(tmp_path, monkeypatch):
+    base = os.path.join(tmp_path, "movil")
+    target = os.path.join(tmp_path, "fotos")
+    os.makedirs(os.path.join(base, "rafaga"))
+    contenidos = {
+        "IMG_0001.jpg": b"foto uno",
+        os.path.join("rafaga", "IMG_0001.jpg"): b"foto dos",
+        "sin_fecha.jpg": b"sin fecha",
+        "notas.txt": b"notas",
+    }
+    for nombre, contenido in contenidos.items():
+        with open(os.path.join(base, nombre), "wb") as f:
+            f.write(contenido)
+
+    hashes = []
+
+    def calcular(archivo, *args, **kwargs):
+        hashes.append(archivo)
+        return main.calcular_hash_archivo(archivo, *args, **kwargs)
+
+    def fechas(lote):
+        fecha = main.datetime(2024, 9, 1, 10, 29, 5)
+        return {a: (fecha.strftime("%Y%m%d_%H%M%S"), fecha) if "IMG" in a else (None, None) for a in lote}
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+    monkeypatch.setattr(main, "calcular_hash_medido", calcular)
+    monkeypatch.setattr(main, "detectar_tipo_archivo", lambda archivo: "text/plain" if archivo.endswith(".txt") else "image/jpeg")
+    monkeypatch.setattr(main, "obtener_fechas_exif_lote", fechas)
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(settings, "SOURCE_PATHS", (base,))
+    monkeypatch.setattr(settings, "TARGET_PATH", target)
+    monkeypatch.setattr(settings, "TAGNAME_NOTFOUND_PATH", os.path.join(target, "no_date"))
+    monkeypatch.setattr(settings, "LAST_SYNC_TIME_PATH", os.path.join(tmp_path, ".photosync_last.json"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_METRICS_DIR", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+    return base, target, hashes
+
+
+def test_planificar_y_aplicar(tmp_path, monkeypatch):
+    base, target, hashes = _configurar(tmp_path, monkeypatch)
+    ruta_plan = os.path.join(tmp_path, "plan.jsonl")
+
+    operaciones = planificar(ruta_plan)
+
+    # Planificar no coloca nada ni guarda marcas
+    assert not os.path.exists(target)
+    assert main.load_sync_times() == {}
+    assert operaciones == {"copy": 2, "link": 1, "skip": 1, "dir": 2}
+    plan = list(leer_plan(ruta_plan))
+    copias = sorted(op["destino"] for op in plan if op["op"] == "copy")
+    destino_mes = os.path.join(target, "2024", "2024-09")
+    # La colisión entre los dos IMG_0001 se resuelve contra el destino reservado
+    assert copias == [os.path.join(destino_mes, "20240901_102905_0001.jpg"), os.path.join(destino_mes, "20240901_102905_0001_1.jpg")]
+    assert [op["motivo"] for op in plan if op["op"] == "skip"] == ["no_multimedia"]
+    hashes_plan = len(hashes)
+
+    resumen = aplicar(ruta_plan)
+
+    assert resumen["aplicada"] == 3 and resumen["directorios"] == 2
+    # Los hashes del plan no se recalculan al aplicar
+    assert len(hashes) == hashes_plan
+    assert sorted(os.listdir(destino_mes)) == ["20240901_102905_0001.jpg", "20240901_102905_0001_1.jpg"]
+    assert os.path.exists(os.path.join(target, "no_date", "sin_fecha.jpg"))
+    assert set(main.load_sync_times()) == {base, os.path.join(base, "rafaga")}
+
+
+def test_aplicar_omite_origenes_cambiados(tmp_path, monkeypatch):
+    base, target, _ = _configurar(tmp_path, monkeypatch)
+    ruta_plan = os.path.join(tmp_path, "plan.jsonl")
+    planificar(ruta_plan)
+
+    cambiado = os.path.join(base, "rafaga", "IMG_0001.jpg")
+    with open(cambiado, "ab") as f:
+        f.write(b" retocada")
+
+    resumen = aplicar(ruta_plan)
+
+    assert resumen["invalida"] == 1 and resumen["directorios_pendientes"] == 1
+    assert os.listdir(os.path.join(target, "2024", "2024-09")) == ["20240901_102905_0001.jpg"]
+    # El directorio del archivo cambiado queda pendiente para la siguiente sincronización
+    assert set(main.load_sync_times()) == {base}
+
+
+def test_aplicar_ordena_por_directorio_destino_e_inode(tmp_path, monkeypatch):
+    _, target, _ = _configurar(tmp_path, monkeypatch)
+    ruta_plan = os.path.join(tmp_path, "plan.jsonl")
+    planificar(ruta_plan)
+    with open(ruta_plan) as f:
+        plan = [json.loads(linea) for linea in f]
+    with open(ruta_plan, "w") as f:
+        for op in reversed(plan):
+            f.write(json.dumps(op) + "\n")
+
+    orden = []
+    colocar = main.colocar_en_destino
+    monkeypatch.setattr(main, "colocar_en_destino", lambda origen, destino, *args: orden.append(os.stat(origen).st_ino) or colocar(origen, destino, *args))
+
+    aplicar(ruta_plan)
+
+    assert len(orden) == 2 and orden == sorted(orden)
+
+
+def test_plan_con_dedup_global_no_copia_duplicados(tmp_path, monkeypatch):
+    base, target, _ = _configurar(tmp_path, monkeypatch)
+    with open(os.path.join(base, "rafaga", "IMG_0002.jpg"), "wb") as f:
+        f.write(b"foto uno")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", os.path.join(tmp_path, "indice.sqlite"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_GLOBAL_DEDUP", "skip")
+    ruta_plan = os.path.join(tmp_path, "plan.jsonl")
+
+    planificar(ruta_plan)
+
+    plan = list(leer_plan(ruta_plan))
+    duplicados = [op for op in plan if op.get("motivo") == "duplicado"]
+    copias = {op["destino"] for op in plan if op["op"] == "copy"}
+    # El segundo "foto uno" apunta a la copia planificada del primero
+    assert len(duplicados) == 1 and duplicados[0]["destino"] in copias
+
+    resumen = aplicar(ruta_plan)
+
+    assert resumen["invalida"] == 0 and resumen["directorios"] == 2
+    assert len(os.listdir(os.path.join(target, "2024", "2024-09"))) == 2
@@ -0,0 +1,57 @@
+import os
+import pstats
+import time
+from photosync.profiling import limpiar_perfiles, modo_perfil, perfilar
+
+
+def _trabajo():
+    fin = time.monotonic() + 0.05
+    while time.monotonic() < fin:
+        sum(range(1000))
+
+
+def test_modo_perfil():
+    assert modo_perfil("0") is None
+    assert modo_perfil("") is None
+    assert modo_perfil("on") == "both"
+    assert modo_perfil("CProfile") == "cprofile"
+    assert modo_perfil("sample") == "sample"
+    assert modo_perfil("otro") is None
+
+
+def test_perfilar_escribe_pstats_y_pilas_collapsed(tmp_path):
+    with perfilar("run", str(tmp_path), modo="1") as base:
+        _trabajo()
+
+    stats = pstats.Stats(base + ".pstats")
+    assert any(funcion[2] == "_trabajo" for funcion in stats.stats)
+    with open(base + ".collapsed") as f:
+        lineas = f.read().splitlines()
+    assert lineas and all(linea.rsplit(" ", 1)[1].isdigit() for linea in lineas)
+    assert any("_trabajo (test_profiling.py" in linea for linea in lineas)
+
+
+def test_perfilar_desactivado_no_escribe(tmp_path):
+    with perfilar("run", str(tmp_path), modo="0") as base:
+        _trabajo()
+    assert base is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_retencion_por_ejecucion(tmp_path):
+    for i in range(5):
+        for ext in (".pstats", ".collapsed"):
+            ruta = os.path.join(tmp_path, f"profile-run-{i}{ext}")
+            open(ruta, "w").close()
+            os.utime(ruta, (1000 + i, 1000 + i))
+    open(os.path.join(tmp_path, "photosync.log"), "w").close()
+
+    limpiar_perfiles(str(tmp_path), 2)
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "photosync.log",
+        "profile-run-3.collapsed",
+        "profile-run-3.pstats",
+        "profile-run-4.collapsed",
+        "profile-run-4.pstats",
+    ]
@@ -0,0 +1,196 @@
+import threading
+import time
+from photosync.scheduler import PlanificadorSincronizacion
+
+
+class _Disparos:
+    def __init__(self, planificador=None):
+        self.motivos = []
+        self.pendientes = []
+        self.evento = threading.Event()
+        self.planificador = planificador
+
+    def __call__(self, motivo):
+        self.motivos.append(motivo)
+        self.pendientes.append(self.planificador.tomar_pendientes())
+        self.evento.set()
+
+
+def _planificador(quiet, max_wait, **kwargs):
+    disparos = _Disparos()
+    planificador = PlanificadorSincronizacion(disparos, quiet, max_wait, **kwargs)
+    disparos.planificador = planificador
+    return planificador.iniciar(), disparos
+
+
+def test_estres_100k_eventos_un_solo_disparo():
+    planificador, disparos = _planificador(0.3, 60, max_dirs=10000)
+    hilos_antes = threading.active_count()
+    try:
+
+        def inyectar(n):
+            for i in range(25_000):
+                planificador.notificar(f"/fotos/d{i % 500}/IMG_{n}_{i}.jpg", {f"/fotos/d{i % 500}"})
+
+        inicio = time.monotonic()
+        inyectores = [threading.Thread(target=inyectar, args=(n,)) for n in range(4)]
+        for hilo in inyectores:
+            hilo.start()
+        # Ningún evento crea hilos ni timers: solo existen los inyectores y el planificador
+        assert threading.active_count() <= hilos_antes + len(inyectores)
+        for hilo in inyectores:
+            hilo.join()
+        assert time.monotonic() - inicio < 10
+
+        assert disparos.evento.wait(5)
+        time.sleep(0.5)
+    finally:
+        planificador.detener(timeout=5)
+
+    assert planificador.eventos == 100_000
+    assert disparos.motivos == ["quiet"]
+    dirs, completa = disparos.pendientes[0]
+    assert not completa
+    assert len(dirs) == 500
+
+
+def test_max_wait_con_eventos_continuos():
+    planificador, disparos = _planificador(0.2, 0.5)
+    try:
+        inicio = time.monotonic()
+        while not disparos.evento.is_set() and time.monotonic() - inicio < 5:
+            planificador.notificar("/fotos/a/IMG.jpg", {"/fotos/a"})
+            time.sleep(0.01)
+        transcurrido = time.monotonic() - inicio
+    finally:
+        planificador.detener(timeout=5)
+
+    assert disparos.motivos[0] == "max_wait"
+    assert 0.4 <= transcurrido < 2
+
+
+def test_demasiados_directorios_o_sin_directorios_piden_completa():
+    planificador = PlanificadorSincronizacion(lambda motivo: None, 60, 60, max_dirs=2)
+    for i in range(3):
+        planificador.notificar(f"/fotos/{i}/x.jpg", {f"/fotos/{i}"})
+    assert planificador.tomar_pendientes() == ([], True)
+
+    planificador.notificar("/fotos/a/x.jpg", {"/fotos/a"})
+    assert planificador.tomar_pendientes() == (["/fotos/a"], False)
+    planificador.notificar("<poll>")
+    assert planificador.tomar_pendientes() == ([], True)
+
+
+def test_eventos_durante_la_sincronizacion_lanzan_seguimiento():
+    ejecuciones = []
+    en_curso = threading.Event()
+    continuar = threading.Event()
+
+    def disparar(motivo):
+        ejecuciones.append((motivo, planificador.tomar_pendientes()))
+        if len(ejecuciones) == 1:
+            en_curso.set()
+            continuar.wait(5)
+        return True
+
+    planificador = PlanificadorSincronizacion(disparar, 0.1, 60).iniciar()
+    try:
+        planificador.notificar("/fotos/a/1.jpg", {"/fotos/a"})
+        assert en_curso.wait(5)
+        # Llega una foto mientras se sincroniza: no abre ventana, queda para el seguimiento
+        planificador.notificar("/fotos/b/2.jpg", {"/fotos/b"})
+        inicio = time.monotonic()
+        continuar.set()
+        while len(ejecuciones) < 2 and time.monotonic() - inicio < 5:
+            time.sleep(0.01)
+        # El seguimiento no espera otra ventana QUIET_SECONDS
+        assert time.monotonic() - inicio < 0.1 + 0.5
+    finally:
+        planificador.detener(timeout=5)
+
+    assert ejecuciones == [("quiet", (["/fotos/a"], False)), ("seguimiento", (["/fotos/b"], False))]
+
+
+def test_evento_antes_de_tomar_pendientes_no_lanza_seguimiento_vacio():
+    ejecuciones = []
+    en_curso = threading.Event()
+    continuar = threading.Event()
+
+    def disparar(motivo):
+        if not ejecuciones:
+            en_curso.set()
+            continuar.wait(5)
+        ejecuciones.append((motivo, planificador.tomar_pendientes()))
+        return True
+
+    planificador = PlanificadorSincronizacion(disparar, 0.1, 60).iniciar()
+    try:
+        planificador.notificar("/fotos/a/1.jpg", {"/fotos/a"})
+        assert en_curso.wait(5)
+        # Ya disparada pero antes de tomar los pendientes: esta ejecución se lleva /fotos/b
+        planificador.notificar("/fotos/b/2.jpg", {"/fotos/b"})
+        continuar.set()
+        time.sleep(0.3)
+    finally:
+        planificador.detener(timeout=5)
+
+    assert ejecuciones == [("quiet", (["/fotos/a", "/fotos/b"], False))]
+
+
+def test_lock_ocupado_reintenta_sin_perder_pendientes():
+    ejecuciones = []
+    terminado = threading.Event()
+
+    def disparar(motivo):
+        if not ejecuciones:
+            ejecuciones.append((motivo, None))
+            return False
+        ejecuciones.append((motivo, planificador.tomar_pendientes()))
+        terminado.set()
+        return True
+
+    planificador = PlanificadorSincronizacion(disparar, 0.1, 60).iniciar()
+    try:
+        planificador.notificar("/fotos/a/1.jpg", {"/fotos/a"})
+        assert terminado.wait(5)
+    finally:
+        planificador.detener(timeout=5)
+
+    assert ejecuciones == [("quiet", None), ("quiet", (["/fotos/a"], False))]
+
+
+def test_sincronizacion_fallida_devuelve_pendientes_y_reintenta():
+    ejecuciones = []
+    terminado = threading.Event()
+
+    def disparar(motivo):
+        # Como trigger_sync: toma los pendientes y, si la sincronización falla, los devuelve
+        dirs, completa = planificador.tomar_pendientes()
+        ejecuciones.append((motivo, (dirs, completa)))
+        if len(ejecuciones) == 1:
+            planificador.devolver_pendientes(dirs, completa)
+            return False
+        terminado.set()
+        return True
+
+    planificador = PlanificadorSincronizacion(disparar, 0.1, 60).iniciar()
+    try:
+        planificador.notificar("/fotos/a/1.jpg", {"/fotos/a"})
+        assert terminado.wait(5)
+    finally:
+        planificador.detener(timeout=5)
+
+    assert ejecuciones == [("quiet", (["/fotos/a"], False)), ("quiet", (["/fotos/a"], False))]
+
+
+def test_ultima_espera_desde_el_primer_evento_pendiente():
+    ahora = [100.0]
+    planificador = PlanificadorSincronizacion(lambda motivo: None, 60, 300, reloj=lambda: ahora[0])
+    planificador.notificar("/fotos/a/IMG_1.jpg", {"/fotos/a"})
+    ahora[0] = 130.0
+    planificador.notificar("/fotos/b/IMG_2.jpg", {"/fotos/b"})
+    ahora[0] = 190.0
+    assert planificador.tomar_pendientes() == (["/fotos/a", "/fotos/b"], False)
+    assert planificador.ultima_espera == 90.0
+    planificador.tomar_pendientes()
+    assert planificador.ultima_espera is None
@@ -0,0 +1,51 @@
+import os
+from photosync.snapshot import InstantaneaDirectorios
+
+
+def _mkdir(base, *rutas):
+    for ruta in rutas:
+        os.makedirs(os.path.join(base, ruta), exist_ok=True)
+
+
+def test_detecta_directorios_cambiados_y_nuevos(tmp_path):
+    base = os.path.join(tmp_path, "movil")
+    _mkdir(base, "DCIM/2024", "WhatsApp", ".thumbnails")
+    instantanea = InstantaneaDirectorios([base])
+    instantanea.construir()
+    assert len(instantanea) == 4
+    assert instantanea.comparar() == set()
+
+    # Foto nueva en un directorio profundo y un álbum nuevo con subdirectorios
+    open(os.path.join(base, "DCIM", "2024", "IMG_0001.jpg"), "wb").close()
+    _mkdir(base, "Album/Viaje", ".thumbnails/cache")
+
+    cambiados = instantanea.comparar()
+    assert cambiados == {base} | {os.path.join(base, p) for p in ("DCIM/2024", "Album", "Album/Viaje")}
+    assert instantanea.comparar() == set()
+
+
+def test_raiz_nueva_y_directorio_borrado(tmp_path):
+    base = os.path.join(tmp_path, "movil")
+    nueva = os.path.join(tmp_path, "camara")
+    _mkdir(base, "DCIM")
+    instantanea = InstantaneaDirectorios([base, nueva])
+    instantanea.construir()
+
+    os.rmdir(os.path.join(base, "DCIM"))
+    _mkdir(nueva, "100CANON")
+
+    assert instantanea.comparar() == {base, nueva, os.path.join(nueva, "100CANON")}
+    assert os.path.join(base, "DCIM") not in instantanea
+
+
+def test_pendientes_al_arrancar(tmp_path):
+    base = os.path.join(tmp_path, "movil")
+    _mkdir(base, "DCIM", "WhatsApp")
+    sync_times = {
+        base: "2999-01-01 00:00:00",
+        os.path.join(base, "DCIM"): "2000-01-01 00:00:00",
+    }
+
+    pendientes = InstantaneaDirectorios([base]).construir(sync_times)
+
+    assert pendientes == {os.path.join(base, "DCIM"), os.path.join(base, "WhatsApp")}
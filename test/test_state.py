@@ -0,0 +1,133 @@
+import json
+import os
+from photosync import main, settings
+from photosync.state import EstadoSincronizacion, leer_sync_times
+
+
+def test_migra_json_una_sola_vez(tmp_path):
+    ruta_json = os.path.join(tmp_path, ".photosync_last.json")
+    with open(ruta_json, "w") as f:
+        json.dump({"/fotos/a": "2024-09-01 10:29:05", "/fotos/b": "2024-09-02 11:00:00"}, f)
+
+    with EstadoSincronizacion(os.path.join(tmp_path, "estado.sqlite")) as estado:
+        assert estado.migrar_json(ruta_json) == 2
+        estado.guardar("/fotos/a", "2024-10-01 00:00:00")
+        # El almacén ya tiene datos: no se vuelve a importar el JSON
+        assert estado.migrar_json(ruta_json) == 0
+
+    assert leer_sync_times(os.path.join(tmp_path, "estado.sqlite")) == {"/fotos/a": "2024-10-01 00:00:00", "/fotos/b": "2024-09-02 11:00:00"}
+
+
+def test_confirma_en_bloques(tmp_path):
+    ruta_db = os.path.join(tmp_path, "estado.sqlite")
+    estado = EstadoSincronizacion(ruta_db, lote_dirs=3, intervalo=3600)
+    try:
+        estado.guardar("/fotos/1", "t1")
+        estado.guardar("/fotos/2", "t2")
+        # Un lector (el watcher) no ve las escrituras sin confirmar ni queda bloqueado
+        assert leer_sync_times(ruta_db) == {}
+        estado.guardar("/fotos/3", "t3")
+        assert len(leer_sync_times(ruta_db)) == 3
+        estado.guardar("/fotos/4", "t4")
+    finally:
+        estado.cerrar()
+    assert len(leer_sync_times(ruta_db)) == 4
+
+
+def test_load_y_save_sync_times(tmp_path, monkeypatch):
+    ruta_json = os.path.join(tmp_path, ".photosync_last.json")
+    with open(ruta_json, "w") as f:
+        json.dump({"/fotos/a": "2024-09-01 10:29:05"}, f)
+    monkeypatch.setattr(settings, "LAST_SYNC_TIME_PATH", ruta_json)
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+
+    monkeypatch.setattr(main, "sync_times", main.load_sync_times())
+    assert main.sync_times == {"/fotos/a": "2024-09-01 10:29:05"}
+    assert main.ruta_estado() == os.path.join(tmp_path, ".photosync_last.sqlite")
+
+    main.sync_times["/fotos/b"] = "2024-09-02 11:00:00"
+    main.save_sync_times("/fotos/b")
+    assert main.load_sync_times() == {"/fotos/a": "2024-09-01 10:29:05", "/fotos/b": "2024-09-02 11:00:00"}
+
+
+def test_manifiesto_invalida_por_stat(tmp_path):
+    ruta = os.path.join(tmp_path, "IMG_0001.jpg")
+    with open(ruta, "wb") as f:
+        f.write(b"foto")
+
+    with EstadoSincronizacion(os.path.join(tmp_path, "estado.sqlite")) as estado:
+        st = os.stat(ruta)
+        assert estado.consultar_archivo(st) is None
+        estado.registrar_archivo(st, "image/jpeg", "2024-09-01 10:29:05", "abc", "/fotos/2024/09/x.jpg")
+        assert estado.consultar_archivo(st) == {"mime": "image/jpeg", "fecha": "2024-09-01 10:29:05", "digest": "abc", "destino": "/fotos/2024/09/x.jpg"}
+
+        os.utime(ruta, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert estado.consultar_archivo(os.stat(ruta)) is None
+
+
+def test_manifiesto_omite_archivos_sin_cambios(tmp_path, monkeypatch):
+    base = os.path.join(tmp_path, "movil")
+    target = os.path.join(tmp_path, "fotos")
+    os.makedirs(base)
+    for nombre in ("IMG_0001.jpg", "sin_fecha.jpg", "notas.txt"):
+        with open(os.path.join(base, nombre), "wb") as f:
+            f.write(nombre.encode())
+
+    clasificados = []
+
+    def detectar(archivo):
+        clasificados.append(os.path.basename(archivo))
+        return "text/plain" if archivo.endswith(".txt") else "image/jpeg"
+
+    def fechas(lote):
+        fecha = main.datetime(2024, 9, 1, 10, 29, 5)
+        return {a: (fecha.strftime("%Y%m%d_%H%M%S"), fecha) if "IMG" in a else (None, None) for a in lote}
+
+    monkeypatch.setattr(main, "EXIFTOOL_PATH", "")
+    monkeypatch.setattr(main, "detectar_tipo_archivo", detectar)
+    monkeypatch.setattr(main, "obtener_fechas_exif_lote", fechas)
+    monkeypatch.setattr(main, "sync_times", {})
+    monkeypatch.setattr(settings, "TARGET_PATH", target)
+    monkeypatch.setattr(settings, "TAGNAME_NOTFOUND_PATH", os.path.join(target, "no_date"))
+    monkeypatch.setattr(settings, "LAST_SYNC_TIME_PATH", os.path.join(tmp_path, ".photosync_last.json"))
+    monkeypatch.setattr(settings, "PHOTOSYNC_STATE_DB_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_HASH_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "PHOTOSYNC_SYNC_HIDDEN", False)
+    monkeypatch.setattr(settings, "DRY_RUN", False)
+
+    main.process_folder(base)
+    assert sorted(clasificados) == ["IMG_0001.jpg", "notas.txt", "sin_fecha.jpg"]
+    assert os.path.exists(os.path.join(target, "2024", "2024-09", "20240901_102905_0001.jpg"))
+
+    # Un cambio en el ctime del directorio vuelve a recorrerlo, pero ningún archivo ha cambiado
+    clasificados.clear()
+    main.sync_times.clear()
+    main.process_folder(base)
+    assert clasificados == []
+
+    # Solo el archivo modificado pasa de nuevo por el pipeline
+    with open(os.path.join(base, "notas.txt"), "ab") as f:
+        f.write(b"mas")
+    main.sync_times.clear()
+    main.process_folder(base)
+    assert clasificados == ["notas.txt"]
+
+
+def test_manifiesto_ignora_hashes_de_otro_algoritmo(tmp_path):
+    ruta = os.path.join(tmp_path, "IMG_0001.jpg")
+    with open(ruta, "wb") as f:
+        f.write(b"foto")
+    notas = os.path.join(tmp_path, "notas.txt")
+    with open(notas, "wb") as f:
+        f.write(b"notas")
+    st, st_notas = os.stat(ruta), os.stat(notas)
+    db = os.path.join(tmp_path, "estado.sqlite")
+
+    with EstadoSincronizacion(db, algoritmo="sha256") as estado:
+        estado.registrar_archivo(st, "image/jpeg", "2024-09-01 10:29:05", "abc", "/fotos/2024/09/x.jpg")
+        estado.registrar_archivo(st_notas, "text/plain")
+    with EstadoSincronizacion(db, algoritmo="blake2b") as estado:
+        assert estado.consultar_archivo(st) is None
+        # Los resultados sin hash no dependen del algoritmo
+        assert estado.consultar_archivo(st_notas)["mime"] == "text/plain"
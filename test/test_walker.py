@@ -0,0 +1,63 @@
+import os
+import sys
+from photosync.walker import recorrer
+
+
+def _crear(base, rutas):
+    for ruta in rutas:
+        completa = os.path.join(base, ruta)
+        if ruta.endswith("/"):
+            os.makedirs(completa, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(completa), exist_ok=True)
+            open(completa, "wb").close()
+
+
+def _recursivo(path):
+    # Orden del recorrido recursivo anterior de process_folder
+    visitados = [path]
+    with os.scandir(path) as entradas:
+        subdirs = [e.path for e in entradas if e.is_dir()]
+    for sub in subdirs:
+        visitados.extend(_recursivo(sub))
+    return visitados
+
+
+def test_orden_preorden_como_la_recursion(tmp_path):
+    base = str(tmp_path)
+    _crear(base, ["a/1.jpg", "a/x/2.jpg", "a/y/", "b/3.jpg", "b/z/w/4.jpg", "5.jpg"])
+
+    directorios = list(recorrer(base))
+
+    assert [d.ruta for d in directorios] == _recursivo(base)
+    raiz = directorios[0]
+    assert [e.name for e in raiz.archivos] == ["5.jpg"]
+    assert raiz.stat.st_ino == os.stat(base).st_ino
+
+
+def test_poda_de_subdirectorios(tmp_path):
+    base = str(tmp_path)
+    _crear(base, ["a/1.jpg", ".thumbnails/t/2.jpg", "b/3.jpg"])
+
+    visitados = []
+    for directorio in recorrer(base):
+        visitados.append(os.path.relpath(directorio.ruta, base))
+        directorio.subdirectorios[:] = [s for s in directorio.subdirectorios if not s.name.startswith(".")]
+
+    assert sorted(visitados) == [".", "a", "b"]
+
+
+def test_arbol_mas_profundo_que_el_limite_de_recursion(tmp_path):
+    profundidad = sys.getrecursionlimit() + 100
+    ruta = str(tmp_path)
+    for _ in range(profundidad):
+        ruta = os.path.join(ruta, "d")
+        os.mkdir(ruta)
+
+    try:
+        assert sum(1 for _ in recorrer(str(tmp_path))) == profundidad + 1
+    finally:
+        # shutil.rmtree (limpieza de tmp_path) también es recursivo: borrar de abajo arriba
+        while ruta != str(tmp_path):
+            os.rmdir(ruta)
+            ruta = os.path.dirname(ruta)